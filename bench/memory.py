@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+"""Memory benchmark for the objects of f5.Lb against f5.testing.FakeBigIP
+
+Reports the memory the objects of every bulk getter keep (traced with
+tracemalloc, attribute values included) and the size of one object itself
+(the instance and its __dict__, if any), per object.
+
+    python bench/memory.py --sizes 10000,50000
+    python bench/memory.py --save baseline.json
+    python bench/memory.py --check baseline.json
+
+--check exits non-zero when the objects of any operation take more than
+10% more memory than recorded in the baseline.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import f5
+import f5.testing
+
+from roundtrips import device
+
+OPERATIONS = ['nodes_get', 'columnar_nodes', 'pools_get', 'pms_get', 'vss_get', 'rules_get']
+
+# Allowed growth over the baseline for --check
+TOLERANCE = 1.1
+
+
+def columnar_nodes(lb):
+    return f5.ColumnarNodeList(lb)
+
+
+def object_size(obj):
+    """Bytes of the instance and its __dict__, not of the values"""
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def run(sizes, operations):
+    results = {}
+
+    for size in sizes:
+        bigip = device(size, 0)
+        lb    = f5.Lb('fake', 'admin', 'admin', transport=bigip)
+
+        for operation in operations:
+            gc.collect()
+            tracemalloc.start()
+            if operation == 'columnar_nodes':
+                objects = columnar_nodes(lb)
+            else:
+                objects = getattr(lb, operation)()
+            gc.collect()
+            traced = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+
+            # Views of a ColumnarNodeList are made on demand, they don't count
+            shell = 0
+            if objects and operation != 'columnar_nodes':
+                shell = object_size(objects[0])
+
+            results['%s/%s' % (operation, size)] = {
+                'objects'          : len(objects),
+                'bytes'            : traced,
+                'bytes_per_object' : traced // max(len(objects), 1),
+                'object_size'      : shell,
+            }
+
+            del objects
+
+    return results
+
+
+def report(results):
+    print('%-20s %8s %14s %10s %12s' % ('operation', 'objects', 'bytes', 'per object',
+            'object size'))
+    for key in sorted(results, key=lambda k: (int(k.split('/')[1]), k)):
+        r = results[key]
+        print('%-20s %8d %14d %10d %12d' %
+              (key, r['objects'], r['bytes'], r['bytes_per_object'], r['object_size']))
+
+
+def check(results, baseline):
+    """Returns the operations that take more memory than the baseline"""
+    return [key for key, r in results.items() if key in baseline
+            and r['bytes_per_object'] > baseline[key]['bytes_per_object'] * TOLERANCE]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', default='1000,10000,50000',
+            help='comma separated device sizes (default: %(default)s)')
+    parser.add_argument('--operations', default=','.join(OPERATIONS),
+            help='comma separated Lb methods (default: %(default)s)')
+    parser.add_argument('--save', metavar='FILE', help='write results to FILE')
+    parser.add_argument('--check', metavar='FILE',
+            help='fail if memory exceeds the results stored in FILE')
+    args = parser.parse_args()
+
+    results = run([int(s) for s in args.sizes.split(',')], args.operations.split(','))
+    report(results)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.check:
+        with open(args.check) as f:
+            regressions = check(results, json.load(f))
+        if regressions:
+            print('memory regressions: %s' % ', '.join(sorted(regressions)))
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
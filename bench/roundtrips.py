@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""Round-trip benchmark for f5.Lb against f5.testing.FakeBigIP
+
+Reports the number of iControl calls, the (approximate) payload bytes and
+the wall time for the bulk getters of f5.Lb at a number of device sizes.
+
+    python bench/roundtrips.py --sizes 1000,10000 --latency 0.06
+    python bench/roundtrips.py --save baseline.json
+    python bench/roundtrips.py --check baseline.json
+
+--check exits non-zero when any operation needs more calls than recorded in
+the baseline.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import f5
+import f5.testing
+
+OPERATIONS = ['nodes_get', 'pools_get', 'pms_get', 'vss_get', 'rules_get']
+
+
+def device(size, latency):
+    """A FakeBigIP with size nodes and pool members, and size/10 of the rest"""
+    bigip = f5.testing.FakeBigIP(latency=latency)
+    bigip.populate(
+        nodes            = size,
+        pools            = max(size // 10, 1),
+        members_per_pool = 10,
+        virtualservers   = max(size // 10, 1),
+        rules            = max(size // 10, 1),
+    )
+
+    return bigip
+
+
+def run(sizes, latency, operations, lb_kwargs=None):
+    results = {}
+
+    for size in sizes:
+        bigip = device(size, latency)
+
+        start = time.time()
+        lb    = f5.Lb('fake', 'admin', 'admin', transport=bigip, **(lb_kwargs or {}))
+        results['%s/%s' % ('Lb', size)] = {
+            'objects' : 0,
+            'calls'   : bigip.stats.calls,
+            'bytes'   : bigip.stats.bytes,
+            'seconds' : time.time() - start,
+        }
+
+        for operation in operations:
+            bigip.stats.reset()
+            start   = time.time()
+            objects = getattr(lb, operation)()
+            results['%s/%s' % (operation, size)] = {
+                'objects' : len(objects),
+                'calls'   : bigip.stats.calls,
+                'bytes'   : bigip.stats.bytes,
+                'seconds' : time.time() - start,
+            }
+
+    return results
+
+
+def report(results):
+    print('%-18s %8s %8s %14s %10s' % ('operation', 'objects', 'calls', 'bytes', 'seconds'))
+    for key in sorted(results, key=lambda k: (int(k.split('/')[1]), k)):
+        r = results[key]
+        print('%-18s %8d %8d %14d %10.3f' %
+              (key, r['objects'], r['calls'], r['bytes'], r['seconds']))
+
+
+def check(results, baseline):
+    """Returns the operations that need more calls than the baseline"""
+    return [key for key, r in results.items()
+            if key in baseline and r['calls'] > baseline[key]['calls']]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', default='1000,10000,50000',
+            help='comma separated device sizes (default: %(default)s)')
+    parser.add_argument('--latency', type=float, default=0,
+            help='seconds of latency added to every call (default: %(default)s)')
+    parser.add_argument('--concurrency', type=int, default=1,
+            help='Lb concurrency (default: %(default)s)')
+    parser.add_argument('--operations', default=','.join(OPERATIONS),
+            help='comma separated Lb methods (default: %(default)s)')
+    parser.add_argument('--save', metavar='FILE', help='write results to FILE')
+    parser.add_argument('--check', metavar='FILE',
+            help='fail if calls exceed the results stored in FILE')
+    args = parser.parse_args()
+
+    results = run([int(s) for s in args.sizes.split(',')], args.latency,
+            args.operations.split(','), {'concurrency': args.concurrency})
+    report(results)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.check:
+        with open(args.check) as f:
+            regressions = check(results, json.load(f))
+        if regressions:
+            print('round-trip regressions: %s' % ', '.join(sorted(regressions)))
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,7 +1,15 @@
+from f5.fleet import FleetResult
+from f5.fleet import LbFleet
 from f5.lb import Lb
 from f5.node import Node
 from f5.node import NodeList
+from f5.node import ColumnarNodeList
 from f5.pool import Pool
 from f5.poolmember import PoolMember
+from f5.poolmember import PoolMemberList
 from f5.rule import Rule
+from f5.rule import RuleList
+from f5.snapshot import Snapshot
+from f5.topology import Topology
 from f5.vs import VirtualServer
+from f5.vs import VirtualServerList
@@ -0,0 +1,125 @@
+import asyncio
+import f5
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+###########################################################################
+# Asyncio front-end
+###########################################################################
+# Every call is run on a (bounded) executor so the event loop never blocks on
+# iControl. Every call holds one of the Lb's sessions, so at most pool_size
+# calls on one AsyncLb run at once (the rest wait on the loop, not in an
+# executor thread); use the Lb's concurrency setting for parallel fetches on
+# one device and many AsyncLbs to fan out over devices.
+#
+#   lb = await f5.aio.AsyncLb.connect('f5.example.com', 'admin', 'admin')
+#   nodes = await lb.nodes_get(pattern='.*dc3.*')
+#   await lb.set(nodes[0], 'ratio', 10)
+
+# Shared by all AsyncLbs that don't bring their own executor
+_executor = None
+
+
+def default_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(32)
+    return _executor
+
+
+class AsyncLb(object):
+    """Awaitable wrapper around an f5.Lb"""
+    def __init__(self, lb, executor=None):
+        if not isinstance(lb, f5.Lb):
+            raise ValueError('lb must be of type f5.Lb, not %s' % (type(lb).__name__))
+
+        self._lb       = lb
+        self._executor = executor or default_executor()
+        self._lock     = None
+
+    def __repr__(self):
+        return "f5.aio.AsyncLb('%s')" % (self._lb.host)
+
+    @classmethod
+    async def connect(cls, host, username, password, executor=None, **kwargs):
+        """Create the Lb (which talks to the device) on the executor"""
+        executor = executor or default_executor()
+        lb = await asyncio.get_running_loop().run_in_executor(executor,
+                partial(f5.Lb, host, username, password, **kwargs))
+
+        return cls(lb, executor)
+
+    async def _run(self, func, *args, **kwargs):
+        # Created here so it binds to the running loop
+        if self._lock is None:
+            self._lock = asyncio.Semaphore(self._lb.pool_size)
+
+        async with self._lock:
+            return await asyncio.get_running_loop().run_in_executor(
+                    self._executor, partial(func, *args, **kwargs))
+
+    ###########################################################################
+    # Properties
+    ###########################################################################
+    @property
+    def lb(self):
+        return self._lb
+
+    @property
+    def host(self):
+        return self._lb.host
+
+    ###########################################################################
+    # PUBLIC API
+    ###########################################################################
+    async def run(self, func, *args, **kwargs):
+        """Run func(lb, *args, **kwargs) on the executor"""
+        return await self._run(func, self._lb, *args, **kwargs)
+
+    async def pool_get(self, name):
+        return await self._run(self._lb.pool_get, name)
+
+    async def pools_get(self, pattern=None, minimal=False):
+        return await self._run(self._lb.pools_get, pattern, minimal)
+
+    async def pm_get(self, node, port, pool):
+        return await self._run(self._lb.pm_get, node, port, pool)
+
+    async def pms_get(self, pools=None, pattern=None, minimal=False):
+        return await self._run(self._lb.pms_get, pools, pattern, minimal)
+
+    async def node_get(self, name):
+        return await self._run(self._lb.node_get, name)
+
+    async def nodes_get(self, pattern=None, minimal=False, partition='/'):
+        return await self._run(self._lb.nodes_get, pattern, minimal, partition)
+
+    async def rule_get(self, name):
+        return await self._run(self._lb.rule_get, name)
+
+    async def rules_get(self, pattern=None, minimal=False):
+        return await self._run(self._lb.rules_get, pattern, minimal)
+
+    async def vs_get(self, name):
+        return await self._run(self._lb.vs_get, name)
+
+    async def vss_get(self, pattern=None, minimal=False):
+        return await self._run(self._lb.vss_get, pattern, minimal)
+
+    async def get(self, obj, attr):
+        """Read a (synchronous) attribute of an f5 object from the lb"""
+        return await self._run(getattr, obj, attr)
+
+    async def set(self, obj, attr, value):
+        """Set a (synchronous) attribute of an f5 object on the lb"""
+        return await self._run(setattr, obj, attr, value)
+
+    async def refresh(self, obj):
+        return await self._run(obj.refresh)
+
+    async def save(self, obj):
+        return await self._run(obj.save)
+
+    async def delete(self, obj):
+        return await self._run(obj.delete)
@@ -0,0 +1,272 @@
+import threading
+import time
+
+###########################################################################
+# Attribute cache
+###########################################################################
+# Caches the results of bulk getters per object (and per pool member), so a
+# getter on a single object is answered from an earlier bulk fetch of a list
+# and a bulk fetch only asks the device for the objects it doesn't have.
+#
+# Attributes come in three classes, each with its own time to live:
+#   config     - everything not below (ratio, description, addresses, ...)
+#   status     - get_*status* (availability, enabled state)
+#   statistics - get_*statistics*
+#
+# Writes (any call that isn't a getter) invalidate everything cached for
+# their interface (and the interfaces in AFFECTS), submitting or rolling back
+# a transaction everything.
+CONFIG     = 'config'
+STATUS     = 'status'
+STATISTICS = 'statistics'
+
+CLASSES = (CONFIG, STATUS, STATISTICS)
+
+# Interfaces whose results change with writes to another interface, e.g. a
+# deleted or disabled node shows through in the members of its pools.
+AFFECTS = {
+    'LocalLB.NodeAddressV2' : ('LocalLB.Pool',),
+}
+
+
+def attribute_class(method):
+    """Returns the attribute class of a getter, e.g. 'get_object_status'"""
+    if 'statistics' in method:
+        return STATISTICS
+    if 'status' in method:
+        return STATUS
+    return CONFIG
+
+
+def is_getter(method):
+    return method.startswith('get_') or method.startswith('query_')
+
+
+def freeze(value):
+    """Hashable version of an iControl argument, e.g. an address/port dict"""
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    # f5 objects (e.g. a Pool) are sent as their name
+    if hasattr(value, '_lb'):
+        return str(value)
+    return value
+
+
+class AttributeCache(object):
+    """Per object results of iControl getters, each kept for a time to live
+
+    ttl is either a number of seconds for all attribute classes, or a dict of
+    class -> seconds; classes missing from the dict aren't cached. clock
+    returns the current time in seconds.
+    """
+    def __init__(self, ttl, clock=time.time):
+        if isinstance(ttl, dict):
+            unknown = set(ttl) - set(CLASSES)
+            if unknown:
+                raise ValueError('unknown attribute classes %s, must be one of %s' %
+                        (sorted(unknown), CLASSES))
+            self._ttl = dict(ttl)
+        else:
+            self._ttl = dict((c, ttl) for c in CLASSES)
+
+        # interface -> {(method, cell): (expires, value)}
+        self._entries = {}
+        self._clock   = clock
+        self._lock    = threading.Lock()
+        self._hits    = 0
+        self._misses  = 0
+
+    def __repr__(self):
+        return 'f5.cache.AttributeCache(hits=%s, misses=%s)' % (self._hits, self._misses)
+
+    @property
+    def ttl(self):
+        return dict(self._ttl)
+
+    @property
+    def hits(self):
+        """Object attributes answered from the cache"""
+        return self._hits
+
+    @property
+    def misses(self):
+        """Object attributes fetched from the device"""
+        return self._misses
+
+    @property
+    def stats(self):
+        with self._lock:
+            entries = sum(len(e) for e in self._entries.values())
+        return {'hits': self._hits, 'misses': self._misses, 'entries': entries}
+
+    def reset_stats(self):
+        self._hits = self._misses = 0
+
+    def invalidate(self, interface=None):
+        """Forget everything of interface (e.g. 'LocalLB.Pool'), or everything"""
+        with self._lock:
+            if interface is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(interface, None)
+
+    def written(self, call):
+        """Invalidate what a (non-getter) call may have changed"""
+        interface, method = call.rsplit('.', 1)
+        if not is_getter(method):
+            self.invalidate(interface)
+            for affected in AFFECTS.get(interface, ()):
+                self.invalidate(affected)
+
+    def call_many(self, fetch, calls):
+        """Perform (call, *args) tuples like Lb._call_many, getting what we
+        have from the cache and only the rest through fetch(calls)"""
+        plans = [self._plan(call) for call in calls]
+
+        fetched = iter(fetch([plan['fetch'] for plan in plans if plan['fetch'] is not None]))
+
+        results = []
+        for call, plan in zip(calls, plans):
+            if plan['fetch'] is None:
+                results.append(self._assemble(plan, {}))
+            elif plan['cells'] is None:
+                result = next(fetched)
+                self.written(call[0])
+                results.append(result)
+            else:
+                results.append(self._assemble(plan, self._store(plan, next(fetched))))
+
+        return results
+
+    ###########################################################################
+    # INTERNAL API
+    ###########################################################################
+    # A plan splits a call into cells, one per object (rows) or per pool member
+    # (rows of columns when an argument is a list of lists), and holds the call
+    # that fetches the missing cells.
+    def _plan(self, call):
+        name, args = call[0], call[1:]
+        interface, method = name.rsplit('.', 1)
+        plan = {'call': call, 'cells': None, 'fetch': call}
+
+        ttl = self._ttl.get(attribute_class(method))
+        if (not ttl or not is_getter(method) or not args
+                or not isinstance(args[0], list) or not args[0]):
+            return plan
+
+        rows   = len(args[0])
+        lists  = [idx for idx, a in enumerate(args) if isinstance(a, list)]
+        if any(len(args[idx]) != rows for idx in lists):
+            return plan
+
+        # Only the last list argument may be nested (e.g. addrportsq2)
+        nested = (len(lists) > 1 and all(isinstance(v, list) for v in args[lists[-1]]))
+
+        # Member statistics come as a dict per pool, we can't split those
+        if nested and attribute_class(method) == STATISTICS:
+            return plan
+        widths = [len(args[lists[-1]][row]) if nested else None for row in range(rows)]
+
+        def cell(row, column=None):
+            key = [freeze(args[idx][row]) for idx in (lists[:-1] if nested else lists)]
+            if nested:
+                key.append(freeze(args[lists[-1]][row][column]))
+            key.extend(freeze(a) for idx, a in enumerate(args) if idx not in lists)
+            return (method, tuple(key))
+
+        if nested:
+            cells = [[cell(row, column) for column in range(widths[row])] for row in range(rows)]
+        else:
+            cells = [cell(row) for row in range(rows)]
+
+        now    = self._clock()
+        values = {}
+        with self._lock:
+            entries = self._entries.get(interface, {})
+            for key in (c for row in cells for c in (row if nested else [row])):
+                entry = entries.get(key)
+                if entry is not None and entry[0] > now:
+                    values[key] = entry[1]
+
+        plan.update({'interface': interface, 'ttl': ttl, 'cells': cells,
+                'nested': nested, 'lists': lists, 'values': values})
+
+        # Fetch whole rows (objects) with a missing cell, only the missing
+        # columns (pool members) of those rows.
+        if nested:
+            missing = [(row, [column for column, c in enumerate(cells[row]) if c not in values])
+                    for row in range(rows)]
+            missing = [(row, columns) for row, columns in missing if columns]
+        else:
+            missing = [(row, None) for row in range(rows) if cells[row] not in values]
+
+        self._count(sum(len(row) if nested else 1 for row in cells), values)
+        plan['missing'] = missing
+
+        if not missing:
+            plan['fetch'] = None
+            return plan
+
+        fetch_args = []
+        for idx, a in enumerate(args):
+            if idx not in lists:
+                fetch_args.append(a)
+            elif nested and idx == lists[-1]:
+                fetch_args.append([[a[row][column] for column in columns]
+                        for row, columns in missing])
+            else:
+                fetch_args.append([a[row] for row, columns in missing])
+        plan['fetch'] = (name,) + tuple(fetch_args)
+
+        return plan
+
+    def _count(self, cells, values):
+        with self._lock:
+            self._hits   += len(values)
+            self._misses += cells - len(values)
+
+    def _store(self, plan, result):
+        """Split a fetched result into cells, store and return them"""
+        missing = plan['missing']
+        cells   = plan['cells']
+        fetched = {}
+
+        if isinstance(result, dict):
+            # e.g. get_statistics: {'statistics': [...], 'time_stamp': ...}
+            for idx, (row, columns) in enumerate(missing):
+                fetched[cells[row]] = dict((k, [v[idx]] if isinstance(v, list) else v)
+                        for k, v in result.items())
+        elif plan['nested']:
+            for idx, (row, columns) in enumerate(missing):
+                for column, value in zip(columns, result[idx]):
+                    fetched[cells[row][column]] = value
+        else:
+            for idx, (row, columns) in enumerate(missing):
+                fetched[cells[row]] = result[idx]
+
+        expires = self._clock() + plan['ttl']
+        with self._lock:
+            entries = self._entries.setdefault(plan['interface'], {})
+            for key, value in fetched.items():
+                entries[key] = (expires, value)
+
+        return fetched
+
+    def _assemble(self, plan, fetched):
+        values = plan['values']
+        values.update(fetched)
+
+        if plan['nested']:
+            return [[values[c] for c in row] for row in plan['cells']]
+
+        result = [values[c] for c in plan['cells']]
+        if result and isinstance(result[0], dict) and 'time_stamp' in result[0]:
+            stitched = dict(result[0])
+            for key, value in stitched.items():
+                if isinstance(value, list):
+                    stitched[key] = [v for r in result for v in r[key]]
+            return stitched
+
+        return result
@@ -0,0 +1,279 @@
+import f5
+import gzip
+import json
+
+from .node import ColumnarNodeList, NodeList
+from .pool import PoolList
+from .snapshot import (NodeRecord, PoolRecord, PoolMemberRecord,
+        VirtualServerRecord, RuleRecord)
+
+###########################################################################
+# Columnar export/import
+###########################################################################
+# A compact, offline form of a NodeList (or ColumnarNodeList), PoolList or
+# Snapshot: one array per attribute instead of one dict per object. Columns
+# with few distinct values (status, enabled, lbmethod, ports, ...) are
+# dictionary encoded, every row holds a code into a list of distinct values,
+# which also makes equal values one shared object after loading.
+#
+#   data  = f5.columnar.dumps(nodes, compress='gzip')
+#   nodes = f5.columnar.loads(data, lb=lb)
+#
+# Formats are 'jsonl' (a header line and one line per column) and 'msgpack'
+# (needs msgpack), compress is None, 'gzip' or 'zstd' (needs zstandard).
+# loads() recognizes all of them by themselves.
+FORMAT  = 'f5-columnar'
+VERSION = 1
+
+FORMATS  = ('jsonl', 'msgpack')
+COMPRESS = (None, 'gzip', 'zstd')
+
+# Dictionary encode a column when it has at most this fraction distinct values
+DICT_RATIO = 0.5
+
+NODE_FIELDS = ('name', 'address', 'av_status', 'connection_limit',
+        'description', 'dynamic_ratio', 'enabled', 'rate_limit', 'ratio',
+        'status_descr')
+
+# members is the number of members of the pool (None if not known), the
+# members themselves are rows of the members table, in pool order.
+POOL_FIELDS = ('name', 'active_member_count', 'description', 'lbmethod',
+        'members', 'minimum_active_member', 'minimum_up_member', 'slow_ramp_time')
+
+MEMBER_FIELDS = ('address', 'port')
+
+_GZIP_MAGIC = b'\x1f\x8b'
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+###########################################################################
+# PUBLIC API
+###########################################################################
+def dumps(obj, format='jsonl', compress=None):
+    """Returns obj (an f5.NodeList, PoolList or Snapshot) as bytes
+
+    Lists are exported from their local attributes (like _dictionary), so
+    refresh them first if they may be stale.
+    """
+    if format not in FORMATS:
+        raise ValueError('format must be one of %s, not %s' % (FORMATS, format))
+    if compress not in COMPRESS:
+        raise ValueError('compress must be one of %s, not %s' % (COMPRESS, compress))
+
+    kind, meta, tables = _export(obj)
+
+    doc = {
+        'format'  : FORMAT,
+        'version' : VERSION,
+        'kind'    : kind,
+        'meta'    : meta,
+        'tables'  : [{'name': name, 'rows': rows, 'fields': [f for f, c in columns]}
+            for name, rows, columns in tables],
+    }
+
+    if format == 'jsonl':
+        lines = [doc] + [column for name, rows, columns in tables for f, column in columns]
+        data  = ''.join(json.dumps(line, separators=(',', ':')) + '\n'
+                for line in lines).encode('utf-8')
+    else:
+        doc['columns'] = [column for name, rows, columns in tables for f, column in columns]
+        data = _msgpack().packb(doc, use_bin_type=True)
+
+    if compress == 'gzip':
+        data = gzip.compress(data)
+    elif compress == 'zstd':
+        data = _zstandard().ZstdCompressor().compress(data)
+
+    return data
+
+
+def loads(data, lb=None, columnar=False):
+    """Returns the f5.NodeList, PoolList or Snapshot of dumps() output, lists
+    get lb as their (and their objects') lb. With columnar, nodes come back
+    as an f5.ColumnarNodeList."""
+    if data[:4] == _ZSTD_MAGIC:
+        data = _zstandard().ZstdDecompressor().decompress(data)
+    elif data[:2] == _GZIP_MAGIC:
+        data = gzip.decompress(data)
+
+    if data[:1] == b'{':
+        lines   = data.decode('utf-8').splitlines()
+        doc     = json.loads(lines[0])
+        columns = [json.loads(line) for line in lines[1:]]
+    else:
+        doc     = _msgpack().unpackb(data, raw=False)
+        columns = doc.pop('columns')
+
+    if doc.get('format') != FORMAT:
+        raise ValueError('not an %s document' % (FORMAT))
+    if doc.get('version') != VERSION:
+        raise ValueError('unsupported %s version %s' % (FORMAT, doc.get('version')))
+
+    columns = iter(columns)
+    tables  = {}
+    for table in doc['tables']:
+        tables[table['name']] = dict((field, _decode(next(columns), table['rows']))
+                for field in table['fields'])
+
+    return _import(doc['kind'], doc['meta'], tables, lb, columnar)
+
+
+def dump(obj, fp, format='jsonl', compress=None):
+    """Write dumps() of obj to a binary file object"""
+    fp.write(dumps(obj, format=format, compress=compress))
+
+
+def load(fp, lb=None, columnar=False):
+    return loads(fp.read(), lb=lb, columnar=columnar)
+
+
+###########################################################################
+# INTERNAL API
+###########################################################################
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise ImportError("format 'msgpack' needs the msgpack package")
+    return msgpack
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("compress 'zstd' needs the zstandard package")
+    return zstandard
+
+
+def _encode(values):
+    """Returns a column: {'values': [...]} or {'dict': [...], 'codes': [...]}"""
+    values = list(values)
+
+    # Keyed on type too, so True, 1 and 1.0 stay apart
+    distinct = {}
+    try:
+        codes = [distinct.setdefault((type(v), v), len(distinct)) for v in values]
+    except TypeError:
+        # Unhashable values, e.g. lists of profiles
+        return {'values': values}
+
+    if len(distinct) > len(values) * DICT_RATIO:
+        return {'values': values}
+
+    return {'dict': [v for t, v in distinct], 'codes': codes}
+
+
+def _decode(column, rows):
+    if 'codes' in column:
+        values = column['dict']
+        values = [values[code] for code in column['codes']]
+    else:
+        values = column['values']
+
+    if len(values) != rows:
+        raise ValueError('column has %s values, expected %s' % (len(values), rows))
+    return values
+
+
+def _table(name, rows, fields):
+    """rows is a list of dicts (or records), returns a (name, rows, columns) table"""
+    if rows and isinstance(rows[0], dict):
+        columns = [(f, _encode([row[f] for row in rows])) for f in fields]
+    else:
+        columns = [(f, _encode([getattr(row, f) for row in rows])) for f in fields]
+    return (name, len(rows), columns)
+
+
+def _rows(table, fields):
+    """The other way around, returns a list of dicts"""
+    columns = [table[f] for f in fields]
+    return [dict(zip(fields, row)) for row in zip(*columns)]
+
+
+def _export(obj):
+    """Returns (kind, meta, tables)"""
+    if isinstance(obj, (NodeList, ColumnarNodeList)):
+        d    = obj._dictionary
+        meta = {'host': d['lb'].host if d['lb'] else None,
+                'partition': d['partition'], 'pattern': d['pattern']}
+        return ('nodelist', meta, [_table('nodes', d['nodes'], NODE_FIELDS)])
+
+    if isinstance(obj, PoolList):
+        d     = obj._dictionary
+        meta  = {'host': d['lb'].host if d['lb'] else None,
+                 'partition': d['partition'], 'pattern': d['pattern']}
+        pools = [dict(p, members=None if p['members'] is None else len(p['members']))
+                for p in d['pools']]
+        members = [m for p in d['pools'] for m in (p['members'] or [])]
+        return ('poollist', meta, [_table('pools', pools, POOL_FIELDS),
+                                   _table('members', members, MEMBER_FIELDS)])
+
+    if isinstance(obj, f5.Snapshot):
+        meta = {'host': obj.host, 'taken': obj.taken, 'costs': obj.costs}
+
+        # References become names, a pool's members are its count of rows in
+        # poolmembers (which are in pool order).
+        pools = [r._replace(members=len(r.members)) for r in obj.pools]
+        poolmembers = [r._replace(node=getattr(r.node, 'name', r.node)) for r in obj.poolmembers]
+        virtualservers = [r._replace(default_pool=getattr(r.default_pool, 'name', None),
+            profiles=[list(p) for p in r.profiles]) for r in obj.virtualservers]
+
+        return ('snapshot', meta, [
+            _table('nodes', obj.nodes, NodeRecord._fields),
+            _table('pools', pools, PoolRecord._fields),
+            _table('poolmembers', poolmembers, PoolMemberRecord._fields),
+            _table('virtualservers', virtualservers, VirtualServerRecord._fields),
+            _table('rules', obj.rules, RuleRecord._fields),
+        ])
+
+    raise ValueError('can only export f5.NodeList, PoolList or Snapshot, not %s' %
+            (type(obj).__name__))
+
+
+def _import(kind, meta, tables, lb, columnar=False):
+    if kind == 'nodelist':
+        nodelist = ColumnarNodeList() if columnar else NodeList(minimal=True)
+        nodelist._dictionary = {'lb': lb, 'partition': meta['partition'],
+                'pattern': meta['pattern'], 'nodes': _rows(tables['nodes'], NODE_FIELDS)}
+        return nodelist
+
+    if kind == 'poollist':
+        members = iter(_rows(tables['members'], MEMBER_FIELDS))
+        pools   = _rows(tables['pools'], POOL_FIELDS)
+        for pool in pools:
+            if pool['members'] is not None:
+                pool['members'] = [next(members) for idx in range(pool['members'])]
+
+        poollist = PoolList()
+        poollist._dictionary = {'lb': lb, 'partition': meta['partition'],
+                'pattern': meta['pattern'], 'pools': pools}
+        return poollist
+
+    if kind == 'snapshot':
+        nodes = [NodeRecord(*row) for row in zip(*[tables['nodes'][f] for f in NodeRecord._fields])]
+        node_index = dict((r.name, r) for r in nodes)
+
+        poolmembers = [PoolMemberRecord(*row)
+                for row in zip(*[tables['poolmembers'][f] for f in PoolMemberRecord._fields])]
+        poolmembers = [r._replace(node=node_index.get(r.node, r.node)) for r in poolmembers]
+
+        pools = []
+        members = iter(poolmembers)
+        for row in zip(*[tables['pools'][f] for f in PoolRecord._fields]):
+            record = PoolRecord(*row)
+            pools.append(record._replace(members=tuple(next(members)
+                for idx in range(record.members))))
+        pool_index = dict((r.name, r) for r in pools)
+
+        virtualservers = [VirtualServerRecord(*row)
+                for row in zip(*[tables['virtualservers'][f] for f in VirtualServerRecord._fields])]
+        virtualservers = [r._replace(default_pool=pool_index.get(r.default_pool),
+            profiles=tuple(tuple(p) for p in r.profiles)) for r in virtualservers]
+
+        rules = [RuleRecord(*row) for row in zip(*[tables['rules'][f] for f in RuleRecord._fields])]
+
+        return f5.Snapshot(meta['host'], meta['taken'], meta['costs'], nodes,
+                pools, poolmembers, virtualservers, rules)
+
+    raise ValueError('unknown kind %s' % (kind))
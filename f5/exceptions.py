@@ -61,6 +61,22 @@ class BigSudsExceptionParser(object):
         return self._secondary_error_code
 
 
+class DrainTimeout(Exception):
+    def __init__(self, node, connections, timeout):
+        Exception.__init__(self, '%s still has %s connections after %ss' %
+                (node, connections, timeout))
+        self.node        = node
+        self.connections = connections
+        self.timeout     = timeout
+
+
+class HostTimeout(Exception):
+    def __init__(self, host, timeout):
+        Exception.__init__(self, '%s did not respond within %ss' % (host, timeout))
+        self.host    = host
+        self.timeout = timeout
+
+
 class NodeNotFound(Exception):
     pass
 
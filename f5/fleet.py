@@ -0,0 +1,153 @@
+import f5
+import time
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .exceptions import HostTimeout
+
+
+class FleetResult(object):
+    """Per host results, errors and latencies of a call on an LbFleet"""
+    def __init__(self):
+        self.results = {}
+        self.errors  = {}
+        self.latency = {}
+
+    def __repr__(self):
+        return 'f5.FleetResult(ok=%s, failed=%s)' % (len(self.results), len(self.errors))
+
+    @property
+    def ok(self):
+        """True if the call succeeded on all hosts"""
+        return not self.errors
+
+    @property
+    def latency_stats(self):
+        """min, max, mean and median latency in seconds of successful hosts"""
+        values = sorted(self.latency[host] for host in self.results)
+        if not values:
+            return {}
+
+        middle = len(values) // 2
+        if len(values) % 2:
+            median = values[middle]
+        else:
+            median = (values[middle - 1] + values[middle]) / 2.0
+
+        return {
+            'min'    : values[0],
+            'max'    : values[-1],
+            'mean'   : sum(values) / len(values),
+            'median' : median,
+        }
+
+
+class LbFleet(object):
+    """Runs the same queries on many loadbalancers in parallel
+
+    Connections are opened in parallel on creation, hosts that fail to
+    connect end up in connect_errors and are left out of subsequent calls.
+
+    A host that doesn't finish within timeout seconds of the start of a call
+    is reported as HostTimeout, including hosts still queued for a worker
+    (those are never started). A call that is already running can't be
+    interrupted: it keeps running in the background and holds its worker
+    until it finishes.
+    """
+    def __init__(self, hosts, username, password, max_workers=16, timeout=60,
+            **kwargs):
+        self._timeout = timeout
+        self._workers = ThreadPoolExecutor(min(max_workers, len(hosts)) or 1)
+        self._lbs     = {}
+
+        result = self._map(list(hosts),
+                lambda host: f5.Lb(host, username, password, **kwargs), timeout)
+
+        self._lbs            = result.results
+        self._connect_errors = result.errors
+
+    def __repr__(self):
+        return 'f5.LbFleet(%s)' % sorted(self._lbs)
+
+    def _map(self, hosts, func, timeout):
+        result  = FleetResult()
+        start   = time.time()
+        started = {}
+
+        def run(host):
+            started[host] = time.time()
+            value = func(host)
+            return value, time.time() - started[host]
+
+        # Every host has until the same deadline, queued or not
+        deadline = start + timeout if timeout is not None else None
+        futures  = dict((self._workers.submit(run, host), host) for host in hosts)
+        pending  = set(futures)
+
+        while pending:
+            remaining = None if deadline is None else max(deadline - time.time(), 0)
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                host = futures[future]
+                try:
+                    result.results[host], result.latency[host] = future.result()
+                except Exception as e:
+                    result.errors[host]  = e
+                    result.latency[host] = time.time() - started.get(host, start)
+
+            if pending and deadline is not None and time.time() >= deadline:
+                for future in pending:
+                    # Queued hosts don't start at all, running ones finish
+                    # in the background
+                    future.cancel()
+                    host = futures[future]
+                    result.errors[host]  = HostTimeout(host, timeout)
+                    result.latency[host] = time.time() - started.get(host, start)
+                break
+
+        return result
+
+    ###########################################################################
+    # Properties
+    ###########################################################################
+    @property
+    def lbs(self):
+        """Connected loadbalancers by host"""
+        return self._lbs
+
+    @property
+    def connect_errors(self):
+        return self._connect_errors
+
+    @property
+    def hosts(self):
+        return sorted(self._lbs)
+
+    @property
+    def timeout(self):
+        return self._timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        self._timeout = value
+
+    ###########################################################################
+    # PUBLIC API
+    ###########################################################################
+    def run(self, call, *args, **kwargs):
+        """Call an Lb method by name (or call(lb, *args, **kwargs)) on all hosts
+
+        Takes an optional timeout keyword to override the fleet's timeout.
+        """
+        timeout = kwargs.pop('timeout', self._timeout)
+
+        if callable(call):
+            func = lambda host: call(self._lbs[host], *args, **kwargs)
+        else:
+            func = lambda host: getattr(self._lbs[host], call)(*args, **kwargs)
+
+        return self._map(self.hosts, func, timeout)
+
+    def close(self):
+        self._workers.shutdown(wait=False)
@@ -1,16 +1,23 @@
 import bigsuds
 import f5
 import f5.util
+import os
 import re
+import threading
+import time
 
 from bigsuds import ServerError
+from contextlib import contextmanager
 from copy import copy
-from functools import reduce
+from functools import reduce, partial
+from multiprocessing.pool import ThreadPool
 
 from .exceptions import (
     UnsupportedF5Version, NodeNotFound, PoolNotFound, PoolMemberNotFound,
     RuleNotFound, VirtualServerNotFound
 )
+from .cache import AttributeCache, freeze, is_getter
+from .session import Session, SessionPool
 
 
 # 'http://pingfive.typepad.com/blog/2010/04/deep-getattr-python-function.html'
@@ -18,40 +25,160 @@ def deepgetattr(obj, attr):
     """Recurses through an attribute chain to get the ultimate value."""
     return reduce(getattr, attr.split('.'), obj)
 
+
+def chunk_call(call, chunk_size):
+    """Split a (call, *args) tuple into calls on at most chunk_size objects.
+
+    Only calls whose list arguments are all of equal length are split. Nested
+    lists (e.g. pool members per pool) count with their own length.
+    """
+    args = call[1:]
+    if chunk_size is None or not args or not isinstance(args[0], list):
+        return [call]
+
+    lists = [a for a in args if isinstance(a, list)]
+    if any(len(l) != len(args[0]) for l in lists):
+        return [call]
+
+    weights = [max([len(l[idx]) if isinstance(l[idx], list) else 1 for l in lists])
+            for idx in range(len(args[0]))]
+    if sum(weights) <= chunk_size:
+        return [call]
+
+    bounds = [0]
+    weight = 0
+    for idx, w in enumerate(weights):
+        if weight and weight + w > chunk_size:
+            bounds.append(idx)
+            weight = 0
+        weight += w
+    bounds.append(len(weights))
+
+    return [(call[0],) + tuple(a[start:end] if isinstance(a, list) else a for a in args)
+            for start, end in zip(bounds, bounds[1:])]
+
+
+def stitch(results):
+    """Join the results of chunked calls back together"""
+    if len(results) == 1:
+        return results[0]
+
+    if isinstance(results[0], list):
+        return [value for result in results for value in result]
+
+    # e.g. get_statistics: {'statistics': [...], 'time_stamp': ...}
+    if isinstance(results[0], dict):
+        stitched = dict(results[0])
+        for key, value in stitched.items():
+            if isinstance(value, list):
+                stitched[key] = [v for result in results for v in result[key]]
+        return stitched
+
+    return results[0]
+
+
+def merge_calls(calls):
+    """Merge bulk (call, *args) tuples of the same method into one call each,
+    in the order the methods were first used.
+
+    List arguments are concatenated. For nested lists (e.g. pool members per
+    pool) rows of the same object (pool) are merged into one row.
+    """
+    merged = []
+    groups = {}
+    for call in calls:
+        args = call[1:]
+        if not args or not isinstance(args[0], list):
+            merged.append(call)
+            continue
+
+        lists  = [idx for idx, a in enumerate(args) if isinstance(a, list)]
+        if any(len(args[idx]) != len(args[0]) for idx in lists):
+            merged.append(call)
+            continue
+
+        nested = [idx for idx in lists[1:] if all(isinstance(v, list) for v in args[idx])]
+        rows   = [idx for idx in lists if idx not in nested]
+        key    = (call[0], tuple(lists), tuple(nested),
+                  tuple(freeze(a) for idx, a in enumerate(args) if idx not in lists))
+
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {'args': [[] if idx in lists else a for idx, a in enumerate(args)],
+                                   'index': {}}
+            merged.append(group)
+
+        for row in range(len(args[0])):
+            row_key = tuple(freeze(args[idx][row]) for idx in rows)
+            if nested and row_key in group['index']:
+                target = group['index'][row_key]
+                for idx in nested:
+                    group['args'][idx][target].extend(args[idx][row])
+                continue
+
+            group['index'][row_key] = len(group['args'][lists[0]])
+            for idx in lists:
+                value = args[idx][row]
+                group['args'][idx].append(list(value) if idx in nested else value)
+
+        group['name'] = call[0]
+
+    return [(m['name'],) + tuple(m['args']) if isinstance(m, dict) else m for m in merged]
+
+
+class Interface(object):
+    """Routes method calls on an iControl interface through an Lb"""
+    def __init__(self, lb, name):
+        self._lb   = lb
+        self._name = name
+
+    def __repr__(self):
+        return "f5.lb.Interface(%r, '%s')" % (self._lb, self._name)
+
+    def __getattr__(self, attr):
+        return partial(self._lb._call, self._name + '.' + attr)
+
 ###########################################################################
 # Decorators
 ###########################################################################
 from functools import wraps
 
 # Restore session attributes to their original values if they were changed
+# (Session attributes are synced to the device lazily, so this is free unless
+# there are calls in between.) The whole function runs on one session.
 def restore_session_values(func):
     @wraps(func)
     def wrapper(self, *args, **kwargs):
-        original_folder          = self._active_folder
-        original_recursive_query = self._recursive_query
+        with self._checkout():
+            original_folder          = self.active_folder
+            original_recursive_query = self.recursive_query
 
-        func_ret = func(self, *args, **kwargs)
+            func_ret = func(self, *args, **kwargs)
 
-        if self._active_folder != original_folder:
-            self.active_folder = original_folder
+            if self.active_folder != original_folder:
+                self.active_folder = original_folder
 
-        if self._recursive_query != original_recursive_query:
-            self.recursive_query = original_recursive_query
+            if self.recursive_query != original_recursive_query:
+                self.recursive_query = original_recursive_query
 
         return func_ret
 
     return wrapper
 
 
+# End of an iterator, see Lb._recursive_iter
+_END = object()
+
+
 # Enable recursive reading
 def recursivereader(func):
     @wraps(func)
     @restore_session_values
     def wrapper(self, *args, **kwargs):
 
-        if self._active_folder != '/':
+        if self.active_folder != '/':
             self.active_folder = '/'
-        if self._recursive_query != True:
+        if self.recursive_query != True:
             self.recursive_query = True
 
         return func(self, *args, **kwargs)
@@ -66,38 +193,295 @@ class Lb(object):
     _version = 11
 
     def __init__(self, host, username, password, versioncheck=True,
-                use_session=True, verify=True):
-
-        self._host         = host
-        self._username     = username
-        self._versioncheck = versioncheck
-        self._use_session  = use_session
-        self._verify       = verify
-
-        if use_session:
-            self._transport = bigsuds.BIGIP(
-                host, username, password, verify
-            ).with_session_id()
-        else:
-            self._transport = bigsuds.BIGIP(
-                host, username, password, verify
-            )
-        version = self._transport.System.SystemInfo.get_version()
-        if versioncheck and not 'BIG-IP_v11' in version:
-            raise UnsupportedF5Version('This class only supports BIG-IP v11', version)
-
-        self._active_folder       = self.active_folder
-        self._recursive_query     = self.recursive_query
-        self._transaction         = self.transaction
-        self._transaction_timeout = self.transaction_timeout
-
+                use_session=True, verify=True, transport=None, concurrency=1,
+                chunk_size=None, lazy=False, wsdl_cache=None, pool_size=1,
+                session_max_idle=300, cache_ttl=None, verify_transactions=False):
+
+        self._host             = host
+        self._username         = username
+        self._versioncheck     = versioncheck
+        self._use_session      = use_session
+        self._verify           = verify
+        self._wsdl_cache       = wsdl_cache
+        self._pool_size        = pool_size
+        self._session_max_idle = session_max_idle
+
+        # Ask the device whether a transaction is open instead of trusting
+        # the state we track per session
+        self._verify_transactions = verify_transactions
+
+        if pool_size < 1:
+            raise ValueError('pool_size must be 1 or higher, not %s' % (pool_size))
+
+        # transport can be any bigsuds.BIGIP look-alike (e.g. f5.testing.FakeBigIP)
+        # Parsed wsdls are pickled per BIG-IP version in wsdl_cache (see
+        # _connect), through the cachedir bigsuds hands to suds' ObjectCache.
+        # bigsuds keeps them for a day, after that they are fetched and
+        # pickled again. Only for transports we create.
+        #
+        # verify goes in as bigsuds' fourth argument (debug) like it always
+        # has: certificates aren't verified, bigsuds' sessions (with_session_id)
+        # can't do that anyway.
+        self._transport_factory = None
+        if transport is None:
+            self._transport_factory = lambda cachedir: bigsuds.BIGIP(host, username,
+                    password, verify, cachedir=cachedir)
+            transport = self._transport_factory(self._wsdl_cache_dir('bootstrap'))
+
+        # Creating a bigsuds.BIGIP doesn't talk to the lb, wsdls are loaded
+        # per interface when first used.
+        self._base_transport = transport
+        self._sessions       = None
+        self._timings        = {}
+        self._device_version = None
+        self._interfaces     = {}
+        self._lock           = threading.Lock()
+
+        # Parallel fetches run on extra clients that share a session id
+        self._workers = None
+
+        # Through the setters, which check them
+        self.concurrency = concurrency
+        self.chunk_size  = chunk_size
+
+        # Opt-in cache of object attributes, see f5.cache
+        self._cache = None
+        if cache_ttl is not None:
+            self._cache = AttributeCache(cache_ttl)
+
+        # Every thread checks out its own session (see _checkout)
+        self._local = threading.local()
+
+        # Session state as we want it for every operation (None until first
+        # used), the sessions track what they have on the device.
+        self._active_folder       = None
+        self._recursive_query     = None
+        self._transaction_timeout = None
+
+        # lazy postpones getting a session and the version check until the
+        # first call
+        if not lazy:
+            self._connect()
 
     def __repr__(self):
         return "f5.Lb('%s')" % (self._host)
 
+    def _connect(self):
+        """Get a session and check the version, once"""
+        if self._sessions is not None:
+            return self._sessions.sessions[0].transport
+
+        with self._lock:
+            if self._sessions is not None:
+                return self._sessions.sessions[0].transport
+
+            start = time.time()
+            if self._versioncheck or self._wsdl_cache is not None:
+                version = self._base_transport.System.SystemInfo.get_version()
+                self._timings['versioncheck'] = time.time() - start
+
+                if self._versioncheck and not 'BIG-IP_v11' in version:
+                    raise UnsupportedF5Version('This class only supports BIG-IP v11', version)
+                self._device_version = version
+
+            # Only System.SystemInfo comes from the bootstrap cache, all other
+            # interfaces (also those of sessions) are cached per version.
+            if self._wsdl_cache is not None and self._transport_factory is not None:
+                self._base_transport = self._transport_factory(self._wsdl_cache_dir(version))
+
+            # The first session is created right away, the rest of the pool
+            # when there's demand for them.
+            _start  = time.time()
+            session = self._new_session()
+            self._timings['session'] = time.time() - _start
+
+            size = self._pool_size if self._use_session else 1
+            self._sessions = SessionPool(self._new_session, size,
+                    self._session_max_idle, [session])
+            self._timings['connect'] = time.time() - start
+
+        return session.transport
+
+    def _wsdl_cache_dir(self, version):
+        if self._wsdl_cache is None:
+            return None
+        return os.path.join(os.path.expanduser(self._wsdl_cache), version)
+
+    def _new_session(self):
+        return Session(self._base_transport, self._use_session, self._timings)
+
+    @property
+    def _transport(self):
+        return self._connect()
+
+    #### Session checkout ####
+    # Every operation runs on one session from the pool, which is held by the
+    # thread for as long as the (outermost) operation runs. A session with an
+    # open transaction stays with its thread until the transaction ends.
+    @contextmanager
+    def _checkout(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            self._connect()
+            session = self._sessions.get()
+            self._local.session = session
+            self._local.depth   = 0
+
+        if self._local.depth == 0:
+            # Every operation starts out with the lb's session values
+            if self._active_folder is not None:
+                session.active_folder = self._active_folder
+            if self._recursive_query is not None:
+                session.recursive_query = self._recursive_query
+
+        self._local.depth += 1
+        try:
+            yield session
+        except bigsuds.ConnectionError:
+            session.broken = True
+            raise
+        except ServerError:
+            # A failed call may have ended the transaction, find out when
+            # it's needed.
+            if session.transaction:
+                session.transaction = None
+            raise
+        finally:
+            self._local.depth -= 1
+            if self._local.depth == 0 and (session.broken or session.transaction is False):
+                self._local.session = None
+                self._sessions.put(session)
+
+    def _session(self):
+        """Returns the session of the running operation, None outside one"""
+        if getattr(self._local, 'depth', 0):
+            return self._local.session
+        return None
+
+    def _client(self, interface):
+        """Returns the (cached) client of an interface, e.g. 'LocalLB.Pool'"""
+        with self._checkout() as session:
+            return session.client(interface)
+
     # call a service on the soap api
     def _call(self, call, *args, **kwargs):
-        return deepgetattr(self._transport, call)(*args, **kwargs)
+        batch = getattr(self._local, 'batch', None)
+        if batch is not None and not kwargs:
+            if call.rsplit('.', 1)[1].startswith('set_'):
+                batch.append((call,) + args)
+                return None
+            elif not is_getter(call.rsplit('.', 1)[1]):
+                # Keep the order of writes that can't be batched
+                self._flush_batch()
+
+        if kwargs:
+            with self._checkout() as session:
+                self._sync_session(session)
+                try:
+                    self._count_calls(1)
+                    return session.method(call)(*args, **kwargs)
+                finally:
+                    if self._cache is not None:
+                        self._cache.written(call)
+
+        return self._call_many([(call,) + args])[0]
+
+    def _call_many(self, calls):
+        """Perform a list of independent (call, *args) tuples, returns their
+        results in the same order.
+
+        Bulk calls are split into chunks of at most chunk_size objects and
+        stitched back together. Calls (and chunks) are dispatched in parallel
+        when concurrency > 1, every worker thread using its own client on our
+        session.
+        """
+        if self._cache is not None:
+            return self._cache.call_many(self._call_many_uncached, calls)
+        return self._call_many_uncached(calls)
+
+    def _call_many_uncached(self, calls):
+        with self._checkout() as session:
+            self._sync_session(session)
+
+            chunks = [chunk_call(call, self._chunk_size) for call in calls]
+            results = iter(self._dispatch(session, [c for chunk in chunks for c in chunk]))
+
+            return [stitch([next(results) for c in chunk]) for chunk in chunks]
+
+    def _dispatch(self, session, calls):
+        self._count_calls(len(calls))
+
+        if self._concurrency <= 1 or len(calls) <= 1 or not self._use_session:
+            return [session.method(call[0])(*call[1:]) for call in calls]
+
+        with self._lock:
+            if self._workers is None:
+                self._workers = ThreadPool(self._concurrency)
+            workers = self._workers
+
+        return workers.map(session.worker_call, calls)
+
+    def _flush_batch(self):
+        """Send the setter calls collected by batch(), one call per method"""
+        calls = merge_calls(self._local.batch)
+        del self._local.batch[:]
+        if not calls:
+            return
+
+        # The queued setters ran with a writable folder, see f5.util.lbwriter.
+        # They're sent one after another, on the transaction's session, in
+        # the order they were first used: later ones may depend on earlier
+        # ones.
+        with self._checkout() as session:
+            folder = session.active_folder
+            if folder == '/':
+                session.active_folder = '/Common'
+            try:
+                for call in calls:
+                    self._call_many([call])
+            finally:
+                session.active_folder = folder
+
+    def _after_batch(self, func):
+        """Call func once the batch() of this thread is sent (and submitted),
+        right away outside of a batch"""
+        done = getattr(self._local, 'batch_done', None)
+        if done is None:
+            func()
+        else:
+            done.append(func)
+
+    # iControl calls (not counting session housekeeping) made by this thread,
+    # for reporting the cost of an operation
+    def _count_calls(self, count):
+        self._local.calls = getattr(self._local, 'calls', 0) + count
+
+    def _calls_made(self):
+        return getattr(self._local, 'calls', 0)
+
+    def _iter_chunk_size(self, chunk_size):
+        if chunk_size is not None:
+            return chunk_size
+        return self._chunk_size or 1000
+
+    def _recursive_iter(self, iterator):
+        """Yields from iterator, every step (and so the fetch of every chunk)
+        in recursive mode like a recursivereader. The caller's session values
+        are back in place whenever we yield."""
+        step = recursivereader(lambda self: next(iterator, _END))
+        while True:
+            item = step(self)
+            if item is _END:
+                return
+            yield item
+
+    def _interface(self, name):
+        """Returns an object that routes calls on interface 'name' through us,
+        shared by all objects that use it"""
+        interface = self._interfaces.get(name)
+        if interface is None:
+            interface = self._interfaces.setdefault(name, Interface(self, name))
+        return interface
 
     ###########################################################################
     # Properties
@@ -122,21 +506,112 @@ class Lb(object):
     def verify(self):
         return self._verify
 
+    @property
+    def wsdl_cache(self):
+        return self._wsdl_cache
+
+    @property
+    def pool_size(self):
+        return self._pool_size
+
+    @property
+    def session_max_idle(self):
+        return self._session_max_idle
+
+    #### verify_transactions ####
+    @property
+    def verify_transactions(self):
+        return self._verify_transactions
+
+    @verify_transactions.setter
+    def verify_transactions(self, value):
+        self._verify_transactions = value
+
+    #### sessions ####
+    # The session pool, None until connected
+    @property
+    def sessions(self):
+        return self._sessions
+
+    #### cache ####
+    # The attribute cache (hits, misses, invalidate()), None if disabled
+    @property
+    def cache(self):
+        return self._cache
+
+    #### chunk_size ####
+    # Maximum number of objects per iControl call, None disables chunking
+    @property
+    def chunk_size(self):
+        return self._chunk_size
+
+    @chunk_size.setter
+    def chunk_size(self, value):
+        if value is not None and value < 1:
+            raise ValueError('chunk_size must be None or 1 or higher, not %s' % (value))
+        self._chunk_size = value
+
+    #### concurrency ####
+    @property
+    def concurrency(self):
+        return self._concurrency
+
+    @concurrency.setter
+    def concurrency(self, value):
+        if value < 1:
+            raise ValueError('concurrency must be 1 or higher, not %s' % (value))
+
+        with self._lock:
+            if self._workers is not None:
+                self._workers.close()
+                self._workers = None
+            self._concurrency = value
+
     #### active_folder ####
+    # Fetched once, after that we track it ourselves. Changes are sent to the
+    # device just before the next call that needs it. Inside an operation this
+    # is the folder of its session, outside it's the folder every operation
+    # starts out with.
     @property
     def active_folder(self):
-        self._active_folder = self._get_active_folder()
-        return self._active_folder
+        session = self._session()
+        if session is None:
+            if self._active_folder is None:
+                with self._checkout():
+                    return self.active_folder
+            return self._active_folder
+
+        if session.active_folder is None:
+            if session.device_active_folder is None:
+                session.device_active_folder = self._get_active_folder()
+            session.active_folder = session.device_active_folder
+
+            if self._active_folder is None:
+                self._active_folder = session.active_folder
+
+        return session.active_folder
 
     @active_folder.setter
     def active_folder(self, value):
-        self._set_active_folder(value)
-        self._active_folder =  value
+        session = self._session()
+        if session is None:
+            self._active_folder = value
+        else:
+            session.active_folder = value
 
     #### version
     @property
     def version(self):
-        return self._call('System.SystemInfo.get_version')
+        if self._device_version is None:
+            self._device_version = self._call('System.SystemInfo.get_version')
+        return self._device_version
+
+    #### timings ####
+    # Seconds spent getting a session, checking the version and loading the
+    # wsdl of every interface used so far.
+    @property
+    def timings(self):
+        return dict(self._timings)
 
     #### system_information
     @property
@@ -156,62 +631,124 @@ class Lb(object):
         return self._failover_state
 
     #### recursive_query ####
+    # Tracked like active_folder
     @property
     def recursive_query(self):
-        recursive_query_state = self._get_recursive_query_state()
-        if recursive_query_state == 'STATE_ENABLED':
-            self._recursive_query =  True
-        elif recursive_query_state == 'STATE_DISABLED':
-            self._recursive_query =  False
-        else:
-            raise RuntimeError('Unknown status %s received for recursive_query_state') % (recursive_query_state)
+        session = self._session()
+        if session is None:
+            if self._recursive_query is None:
+                with self._checkout():
+                    return self.recursive_query
+            return self._recursive_query
+
+        if session.recursive_query is not None:
+            return session.recursive_query
+
+        if session.device_recursive_query is None:
+            recursive_query_state = self._get_recursive_query_state()
+            if recursive_query_state == 'STATE_ENABLED':
+                session.device_recursive_query = True
+            elif recursive_query_state == 'STATE_DISABLED':
+                session.device_recursive_query = False
+            else:
+                raise RuntimeError('Unknown status %s received for recursive_query_state' % (recursive_query_state))
 
-        return self._recursive_query
+        session.recursive_query = session.device_recursive_query
+        if self._recursive_query is None:
+            self._recursive_query = session.recursive_query
+
+        return session.recursive_query
 
     @recursive_query.setter
     def recursive_query(self, value):
-        if value == True:
-            recursive_query_state = 'STATE_ENABLED'
-        elif value == False:
-            recursive_query_state = 'STATE_DISABLED'
-        else:
+        if value not in (True, False):
             raise ValueError('recursive_query must be one of True/False, not %s' % (value))
 
-        self._set_recursive_query_state(recursive_query_state)
-        self._recursive_query = value
+        session = self._session()
+        if session is None:
+            self._recursive_query = bool(value)
+        else:
+            session.recursive_query = bool(value)
 
     #### transaction ####
+    # Of the session this thread holds (or would get). Tracked per session,
+    # the device is only asked when the state is unknown (None, e.g. after a
+    # failed call) or verify_transactions is set.
     @property
     def transaction(self):
-        self._transaction = self._active_transaction()
-        return self._transaction
+        with self._checkout() as session:
+            if session.transaction is None or self._verify_transactions:
+                session.transaction = self._active_transaction()
+            return session.transaction
 
     @transaction.setter
     def transaction(self,value):
-        if value == True:
-            self._ensure_transaction()
-            self._transaction = True
-        elif value == False:
-            self._ensure_no_transaction()
-            self._transaction = False
+        with self._checkout() as session:
+            if value == True:
+                if session.transaction is not True or self._verify_transactions:
+                    session.transaction = None
+                    self._ensure_transaction()
+                session.transaction = True
+            elif value == False:
+                if session.transaction is not False or self._verify_transactions:
+                    session.transaction = None
+                    self._ensure_no_transaction()
+                session.transaction = False
+                if self._cache is not None:
+                    self._cache.invalidate()
 
     #### transaction_timeout ####
+    # Sent to every session that starts a transaction
     @property
     def transaction_timeout(self):
-        self._transaction_timeout = self._get_transaction_timeout()
+        if self._transaction_timeout is None:
+            with self._checkout() as session:
+                session.device_transaction_timeout = self._get_transaction_timeout()
+                self._transaction_timeout = session.device_transaction_timeout
         return self._transaction_timeout
 
     @transaction_timeout.setter
     def transaction_timeout(self, value):
-        self._set_transaction_timeout(value)
+        with self._checkout() as session:
+            self._set_transaction_timeout(value)
+            session.device_transaction_timeout = value
         self._transaction_timeout = value
 
     ###########################################################################
     # INTERNAL API
     ###########################################################################
     #### Session methods ####
+    # These talk to the session's client directly, _call would sync the
+    # session first.
+    def _sync_session(self, session):
+        """Send session attributes that changed since the last call"""
+        if (session.active_folder is not None
+                and session.active_folder != session.device_active_folder):
+            try:
+                self._set_active_folder(session.active_folder)
+            except:
+                # Don't let a bad folder break every call that follows
+                session.active_folder = session.device_active_folder
+                if self._active_folder == session.active_folder:
+                    self._active_folder = session.device_active_folder
+                raise
+            session.device_active_folder = session.active_folder
+
+        if (session.recursive_query is not None
+                and session.recursive_query != session.device_recursive_query):
+            if session.recursive_query:
+                self._set_recursive_query_state('STATE_ENABLED')
+            else:
+                self._set_recursive_query_state('STATE_DISABLED')
+            session.device_recursive_query = session.recursive_query
+
+        if (self._transaction_timeout is not None
+                and self._transaction_timeout != session.device_transaction_timeout):
+            self._set_transaction_timeout(self._transaction_timeout)
+            session.device_transaction_timeout = self._transaction_timeout
+
     def _ensure_transaction(self):
-        wsdl = self._transport.System.Session
+        wsdl = self._client('System.Session')
         try:
             wsdl.start_transaction()
         except ServerError as e:
@@ -221,7 +758,7 @@ class Lb(object):
                 raise
 
     def _ensure_no_transaction(self):
-        wsdl = self._transport.System.Session
+        wsdl = self._client('System.Session')
         try:
             wsdl.rollback_transaction()
         except ServerError as e:
@@ -233,25 +770,38 @@ class Lb(object):
             raise
 
     def _submit_transaction(self):
-        wsdl = self._transport.System.Session
-        wsdl.submit_transaction()
+        with self._checkout() as session:
+            wsdl = self._client('System.Session')
+            try:
+                wsdl.submit_transaction()
+                session.transaction = False
+            finally:
+                if self._cache is not None:
+                    self._cache.invalidate()
 
     def _rollback_transaction(self):
-        wsdl = self._transport.System.Session
-        wsdl.rollback_transaction()
+        with self._checkout() as session:
+            wsdl = self._client('System.Session')
+            try:
+                wsdl.rollback_transaction()
+                session.transaction = False
+            finally:
+                if self._cache is not None:
+                    self._cache.invalidate()
 
     def _get_transaction_timeout(self):
-        wsdl = self._transport.System.Session
+        wsdl = self._client('System.Session')
         return wsdl.get_transaction_timeout()
 
     def _set_transaction_timeout(self, value):
-        wsdl = self._transport.System.Session
+        wsdl = self._client('System.Session')
         wsdl.set_transaction_timeout(value)
 
     # Currently the only way of finding out if there's an active transaction
-    # is to actually try starting another one :/
+    # is to actually try starting another one :/ (So we only do this when we
+    # lost track, see transaction.)
     def _active_transaction(self):
-        wsdl = self._transport.System.Session
+        wsdl = self._client('System.Session')
         try:
             wsdl.start_transaction()
         except ServerError as e:
@@ -264,19 +814,19 @@ class Lb(object):
         return False
 
     def _get_active_folder(self):
-        wsdl = self._transport.System.Session
+        wsdl = self._client('System.Session')
         return wsdl.get_active_folder()
 
     def _set_active_folder(self, folder):
-        wsdl = self._transport.System.Session
+        wsdl = self._client('System.Session')
         return wsdl.set_active_folder(folder)
 
     def _get_recursive_query_state(self):
-        wsdl = self._transport.System.Session
+        wsdl = self._client('System.Session')
         return wsdl.get_recursive_query_state()
 
     def _set_recursive_query_state(self, state):
-        wsdl = self._transport.System.Session
+        wsdl = self._client('System.Session')
         wsdl.set_recursive_query_state(state)
 
     ###########################################################################
@@ -284,7 +834,110 @@ class Lb(object):
     ###########################################################################
     def submit_transaction(self):
         self._submit_transaction()
+
+    @contextmanager
+    def batch(self):
+        """Collect the setter calls of all objects (e.g. pm.ratio = 10) made
+        in this block and send them as one bulk call per method, in a single
+        transaction, when the block ends.
+
+        Getters in the block still see the values from before the block.
+        Other writes (create, delete, ...) are sent when they are made, after
+        the setters collected until then. Joins an open transaction (and
+        leaves it open), nested batches join the outer one.
+        """
+        if getattr(self._local, 'batch', None) is not None:
+            yield self
+            return
+
+        with self._checkout():
+            our_transaction = not self.transaction
+            if our_transaction:
+                self.transaction = True
+
+            self._local.batch      = []
+            self._local.batch_done = []
+            try:
+                yield self
+                self._flush_batch()
+            except:
+                self._local.batch      = None
+                self._local.batch_done = None
+                if our_transaction:
+                    try:
+                        self.transaction = False
+                    except Exception:
+                        pass
+                raise
+
+            self._local.batch = None
+            done, self._local.batch_done = self._local.batch_done, None
+            if our_transaction:
+                self._submit_transaction()
+
+            for func in done:
+                func()
+
+    def refresh_many(self, objects):
+        """Update all attributes of a mixed list of F5 objects from this lb,
+        with one call per attribute for all objects of a type"""
+        groups = {}
+        for obj in objects:
+            if not hasattr(obj, '_refresh_objects'):
+                raise ValueError('cannot refresh objects of type %s' % (type(obj).__name__))
+            groups.setdefault(type(obj), []).append(obj)
+
+        with self._checkout():
+            for Klass, group in groups.items():
+                Klass._refresh_objects(self, group)
     
+    def topology(self, virtualservers=True):
+        """Returns an f5.Topology of which pools use which nodes (and which
+        virtualservers use which pools, with virtualservers)"""
+        return f5.Topology(self, virtualservers)
+
+    @recursivereader
+    def snapshot(self):
+        """Returns an f5.Snapshot of all nodes, pools, poolmembers,
+        virtualservers and rules on the lb"""
+        return f5.Snapshot._take(self)
+
+    @recursivereader
+    def _get_topology(self, pools=None, virtualservers=None):
+        """Fetches what f5.Topology is built from: the member lists of pools
+        and the default pools of virtualservers (all of them if None, those
+        still on the lb otherwise), as (pools, addrportsq2, virtualservers,
+        default_pools)"""
+        calls = []
+        if pools != []:
+            calls.append(('LocalLB.Pool.get_list',))
+        if virtualservers != []:
+            calls.append(('LocalLB.VirtualServer.get_list',))
+        results = iter(self._call_many(calls))
+
+        if pools != []:
+            pool_list = next(results)
+            if pools is not None:
+                pool_list = [pool for pool in pools if pool in set(pool_list)]
+            pools = pool_list
+        if virtualservers != []:
+            vs_list = next(results)
+            if virtualservers is not None:
+                vs_list = [vs for vs in virtualservers if vs in set(vs_list)]
+            virtualservers = vs_list
+
+        calls = []
+        if pools:
+            calls.append(('LocalLB.Pool.get_member_v2', pools))
+        if virtualservers:
+            calls.append(('LocalLB.VirtualServer.get_default_pool_name', virtualservers))
+        results = iter(self._call_many(calls))
+
+        addrportsq2   = next(results) if pools else []
+        default_pools = next(results) if virtualservers else []
+
+        return pools, addrportsq2, virtualservers, default_pools
+
     def pool_get(self, name):
         """Returns a single F5 pool"""
         try:
@@ -303,6 +956,12 @@ class Lb(object):
         """Returns a list of F5 Pools, takes optional pattern"""
         return f5.Pool._get(self, pattern, minimal)
 
+    @recursivereader
+    def iter_pools(self, pattern=None, chunk_size=None, minimal=False):
+        """Returns a generator of F5 Pools, fetched chunk_size at a time"""
+        return self._recursive_iter(f5.Pool._iter(self, pattern,
+                self._iter_chunk_size(chunk_size), minimal))
+
     def pm_get(self, node, port, pool):
         """Returns a single F5 PoolMember"""
         try:
@@ -321,6 +980,12 @@ class Lb(object):
         """Returns a list of F5 PoolMembers, takes optional list of pools and pattern"""
         return f5.PoolMember._get(self, pools, pattern, minimal)
 
+    @recursivereader
+    def iter_pms(self, pools=None, pattern=None, chunk_size=None, minimal=False):
+        """Returns a generator of F5 PoolMembers, fetched about chunk_size at a time"""
+        return self._recursive_iter(f5.PoolMember._iter(self, pools, pattern,
+                self._iter_chunk_size(chunk_size), minimal))
+
     def node_get(self, name):
         """Returns a single F5 Node"""
         try:
@@ -339,6 +1004,12 @@ class Lb(object):
         """Returns a list of F5 Nodes, takes optional list of pools and pattern"""
         return f5.NodeList(self, pattern, partition, minimal)
 
+    @recursivereader
+    def iter_nodes(self, pattern=None, chunk_size=None, minimal=False):
+        """Returns a generator of F5 Nodes, fetched chunk_size at a time"""
+        return self._recursive_iter(f5.Node._iter(self, pattern,
+                self._iter_chunk_size(chunk_size), minimal))
+
     def rule_get(self, name):
         """Returns a single F5 Rule"""
         try:
@@ -378,22 +1049,23 @@ class Lb(object):
     @recursivereader
     def pools_get_vs(self, pools=None, minimal=False):
         """Returns VirtualServers associated with a list of Pools"""
+        # Which virtualservers use which pools takes a few bulk calls, only
+        # those are fetched
+        topology = self.topology()
         if pools is None:
-            pools = f5.Pool._get_list(self)
+            pools = topology.pools
         else:
-            if isinstance(pools[0], f5.Pool):
-                pools = [pool.name for pool in pools]
-
-        result = {pool: [] for pool in pools}
+            pools = [str(pool) for pool in pools]
 
-        vss = f5.VirtualServer._get(self, minimal=minimal)
-        if minimal is True:
-            vss = f5.VirtualServer._refresh_default_pool(self, vss)
+        names = dict((pool, topology.pool_virtualservers(pool)) for pool in pools)
+        vss   = iter(f5.VirtualServer._get_objects(self,
+                [vs for pool in pools for vs in names[pool]], minimal))
 
+        result = {}
         for pool in pools:
-            for vs in vss:
-                print(vs._default_pool)
-                if pool == vs._default_pool.name:
-                    result[pool].append(vs)
+            result[pool] = [next(vss) for vs in names[pool]]
+            if minimal is True:
+                for vs in result[pool]:
+                    vs._default_pool = f5.Pool.factory.create([pool], self)[0]
 
         return result
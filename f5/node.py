@@ -1,8 +1,10 @@
 import f5
 import f5.util
 import re
+import time
+import weakref
 
-from .exceptions import NodeNotFound
+from .exceptions import DrainTimeout, NodeNotFound
 
 from bigsuds import ServerError
 
@@ -21,10 +23,32 @@ def munge_av_status(av_statuses):
     return [a[20:] for a in av_statuses]
 
 
+def status_attributes(object_statuses):
+    """Split get_object_status results into av_status, enabled and status_descr"""
+    return (f5.util.shared(munge_av_status([s['availability_status'] for s in object_statuses])),
+            enabled_bool([s['enabled_status'] for s in object_statuses]),
+            f5.util.shared([s['status_description'] for s in object_statuses]))
+
+
 class Node(object):
     __version = 11
     __wsdl = 'LocalLB.NodeAddressV2'
 
+    # Local attributes compared by incremental refreshes, and those that
+    # change without anyone writing them
+    _attributes = ('_address', '_av_status', '_connection_limit', '_description',
+            '_dynamic_ratio', '_enabled', '_rate_limit', '_ratio', '_status_descr')
+    _volatile_attributes = ('_av_status', '_enabled', '_status_descr')
+
+    # Local attributes save() pushes to the lb
+    _writable = ('_connection_limit', '_description', '_dynamic_ratio', '_enabled',
+            '_rate_limit', '_ratio')
+
+    # There can be many, no __dict__
+    __slots__ = ('__name', '_lb', '_address', '_av_status', '_connection_limit',
+            '_description', '_dynamic_ratio', '_enabled', '_rate_limit', '_ratio',
+            '_status_descr', '_clean', '__weakref__')
+
     def __init__(self, name, lb=None, address=None, connection_limit=None, description=None,
             dynamic_ratio=None, enabled=None, rate_limit=None, ratio=None, fromdict=None):
 
@@ -47,22 +71,31 @@ class Node(object):
             self._ratio            = ratio
             self._status_descr     = None
 
-        self._lbcall = self.__lbcall
-
     def __repr__(self):
         return "f5.Node('%s')" % (self.name)
 
     def __str__(self):
         return self._name
 
-    # This just adds the wsdl to calls to the lb for convenience
-    def __lbcall(self, call, *args, **kwargs):
-        return self.lb._call(self.__wsdl + '.' + call, *args, **kwargs)
-
-    @classmethod
+    # av_status, enabled and status_descr all come from get_object_status,
+    # fetching any of them updates all three.
+    def _refresh_status(self):
+        (self._av_status, self._enabled, self._status_descr) = [
+                values[0] for values in status_attributes(
+                    self._lbcall('get_object_status', [self._name]))]
+        f5.util.mark_clean([self], ['_enabled'])
+
+    # This just adds the wsdl to calls to the lb for convenience, on a node
+    # it's called without the lb
+    @f5.util.lbcall
     def _lbcall(cls, lb, call, *args, **kwargs):
         return lb._call(cls.__wsdl + '.' + call, *args, **kwargs)
 
+    # Independent calls, possibly performed in parallel by the lb
+    @classmethod
+    def _lbcall_many(cls, lb, calls):
+        return lb._call_many([(cls.__wsdl + '.' + c[0],) + c[1:] for c in calls])
+
     ###########################################################################
     # Properties
     ###########################################################################
@@ -104,14 +137,14 @@ class Node(object):
     #### AV_STATUS ####
     @property
     def av_status(self):
-        self._av_status = munge_av_status(
-                [s['availability_status'] for s in self._lbcall('get_object_status', [self.name])])[0]
+        self._refresh_status()
         return self._av_status
 
     #### CONNECTION_LIMIT ####
     @property
     def connection_limit(self):
         self._connection_limit = self._lbcall('get_connection_limit', [self.name])[0]
+        f5.util.mark_clean([self], ['_connection_limit'])
         return self._connection_limit
 
     @connection_limit.setter
@@ -119,11 +152,13 @@ class Node(object):
     def connection_limit(self, value):
         self._lbcall('set_connection_limit', [self.name], [value])
         self._connection_limit = value
+        f5.util.mark_saved([self], ['_connection_limit'])
 
     #### DESCRIPTION ####
     @property
     def description(self):
         self._description = self._lbcall('get_description', [self._name])[0]
+        f5.util.mark_clean([self], ['_description'])
         return self._description
 
     @description.setter
@@ -131,24 +166,27 @@ class Node(object):
     def description(self, value):
         self._lbcall('set_description', [self.name], [value])
         self._description = value
+        f5.util.mark_saved([self], ['_description'])
 
     #### DYNAMIC_RATIO ####
     @property
     def dynamic_ratio(self):
         self._dynamic_ratio = self._lbcall('get_dynamic_ratio_v2', [self.name])[0]
+        f5.util.mark_clean([self], ['_dynamic_ratio'])
         return self._dynamic_ratio
 
     @dynamic_ratio.setter
     @f5.util.lbwriter2
     def dynamic_ratio(self, value):
         self._lbcall('set_dynamic_ratio_v2', [self.name], [value])
-        self._description = value
+        self._dynamic_ratio = value
+        f5.util.mark_saved([self], ['_dynamic_ratio'])
 
     #### ENABLED ####
     # We do a little fancy stuff here, munging the internal (f5) enabled status to a bool and back.
     @property
     def enabled(self):
-        self._enabled = enabled_bool([s['enabled_status'] for s in self._lbcall('get_object_status', [self.name])])[0]
+        self._refresh_status()
         return self._enabled
 
     @enabled.setter
@@ -156,11 +194,13 @@ class Node(object):
     def enabled(self, value):
         self._lbcall('set_session_enabled_state', [self.name], bool_enabled([value]))
         self._enabled = value
+        f5.util.mark_saved([self], ['_enabled'])
 
     #### RATE_LIMIT ####
     @property
     def rate_limit(self):
         self._rate_limit = self._lbcall('get_rate_limit', [self.name])[0]
+        f5.util.mark_clean([self], ['_rate_limit'])
         return self._rate_limit
 
     @rate_limit.setter
@@ -168,11 +208,13 @@ class Node(object):
     def rate_limit(self, value):
         self._lbcall('set_rate_limit', [self.name], [value])
         self._rate_limit = value
+        f5.util.mark_saved([self], ['_rate_limit'])
 
     #### RATIO ####
     @property
     def ratio(self):
         self._ratio = self._lbcall('get_ratio', [self.name])[0]
+        f5.util.mark_clean([self], ['_ratio'])
         return self._ratio
 
     @ratio.setter
@@ -180,11 +222,12 @@ class Node(object):
     def ratio(self, value):
         self._lbcall('set_ratio', [self.name], [value])
         self._ratio = value
+        f5.util.mark_saved([self], ['_ratio'])
 
     #### STATUS_DESCR ####
     @property
     def status_descr(self):
-        self._status_descr = self._lbcall('get_object_status', [self.name])[0]['status_description']
+        self._refresh_status()
         return self._status_descr
 
     @property
@@ -198,10 +241,10 @@ class Node(object):
         d['connection_limit'] = self.connection_limit
         d['description']      = self.description
         d['dynamic_ratio']    = self.dynamic_ratio
-        d['enabled']          = self.enabled
+        d['enabled']          = self._enabled
         d['rate_limit']       = self.rate_limit
         d['ratio']            = self.ratio
-        d['status_descr']     = self.status_descr
+        d['status_descr']     = self._status_descr
 
         return d
 
@@ -260,45 +303,102 @@ class Node(object):
         if not names:
             return []
 
-        if not minimal:
-            address          = cls._lbcall(lb, 'get_address', names)
-            connection_limit = cls._lbcall(lb, 'get_connection_limit', names)
-            object_status    = cls._lbcall(lb, 'get_object_status', names)
-            av_status        = munge_av_status([s['availability_status'] for s in object_status])
-            enabled          = enabled_bool([s['enabled_status'] for s in object_status])
-            description      = cls._lbcall(lb, 'get_description', names)
-            dynamic_ratio    = cls._lbcall(lb, 'get_dynamic_ratio', names)
-            rate_limit       = cls._lbcall(lb, 'get_rate_limit', names)
-            ratio            = cls._lbcall(lb, 'get_ratio', names)
-
         nodes = cls.factory.create(names, lb)
         if not minimal:
-            for idx, node in enumerate(nodes):
-                node._address          = address[idx]
-                node._av_status        = av_status[idx]
-                node._connection_limit = connection_limit[idx]
-                node._enabled          = enabled[idx]
-                node._description      = description[idx]
-                node._dynamic_ratio    = dynamic_ratio[idx]
-                node._rate_limit       = rate_limit[idx]
-                node._ratio            = ratio[idx]
-                node._status_descr     = object_status[idx]['status_description']
+            cls._refresh_objects(lb, nodes)
 
         return nodes
 
     @classmethod
-    def _get(cls, lb, pattern=None, minimal=False):
-        names = cls._lbcall(lb, 'get_list')
+    def _refresh_objects(cls, lb, nodes):
+        """Updates all attributes of a list of nodes, one call per attribute"""
+        cls._apply_refresh(lb, nodes, lb._call_many(cls._refresh_calls(nodes)))
 
-        if not names:
-            return []
+    # Split into the calls and the handling of their results, so the calls
+    # for many types can be made at once (see f5.snapshot)
+    @classmethod
+    def _refresh_calls(cls, nodes):
+        return cls._refresh_name_calls([node._name for node in nodes])
+
+    # The same by name, for lists that don't keep Node objects (see
+    # ColumnarNodeList)
+    @classmethod
+    def _refresh_name_calls(cls, names):
+        return [(cls.__wsdl + '.' + call, names) for call in [
+            'get_address',
+            'get_connection_limit',
+            'get_object_status',
+            'get_description',
+            'get_dynamic_ratio',
+            'get_rate_limit',
+            'get_ratio',
+        ]]
+
+    @classmethod
+    def _apply_refresh(cls, lb, nodes, results):
+        for attr, values in cls._refresh_columns(results).items():
+            for node, value in zip(nodes, values):
+                setattr(node, attr, value)
+
+        f5.util.mark_clean(nodes, cls._writable)
 
-        if pattern is not None:
-            if not isinstance(pattern, re._pattern_type):
-                pattern = re.compile(pattern)
+    @classmethod
+    def _refresh_columns(cls, results):
+        """Returns {attribute: values} from the results of _refresh_calls"""
+        (address, connection_limit, object_status, description,
+            dynamic_ratio, rate_limit, ratio) = results
+        av_status, enabled, status_descr = status_attributes(object_status)
+
+        return {
+            '_address'          : address,
+            '_av_status'        : av_status,
+            '_connection_limit' : connection_limit,
+            '_description'      : description,
+            '_dynamic_ratio'    : dynamic_ratio,
+            '_enabled'          : enabled,
+            '_rate_limit'       : rate_limit,
+            '_ratio'            : ratio,
+            '_status_descr'     : status_descr,
+        }
+
+    @classmethod
+    def _refresh_volatile(cls, lb, nodes):
+        """Updates the status attributes of a list of nodes"""
+        av_status, enabled, status_descr = status_attributes(
+                cls._lbcall(lb, 'get_object_status', [node._name for node in nodes]))
+
+        for idx, node in enumerate(nodes):
+            node._av_status    = av_status[idx]
+            node._enabled      = enabled[idx]
+            node._status_descr = status_descr[idx]
+
+        f5.util.mark_clean(nodes, ['_enabled'])
+
+    @classmethod
+    def _get_names(cls, lb, pattern=None):
+        names = cls._lbcall(lb, 'get_list')
+
+        if names and pattern is not None:
+            pattern = re.compile(pattern)
             names = [name for name in names if pattern.match(name)]
 
-        return cls._get_objects(lb, names, minimal)
+        return names
+
+    @classmethod
+    def _get(cls, lb, pattern=None, minimal=False):
+        return cls._get_objects(lb, cls._get_names(lb, pattern), minimal)
+
+    @classmethod
+    def _iter(cls, lb, pattern=None, chunk_size=1000, minimal=False):
+        """Fetches the names right away, returns a generator that fetches
+        the objects chunk_size at a time"""
+        return cls._iter_objects(lb, cls._get_names(lb, pattern), chunk_size, minimal)
+
+    @classmethod
+    def _iter_objects(cls, lb, names, chunk_size, minimal=False):
+        for chunk in f5.util.chunks(names, chunk_size):
+            for node in cls._get_objects(lb, chunk, minimal):
+                yield node
 
     ###########################################################################
     # Public API
@@ -316,52 +416,108 @@ class Node(object):
 
         return True
 
-    @f5.util.lbtransaction
     def save(self):
-        """Save the node to the lb"""
-        if not self.exists():
-            if self._address is None or self._connection_limit is None:
-                raise RuntimeError('address and connection_limit must be set on create')
-            self._lbcall('create', [self._name], [self._address], [self._connection_limit])
-        elif self._connection_limit is not None:
-            self.connection_limit = self._connection_limit
-
-        if self._description is not None:
-            self.description = self._description
-        if self._dynamic_ratio is not None:
-            self.dynamic_ratio = self._dynamic_ratio
-        if self._enabled is not None:
-            self.enabled = self._enabled
-        if self._rate_limit is not None:
-            self.rate_limit = self._rate_limit
-        if self._ratio is not None:
-            self.ratio = self._ratio
+        """Save the node to the lb
+
+        A node loaded from the lb only pushes the attributes that changed
+        since, without checking if it exists.
+        """
+        changed = f5.util.dirty(self, self._writable)
+        if changed != []:
+            self._save(changed)
+
+    @f5.util.lbtransaction
+    def _save(self, changed=None):
+        # We don't know what's on the lb, push everything that's set
+        if changed is None:
+            changed = [a for a in self._writable if getattr(self, a) is not None]
+
+            if not self.exists():
+                if self._address is None or self._connection_limit is None:
+                    raise RuntimeError('address and connection_limit must be set on create')
+                self._lbcall('create', [self._name], [self._address], [self._connection_limit])
+                changed.remove('_connection_limit')
+
+        for attr in changed:
+            setattr(self, attr[1:], getattr(self, attr))
+
+        f5.util.mark_saved([self], self._writable)
 
     def refresh(self):
         """Update all attributes from the lb"""
-        self.address
-        self.av_status
-        self.connection_limit
-        self.description
-        self.dynamic_ratio
-        self.enabled
-        self.rate_limit
-        self.ratio
-        self.status_descr
+        self._refresh_objects(self.lb, [self])
 
     @f5.util.lbwriter2
     def delete(self, force=False):
         """Delete the node from the lb"""
         if force is True:
             # Delete all associated poolmembers
-            # Replace this with a PoolMemberList when ready.
-            for pm in self.lb.pms_get(pattern='^%s:[0-9]+$' % self.name, minimal=True):
-                pm.delete()
+            f5.PoolMemberList(self.lb, pattern='^%s:[0-9]+$' % self.name, minimal=True).delete()
         self._lbcall('delete_node_address', [self._name])
 
+    def drain(self, wait=False, max_connections=0, timeout=300, interval=5, topology=None):
+        """Disable new sessions to the node in every pool it's a member of,
+        with one call for all pools. Returns the poolmembers (an
+        f5.PoolMemberList).
+
+        With wait, block until the poolmembers have at most max_connections
+        connections left, raises DrainTimeout after timeout seconds. Pass an
+        f5.Topology (lb.topology(virtualservers=False)) to drain many nodes
+        without fetching the pool member lists every time. Can't wait inside
+        an lb.batch(), the poolmembers are only disabled when it ends.
+        """
+        if wait and getattr(self._lb._local, 'batch', None) is not None:
+            raise RuntimeError('cannot wait for a drain inside a batch')
+
+        members = self._set_members_enabled(False, topology)
+
+        if wait and members:
+            start = time.time()
+            while True:
+                connections = sum(members.current_connections)
+                if connections <= max_connections:
+                    break
+                if time.time() - start >= timeout:
+                    raise DrainTimeout(self._name, connections, timeout)
+                time.sleep(interval)
+
+        return members
+
+    def undrain(self, topology=None):
+        """Enable the node again in every pool it's a member of"""
+        return self._set_members_enabled(True, topology)
+
+    @f5.util.lbmethod
+    def _set_members_enabled(self, value, topology=None):
+        if topology is None:
+            topology = self._lb.topology(virtualservers=False)
+
+        members = topology.node_members(self)
+        if members:
+            with self._lb.batch():
+                members.enabled = value
+
+        return members
+
 Node.factory = f5.util.CachedFactory(Node)
 
 
+# The sync() of NodeList and ColumnarNodeList
+@f5.util.lbtransaction
+def _sync(self, create=False):
+    if create is True:
+        self._lbcall('create', self.names, self._getattr('_address'),
+                self._getattr('_connection_limit'))
+    else:
+        self.connection_limit = self._getattr('_connection_limit')
+
+    self.description   = self._getattr('_description')
+    self.dynamic_ratio = self._getattr('_dynamic_ratio')
+    self.enabled       = self._getattr('_enabled')
+    self.rate_limit    = self._getattr('_rate_limit')
+    self.ratio         = self._getattr('_ratio')
+
+
 class NodeList(list):
     def __init__(self, lb=None, pattern=None, partition='/', minimal=False, fromdict=None):
         self._lb = lb
@@ -375,28 +531,32 @@ class NodeList(list):
             self.refresh()
 
     @f5.util.restore_session_values
-    def refresh(self):
+    def refresh(self, incremental=False, volatile_only=False):
+        """Fetch the list from the lb
+
+        With incremental only new nodes are fetched in full, nodes that are
+        gone are dropped and the rest is refreshed (only their status with
+        volatile_only). Returns an f5.util.ChangeSet of the nodes that were
+        added, removed and modified.
+        """
         self.lb.active_folder = self._partition
         if self._partition == '/':
             self.lb.recursive_query = True
 
-        nodes = Node._get(self._lb, self._pattern, self._minimal)
+        if incremental:
+            nodes, changes = f5.util.incremental_refresh(Node, self._lb, self,
+                    Node._get_names(self._lb, self._pattern), self._minimal,
+                    volatile_only)
+        else:
+            nodes = Node._get(self._lb, self._pattern, self._minimal)
+
         del self[:]
         self.extend(nodes)
 
-    @f5.util.lbtransaction
-    def sync(self, create=False):
-        if create is True:
-            self._lbcall('create', self.names, self._getattr('_address'),
-                    self._getattr('_connection_limit'))
-        else:
-            self.connection_limit = self._getattr('_connection_limit')
+        if incremental:
+            return changes
 
-        self.description   = self._getattr('_description')
-        self.dynamic_ratio = self._getattr('_dynamic_ratio')
-        self.enabled       = bool_enabled(self._getattr('_enabled'))
-        self.rate_limit    = self._getattr('_rate_limit')
-        self.ratio         = self._getattr('_ratio')
+    sync = _sync
 
     def _lbcall(self, call, *args, **kwargs):
         try:
@@ -409,7 +569,7 @@ class NodeList(list):
 
     def _setattr(self, attr, values):
         """Sets an attribute on all objects in list"""
-        if len(values) is not len(self):
+        if len(values) != len(self):
             raise ValueError('value must be of same length as list')
 
         for idx,node in enumerate(self):
@@ -418,6 +578,15 @@ class NodeList(list):
     def _getattr(self, attr):
         return [getattr(node, attr) for node in self]
 
+    # Like Node, av_status, enabled and status_descr are updated together
+    def _refresh_status(self):
+        av_status, enabled, status_descr = status_attributes(
+                self._lbcall('get_object_status', self.names))
+        self._setattr('_av_status', av_status)
+        self._setattr('_enabled', enabled)
+        self._setattr('_status_descr', status_descr)
+        f5.util.mark_clean(self, ['_enabled'])
+
     @property
     def partition(self):
         return self._partition
@@ -455,10 +624,8 @@ class NodeList(list):
     #### AV_STATUS ####
     @property
     def av_status(self):
-        values = munge_av_status(
-                [s['availability_status'] for s in self._lbcall('get_object_status', self.names)])
-        self._setattr('_av_status', values)
-        return values
+        self._refresh_status()
+        return self._av_status
 
     @property
     def _av_status(self):
@@ -469,6 +636,7 @@ class NodeList(list):
     def connection_limit(self):
         values = self._lbcall('get_connection_limit', self.names)
         self._setattr('_connection_limit',  values)
+        f5.util.mark_clean(self, ['_connection_limit'])
         return values
 
     @connection_limit.setter
@@ -477,6 +645,7 @@ class NodeList(list):
     def connection_limit(self, values):
         self._lbcall('set_connection_limit', self.names, values)
         self._setattr('_connection_limit', values)
+        f5.util.mark_saved(self, ['_connection_limit'])
 
     @property
     def _connection_limit(self):
@@ -492,6 +661,7 @@ class NodeList(list):
     def description(self):
         values = self._lbcall('get_description', self.names)
         self._setattr('_description', values)
+        f5.util.mark_clean(self, ['_description'])
         return values
 
     @description.setter
@@ -500,6 +670,7 @@ class NodeList(list):
     def description(self, values):
         self._lbcall('set_description', self.names, values)
         self._setattr('_description', values)
+        f5.util.mark_saved(self, ['_description'])
 
     @property
     def _description(self):
@@ -515,6 +686,7 @@ class NodeList(list):
     def dynamic_ratio(self):
         values = self._lbcall('get_dynamic_ratio', self.names)
         self._setattr('_dynamic_ratio', values)
+        f5.util.mark_clean(self, ['_dynamic_ratio'])
         return values
 
     @dynamic_ratio.setter
@@ -523,6 +695,7 @@ class NodeList(list):
     def dynamic_ratio(self, values):
         self._lbcall('set_dynamic_ratio', self.names, values)
         self._setattr('_dynamic_ratio', values)
+        f5.util.mark_saved(self, ['_dynamic_ratio'])
 
     @property
     def _dynamic_ratio(self):
@@ -536,9 +709,8 @@ class NodeList(list):
     ### ENABLED ###
     @property
     def enabled(self):
-        values = enabled_bool([s['enabled_status'] for s in self._lbcall('get_object_status', self.names)])
-        self._setattr('_enabled', values)
-        return values
+        self._refresh_status()
+        return self._enabled
      
     @enabled.setter
     @f5.util.multisetter
@@ -546,6 +718,7 @@ class NodeList(list):
     def enabled(self, values):
         self._lbcall('set_session_enabled_state', self.names, bool_enabled(values))
         self._setattr('_enabled', values)
+        f5.util.mark_saved(self, ['_enabled'])
 
     @property
     def _enabled(self):
@@ -586,6 +759,7 @@ class NodeList(list):
     def rate_limit(self):
         values = self._lbcall('get_rate_limit', self.names)
         self._setattr('_rate_limit', values)
+        f5.util.mark_clean(self, ['_rate_limit'])
         return values
 
     @rate_limit.setter
@@ -594,6 +768,7 @@ class NodeList(list):
     def rate_limit(self, values):
         self._lbcall('set_rate_limit', self.names, values)
         self._setattr('_rate_limit', values)
+        f5.util.mark_saved(self, ['_rate_limit'])
 
     @property
     def _rate_limit(self):
@@ -609,6 +784,7 @@ class NodeList(list):
     def ratio(self):
         values = self._lbcall('get_ratio', self.names)
         self._setattr('_ratio', values)
+        f5.util.mark_clean(self, ['_ratio'])
         return values
 
     @ratio.setter
@@ -617,6 +793,7 @@ class NodeList(list):
     def ratio(self, values):
         self._lbcall('set_ratio', self.names, values)
         self._setattr('_ratio', values)
+        f5.util.mark_saved(self, ['_ratio'])
 
     @property
     def _ratio(self):
@@ -630,9 +807,8 @@ class NodeList(list):
     #### STATUS_DESCR ####
     @property
     def status_descr(self):
-        values = [s['status_description'] for s in self._lbcall('get_object_status', self.names)]
-        self._setattr('_status_descr', values)
-        return values
+        self._refresh_status()
+        return self._status_descr
 
     @property
     def _status_descr(self):
@@ -646,15 +822,14 @@ class NodeList(list):
         d['partition'] = self.partition
         d['pattern']   = self.pattern
 
+        # av_status also updates enabled and status_descr
         self.address
         self.av_status
         self.connection_limit
         self.description
         self.dynamic_ratio
-        self.enabled
         self.rate_limit
         self.ratio
-        self.status_descr
 
         d['nodes'] =  [node._dictionary for node in self]
         
@@ -703,3 +878,355 @@ class NodeList(list):
 
         del self[:]
         self.extend(nodes)
+
+
+###########################################################################
+# Columnar list
+###########################################################################
+# ColumnarNodeList keeps one list per attribute instead of a Node object per
+# node, so bulk getters and setters just replace a column. Indexing and
+# iterating give Node views of its rows, made when they're asked for. Views
+# read and write the columns they were taken from, after a refresh take them
+# again.
+_COLUMNS = ('_name',) + Node._attributes
+
+# Clean values (see f5.util.mark_clean) of rows we don't know the lb values of
+_UNKNOWN = object()
+
+
+def _column(attr):
+    """Property of the attr column in the row of a view"""
+    def getter(self):
+        return self._columns[attr][self._idx]
+
+    def setter(self, value):
+        self._columns[attr][self._idx] = value
+
+    return property(getter, setter)
+
+
+class _NodeView(Node):
+    """A Node backed by a row of a ColumnarNodeList"""
+    __slots__ = ('_columns', '_idx')
+
+    def __init__(self, columns, idx, lb):
+        self._columns = columns
+        self._idx     = idx
+        self._lb      = lb
+
+    # Node keeps its name private, views aren't in the factory cache
+    _Node__name       = _column('_name')
+    _name             = _column('_name')
+
+    _address          = _column('_address')
+    _av_status        = _column('_av_status')
+    _connection_limit = _column('_connection_limit')
+    _description      = _column('_description')
+    _dynamic_ratio    = _column('_dynamic_ratio')
+    _enabled          = _column('_enabled')
+    _rate_limit       = _column('_rate_limit')
+    _ratio            = _column('_ratio')
+    _status_descr     = _column('_status_descr')
+
+    # A tuple in the order of Node._writable, like Node's
+    @property
+    def _clean(self):
+        clean = self._columns['_clean']
+        if clean is None:
+            return None
+
+        values = tuple(clean[attr][self._idx] for attr in Node._writable)
+        if all(value is _UNKNOWN for value in values):
+            return None
+
+        return tuple(None if value is _UNKNOWN else value for value in values)
+
+    @_clean.setter
+    def _clean(self, values):
+        if self._columns['_clean'] is None:
+            self._columns['_clean'] = _unknown_clean(len(self._columns['_name']))
+
+        clean = self._columns['_clean']
+        for attr, value in zip(Node._writable, values):
+            clean[attr][self._idx] = value
+
+
+def _unknown_clean(rows):
+    return dict((attr, [_UNKNOWN] * rows) for attr in Node._writable)
+
+
+class ColumnarNodeList(object):
+    """A NodeList that keeps one list per attribute instead of Node objects
+
+    Has the bulk attributes of NodeList, indexing and iterating give Node
+    views of the rows.
+    """
+    def __init__(self, lb=None, pattern=None, partition='/', minimal=False, fromdict=None):
+        self._lb        = lb
+        self._minimal   = minimal
+        self._partition = partition
+        self._pattern   = pattern
+
+        self._set_columns([])
+
+        if fromdict is not None:
+            self.dictionary = fromdict
+        elif lb is not None:
+            self.refresh()
+
+    def __repr__(self):
+        return 'f5.ColumnarNodeList(%s)' % (len(self))
+
+    def __len__(self):
+        return len(self._columns['_name'])
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self._view(idx)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self._view(i) for i in range(*idx.indices(len(self)))]
+
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError('list index out of range')
+
+        return self._view(idx)
+
+    @f5.util.restore_session_values
+    def refresh(self, incremental=False, volatile_only=False):
+        """Fetch the list from the lb, one call per attribute for all nodes
+
+        See NodeList.refresh for incremental, which here also fetches the
+        attributes of all nodes at once.
+        """
+        self.lb.active_folder = self._partition
+        if self._partition == '/':
+            self.lb.recursive_query = True
+
+        names = Node._get_names(self._lb, self._pattern)
+
+        if incremental:
+            return self._refresh_incremental(names, volatile_only)
+
+        if self._minimal:
+            self._set_columns(names)
+        else:
+            self._set_columns(names, *self._fetch(names))
+
+    sync = _sync
+
+    # Bulk attributes work on the columns just like NodeList's on its nodes
+    address           = NodeList.address
+    _address          = NodeList._address
+    av_status         = NodeList.av_status
+    _av_status        = NodeList._av_status
+    connection_limit  = NodeList.connection_limit
+    _connection_limit = NodeList._connection_limit
+    description       = NodeList.description
+    _description      = NodeList._description
+    dynamic_ratio     = NodeList.dynamic_ratio
+    _dynamic_ratio    = NodeList._dynamic_ratio
+    enabled           = NodeList.enabled
+    _enabled          = NodeList._enabled
+    rate_limit        = NodeList.rate_limit
+    _rate_limit       = NodeList._rate_limit
+    ratio             = NodeList.ratio
+    _ratio            = NodeList._ratio
+    status_descr      = NodeList.status_descr
+    _status_descr     = NodeList._status_descr
+
+    def _lbcall(self, call, *args, **kwargs):
+        try:
+            return Node._lbcall(self._lb, call, *args, **kwargs)
+        except ServerError as e:
+            if 'was not found.' in str(e):
+                raise NodeNotFound(*args)
+            else:
+                raise
+
+    def _setattr(self, attr, values):
+        """Replaces the column of an attribute"""
+        if len(values) != len(self):
+            raise ValueError('value must be of same length as list')
+
+        self._columns[attr] = self._column_values(attr, values)
+
+    def _getattr(self, attr):
+        return list(self._columns[attr])
+
+    def _refresh_status(self):
+        av_status, enabled, status_descr = status_attributes(
+                self._lbcall('get_object_status', self.names))
+        self._setattr('_av_status', av_status)
+        self._setattr('_enabled', enabled)
+        self._setattr('_status_descr', status_descr)
+        f5.util.mark_clean(self, ['_enabled'])
+
+    def _view(self, idx):
+        view = self._views.get(idx)
+        if view is None:
+            view = _NodeView(self._columns, idx, self._lb)
+            self._views[idx] = view
+
+        return view
+
+    def _set_columns(self, names, values=None, clean=None):
+        """Replace the rows, views taken before keep the old ones"""
+        values = values or {}
+
+        self._columns = dict((attr, self._column_values(attr, values[attr]) if attr in values
+            else [None] * len(names)) for attr in Node._attributes)
+        self._columns['_name']  = list(names)
+        self._columns['_clean'] = clean
+
+        self._views = weakref.WeakValueDictionary()
+
+    @staticmethod
+    def _column_values(attr, values):
+        if attr in Node._volatile_attributes:
+            return f5.util.shared(values)
+        return list(values)
+
+    def _fetch(self, names):
+        """Returns the attribute columns of names and their clean columns"""
+        if not names:
+            return {}, None
+
+        values = Node._refresh_columns(self._lb._call_many(Node._refresh_name_calls(names)))
+        return values, dict((attr, list(values[attr])) for attr in Node._writable)
+
+    def _refresh_incremental(self, names, volatile_only):
+        old     = self._columns
+        current = dict((name, idx) for idx, name in enumerate(old['_name']))
+        wanted  = set(names)
+
+        added   = [name for name in names if name not in current]
+        removed = [self._view(idx) for idx, name in enumerate(old['_name']) if name not in wanted]
+        kept    = [name for name in names if name in current]
+
+        added_idx = dict((name, idx) for idx, name in enumerate(added))
+
+        def merge(kept_values, added_values):
+            """Column of names from old rows (kept_values) and added rows"""
+            return [kept_values[current[name]] if name in current
+                    else added_values[added_idx[name]] for name in names]
+
+        old_clean = old['_clean'] or _unknown_clean(len(current))
+
+        if self._minimal:
+            values = dict((attr, merge(old[attr], [None] * len(added)))
+                    for attr in Node._attributes)
+            clean  = None
+            if old['_clean'] is not None:
+                clean = dict((attr, merge(old_clean[attr], [_UNKNOWN] * len(added)))
+                        for attr in Node._writable)
+
+        elif volatile_only:
+            added_values, added_clean = self._fetch(added)
+            if not added:
+                added_values = dict((attr, []) for attr in Node._attributes)
+                added_clean  = dict((attr, []) for attr in Node._writable)
+
+            # The status of kept nodes goes in their old rows
+            status = dict((attr, list(old[attr])) for attr in Node._volatile_attributes)
+            if kept:
+                for attr, values in zip(('_av_status', '_enabled', '_status_descr'),
+                        status_attributes(self._lbcall('get_object_status', kept))):
+                    for name, value in zip(kept, values):
+                        status[attr][current[name]] = value
+
+            old_clean = dict(old_clean, _enabled=status['_enabled'])
+
+            values = dict((attr, merge(status.get(attr, old[attr]), added_values[attr]))
+                    for attr in Node._attributes)
+            clean  = dict((attr, merge(old_clean[attr], added_clean[attr]))
+                    for attr in Node._writable)
+
+        else:
+            values, clean = self._fetch(names)
+
+        self._set_columns(names, values, clean)
+
+        attributes = Node._volatile_attributes if volatile_only else Node._attributes
+        modified   = []
+        if not self._minimal:
+            modified = [self._view(idx) for idx, name in enumerate(names) if name in current
+                    and any(old[attr][current[name]] != values[attr][idx] for attr in attributes)]
+
+        return f5.util.ChangeSet([self._view(idx) for idx, name in enumerate(names)
+            if name in added_idx], removed, modified)
+
+    #### LB ####
+    @property
+    def lb(self):
+        return self._lb
+
+    @lb.setter
+    def lb(self, value):
+        self._lb    = value
+        self._views = weakref.WeakValueDictionary()
+
+    @property
+    def partition(self):
+        return self._partition
+
+    @partition.setter
+    def partition(self, value):
+        self._partition = value
+        self.refresh()
+
+    @property
+    def pattern(self):
+        return self._pattern
+
+    @pattern.setter
+    def pattern(self, value):
+        self._pattern = value
+        self.refresh()
+
+    #### NAME ####
+    @property
+    def names(self):
+        return list(self._columns['_name'])
+
+    #### DICTIONARY ####
+    # The same form as NodeList's
+    @property
+    def dictionary(self):
+        values, clean = self._fetch(self.names)
+        self._columns.update(values)
+        self._columns['_clean'] = clean
+
+        return self._dictionary
+
+    @property
+    def _dictionary(self):
+        d = {}
+
+        d['lb']        = self.lb
+        d['partition'] = self.partition
+        d['pattern']   = self.pattern
+
+        fields = [attr[1:] for attr in _COLUMNS]
+        d['nodes'] = [dict(zip(fields, row), lb=self._lb)
+                for row in zip(*[self._columns[attr] for attr in _COLUMNS])]
+
+        return d
+
+    @dictionary.setter
+    def dictionary(self, _dict):
+        self._dictionary = _dict
+        self.sync()
+
+    @_dictionary.setter
+    def _dictionary(self, _dict):
+        self._lb        = _dict['lb']
+        self._partition = _dict['partition']
+        self._pattern   = _dict['pattern']
+
+        nodes = _dict['nodes']
+        self._set_columns([d['name'] for d in nodes],
+                dict((attr, [d[attr[1:]] for d in nodes]) for attr in Node._attributes))
@@ -10,6 +10,16 @@ def pms_to_addrportsq(poolmembers):
     return [{'address': p._node.name, 'port': p._port} for p in poolmembers]
 
 
+# The address, port dictionaries to remove from and add to a pool's current
+# members to get the ones it should have
+def diff_members(current, should):
+    key  = lambda m: (m['address'], m['port'])
+    keep = set(map(key, should))
+    have = set(map(key, current))
+    return ([m for m in current if key(m) not in keep],
+            [m for m in should if key(m) not in have])
+
+
 # Truncate lbmethod
 def munge_lbmethod(lbmethods):
     return [l[10:].lower() for l in lbmethods]
@@ -24,6 +34,22 @@ class Pool(object):
     __version = 11
     __wsdl = 'LocalLB.Pool'
 
+    # Local attributes compared by incremental refreshes, and those that
+    # change without anyone writing them
+    _attributes = ('_active_member_count', '_description', '_lbmethod', '_members',
+            '_minimum_active_member', '_minimum_up_member', '_slow_ramp_time',
+            '_statistics')
+    _volatile_attributes = ('_active_member_count', '_statistics')
+
+    # Local attributes save() pushes to the lb
+    _writable = ('_description', '_lbmethod', '_members', '_minimum_active_member',
+            '_minimum_up_member', '_slow_ramp_time')
+
+    # There can be many, no __dict__
+    __slots__ = ('__name', '_lb', '_active_member_count', '_description', '_lbmethod',
+            '_members', '_minimum_active_member', '_minimum_up_member',
+            '_slow_ramp_time', '_statistics', '_clean', '__weakref__')
+
     def __init__(self, name, lb=None, description=None, lbmethod=None,
             members=None, minimum_active_member=None, minimum_up_member=None,
             slow_ramp_time=None, fromdict=None):
@@ -46,22 +72,23 @@ class Pool(object):
             self._slow_ramp_time        = None
             self._statistics            = None
 
-        self._lbcall = self.__lbcall
-
     def __repr__(self):
         return "f5.Pool('%s')" % (self._name)
 
     def __str__(self):
         return self._name
 
-    # This just adds the wsdl to calls to the lb for convenience
-    def __lbcall(self, call, *args, **kwargs):
-        return self.lb._call(self.__wsdl + '.' + call, *args, **kwargs)
-
-    @classmethod
+    # This just adds the wsdl to calls to the lb for convenience, on a pool
+    # it's called without the lb
+    @f5.util.lbcall
     def _lbcall(cls, lb, call, *args, **kwargs):
         return lb._call(cls.__wsdl + '.' + call, *args, **kwargs)
 
+    # Independent calls, possibly performed in parallel by the lb
+    @classmethod
+    def _lbcall_many(cls, lb, calls):
+        return lb._call_many([(cls.__wsdl + '.' + c[0],) + c[1:] for c in calls])
+
     ###########################################################################
     # Properties
     ###########################################################################
@@ -107,6 +134,7 @@ class Pool(object):
     @property
     def description(self):
         self._description = self._lbcall('get_description', [self._name])[0]
+        f5.util.mark_clean([self], ['_description'])
         return self._description
 
     @description.setter
@@ -114,39 +142,50 @@ class Pool(object):
     def description(self, value):
         self._lbcall('set_description', [self._name], [value])
         self._description = value
+        f5.util.mark_saved([self], ['_description'])
 
     #### LBMETHOD ####
     @property
     def lbmethod(self):
         self._lbmethod = munge_lbmethod(self._lbcall('get_lb_method', [self._name]))[0]
+        f5.util.mark_clean([self], ['_lbmethod'])
         return self._lbmethod
 
     @lbmethod.setter
     def lbmethod(self, value):
         self._lbcall('set_lb_method', [self._name], unmunge_lbmethod([value]))
         self._lbmethod = value.lower()
+        f5.util.mark_saved([self], ['_lbmethod'])
 
     #### MEMBERS ####
     @property
     def members(self):
         self._members = f5.PoolMember._get(self._lb, pools=[self], minimal=True)
+        f5.util.mark_clean([self], ['_members'])
         return self._members
 
     @members.setter
     @f5.util.lbtransaction
     def members(self, value):
-        current = self._lbcall('get_member', [self._name])
+        current = self._lbcall('get_member', [self._name])[0]
         should  = pms_to_addrportsq(value)
 
-        self._lbcall('remove_member', [self._name], [current])
-        self._lbcall('add_member', [self._name], [should])
+        # Only touch the members that differ, the others keep their state
+        remove, add = diff_members(current, should)
+
+        if remove:
+            self._lbcall('remove_member', [self._name], [remove])
+        if add:
+            self._lbcall('add_member', [self._name], [add])
         self._members = value
+        f5.util.mark_saved([self], ['_members'])
 
     #### MINIMUM_ACTIVE_MEMBER ####
     @property
     def minimum_active_member(self):
         self._minimum_active_member = self._lbcall(
                 'get_minimum_active_member', [self._name])[0]
+        f5.util.mark_clean([self], ['_minimum_active_member'])
         return self._minimum_active_member
 
     @minimum_active_member.setter
@@ -154,12 +193,14 @@ class Pool(object):
     def minimum_active_member(self, value):
         self._lbcall('set_minimum_active_member', [self._name], [value])
         self._minimum_active_member = value
+        f5.util.mark_saved([self], ['_minimum_active_member'])
 
     #### MINIMUM_UP_MEMBER ####
     @property
     def minimum_up_member(self):
         self._minimum_up_member = self._lbcall(
                 'get_minimum_up_member', [self._name])[0]
+        f5.util.mark_clean([self], ['_minimum_up_member'])
         return self._minimum_up_member
 
     @minimum_up_member.setter
@@ -167,12 +208,14 @@ class Pool(object):
     def minimum_up_member(self, value):
         self._lbcall('set_minimum_up_member', [self._name], [value])
         self._minimum_up_member = value
+        f5.util.mark_saved([self], ['_minimum_up_member'])
 
     #### SLOW_RAMP_TIME ####
     @property
     def slow_ramp_time(self):
         self._slow_ramp_time = self._lbcall(
                 'get_slow_ramp_time', [self._name])[0]
+        f5.util.mark_clean([self], ['_slow_ramp_time'])
         return self._slow_ramp_time
 
     @slow_ramp_time.setter
@@ -180,6 +223,7 @@ class Pool(object):
     def slow_ramp_time(self, value):
         self._lbcall('set_slow_ramp_time', [self._name], [value])
         self._slow_ramp_time = value
+        f5.util.mark_saved([self], ['_slow_ramp_time'])
 
     #### STATISTICS ####
     @property
@@ -188,6 +232,42 @@ class Pool(object):
                              [self._name])['statistics'][0]
         return self._statistics
 
+    #### DICTIONARY ####
+    # Local attributes only, members as {'address': node, 'port': port}
+    @property
+    def _dictionary(self):
+        d = {}
+
+        d['lb']                    = self._lb
+        d['name']                  = self._name
+        d['active_member_count']   = self._active_member_count
+        d['description']           = self._description
+        d['lbmethod']              = self._lbmethod
+        d['minimum_active_member'] = self._minimum_active_member
+        d['minimum_up_member']     = self._minimum_up_member
+        d['slow_ramp_time']        = self._slow_ramp_time
+
+        d['members'] = None
+        if self._members is not None:
+            d['members'] = [{'address': pm._node._name, 'port': pm._port} for pm in self._members]
+
+        return d
+
+    @_dictionary.setter
+    def _dictionary(self, d):
+        self._active_member_count   = d['active_member_count']
+        self._description           = d['description']
+        self._lbmethod              = d['lbmethod']
+        self._minimum_active_member = d['minimum_active_member']
+        self._minimum_up_member     = d['minimum_up_member']
+        self._slow_ramp_time        = d['slow_ramp_time']
+
+        self._members = None
+        if d['members'] is not None:
+            nodes = f5.Node.factory.create([m['address'] for m in d['members']], self._lb)
+            self._members = f5.PoolMember.factory.create([[nodes[idx], m['port'], self]
+                for idx, m in enumerate(d['members'])], self._lb)
+
     ###########################################################################
     # Private API
     ###########################################################################
@@ -201,59 +281,99 @@ class Pool(object):
         pools = cls.factory.create(names, lb)
 
         if not minimal:
-            active_member_count   = cls._lbcall(lb, 'get_active_member_count',
-                                        names)
-            description           = cls._lbcall(lb, 'get_description', names)
-            lbmethod              = cls._lbcall(lb, 'get_lb_method', names)
-            members               = cls._lbcall(lb, 'get_member', names)
-            minimum_active_member = cls._lbcall(lb, 'get_minimum_active_member',
-                                        names)
-            minimum_up_member     = cls._lbcall(lb, 'get_minimum_up_member',
-                                        names)
-            slow_ramp_time        = cls._lbcall(lb, 'get_slow_ramp_time', names)
-            statistics            = cls._lbcall(lb, 'get_statistics', names)
-
-            for idx,pool in enumerate(pools):
-                pool._active_member_count   = active_member_count[idx]
-                pool._description           = description[idx]
-                pool._lbmethod              = lbmethod[idx]
-                pool._minimum_active_member = minimum_active_member[idx]
-                pool._minimum_up_member     = minimum_up_member[idx]
-                pool._slow_ramp_time        = slow_ramp_time[idx]
-                pool._statistics            = statistics['statistics'][idx]
-
-                pool._members = f5.PoolMember._get_objects(lb, [pool],
-                                    [members[idx]], minimal=True)
+            cls._refresh_objects(lb, pools)
 
         return pools
 
     @classmethod
-    def _get(cls, lb, pattern=None, minimal=False):
-        names = cls._lbcall(lb, 'get_list')
+    def _refresh_objects(cls, lb, pools):
+        """Updates all attributes of a list of pools, one call per attribute"""
+        cls._apply_refresh(lb, pools, lb._call_many(cls._refresh_calls(pools)))
 
-        if not names:
-            return []
+    # Split into the calls and the handling of their results, so the calls
+    # for many types can be made at once (see f5.snapshot)
+    @classmethod
+    def _refresh_calls(cls, pools):
+        names = [pool._name for pool in pools]
+
+        return [(cls.__wsdl + '.' + call, names) for call in [
+            'get_active_member_count',
+            'get_description',
+            'get_lb_method',
+            'get_member',
+            'get_minimum_active_member',
+            'get_minimum_up_member',
+            'get_slow_ramp_time',
+            'get_statistics',
+        ]]
+
+    @classmethod
+    def _apply_refresh(cls, lb, pools, results):
+        (active_member_count, description, lbmethod, members,
+            minimum_active_member, minimum_up_member, slow_ramp_time,
+            statistics) = results
+
+        lbmethod = munge_lbmethod(lbmethod)
+
+        for idx,pool in enumerate(pools):
+            pool._active_member_count   = active_member_count[idx]
+            pool._description           = description[idx]
+            pool._lbmethod              = lbmethod[idx]
+            pool._minimum_active_member = minimum_active_member[idx]
+            pool._minimum_up_member     = minimum_up_member[idx]
+            pool._slow_ramp_time        = slow_ramp_time[idx]
+            pool._statistics            = statistics['statistics'][idx]
+
+            pool._members = f5.PoolMember._get_objects(lb, [pool],
+                                [members[idx]], minimal=True)
+
+        f5.util.mark_clean(pools, cls._writable)
+
+    @classmethod
+    def _refresh_volatile(cls, lb, pools):
+        """Updates the active member count and statistics of a list of pools"""
+        names = [pool._name for pool in pools]
+        active_member_count, statistics = cls._lbcall_many(lb, [
+            ('get_active_member_count', names),
+            ('get_statistics', names),
+        ])
+
+        for idx, pool in enumerate(pools):
+            pool._active_member_count = active_member_count[idx]
+            pool._statistics          = statistics['statistics'][idx]
 
-        if pattern is not None:
-            if not isinstance(pattern, re._pattern_type):
-                pattern = re.compile(pattern)
+    @classmethod
+    def _get_names(cls, lb, pattern=None):
+        names = cls._lbcall(lb, 'get_list')
+
+        if names and pattern is not None:
+            pattern = re.compile(pattern)
             names = [name for name in names if pattern.match(name)]
 
-        return cls._get_objects(lb, names, minimal)
+        return names
+
+    @classmethod
+    def _get(cls, lb, pattern=None, minimal=False):
+        return cls._get_objects(lb, cls._get_names(lb, pattern), minimal)
+
+    @classmethod
+    def _iter(cls, lb, pattern=None, chunk_size=1000, minimal=False):
+        """Fetches the names right away, returns a generator that fetches
+        the objects chunk_size at a time"""
+        return cls._iter_objects(lb, cls._get_names(lb, pattern), chunk_size, minimal)
+
+    @classmethod
+    def _iter_objects(cls, lb, names, chunk_size, minimal=False):
+        for chunk in f5.util.chunks(names, chunk_size):
+            for pool in cls._get_objects(lb, chunk, minimal):
+                yield pool
 
     ###########################################################################
     # Public API
     ###########################################################################
     def refresh(self):
         """Fetch all attributes from the lb"""
-        self.active_member_count
-        self.description
-        self.lbmethod
-        self.members
-        self.minimum_active_member
-        self.minimum_up_member
-        self.slow_ramp_time
-        self.statistics
+        self._refresh_objects(self._lb, [self])
 
     def exists(self):
         try:
@@ -271,9 +391,19 @@ class Pool(object):
     def reset_statistics(self):
         self._lbcall('reset_statistics', [self._name])
 
-    @f5.util.lbtransaction
     def save(self):
-        if not self.exists():
+        """Create the pool on the lb, or push the attributes that changed
+        since it was loaded from the lb"""
+        changed = f5.util.dirty(self, self._writable)
+        if changed != []:
+            self._save(changed)
+
+    @f5.util.lbtransaction
+    def _save(self, changed=None):
+        if changed is None:
+            if self.exists():
+                return
+
             if self._lbmethod is None or self._members is None:
                 raise RuntimeError('lbmethod and members must be set on create')
             self._lbcall('create_v2', [self._name],
@@ -281,6 +411,11 @@ class Pool(object):
 
             if self._description is not None:
                 self.description = self._description
+        else:
+            for attr in changed:
+                setattr(self, attr[1:], getattr(self, attr))
+
+        f5.util.mark_saved([self], self._writable)
 
     @f5.util.lbwriter2
     def delete(self):
@@ -301,21 +436,33 @@ class PoolList(list):
         self._partition = partition
         self._pattern   = pattern
 
-        if lb is not None:
+        if fromdict is not None:
+            if lb is not None:
+                self.dictionary = fromdict
+            else:
+                self._dictionary = fromdict
+        elif lb is not None:
             self.refresh()
-        else:
-            self.dictionary = fromdict
 
     @f5.util.restore_session_values
-    def refresh(self):
+    def refresh(self, incremental=False, volatile_only=False):
+        """Fetch the list from the lb, see NodeList.refresh for incremental"""
         self.lb.active_folder = self._partition
         if self._partition == '/':
             self.lb.recursive_query = True
 
-        pools = Pool._get(self._lb, self._pattern)
+        if incremental:
+            pools, changes = f5.util.incremental_refresh(Pool, self._lb, self,
+                    Pool._get_names(self._lb, self._pattern), False, volatile_only)
+        else:
+            pools = Pool._get(self._lb, self._pattern)
+
         del self[:]
         self.extend(pools)
 
+        if incremental:
+            return changes
+
     @f5.util.lbtransaction
     def sync(self, create=False):
         if create is True:
@@ -330,6 +477,14 @@ class PoolList(list):
     def _lbcall(self, call, *args, **kwargs):
         return Pool._lbcall(self._lb, call, *args, **kwargs)
 
+    def _set_many(self, call, pools, attr, munge=None):
+        """Push attr of those of pools that have it set, in one call"""
+        pools = [pool for pool in pools if getattr(pool, attr) is not None]
+        if pools:
+            values = [getattr(pool, attr) for pool in pools]
+            self._lbcall(call, [pool._name for pool in pools],
+                    munge(values) if munge else values)
+
     def _setattr(self, attr, values):
         if len(values) != len(self):
                 raise ValueError('value must be of same length as list')
@@ -363,6 +518,7 @@ class PoolList(list):
     def description(self):
         values = self._lbcall('get_description', self.names)
         self._setattr('_description', values)
+        f5.util.mark_clean(self, ['_description'])
         return values
 
     @description.setter
@@ -370,6 +526,7 @@ class PoolList(list):
     def description(self, values):
         self._lbcall('set_description', self.names,  values)
         self._setattr('_description',  values)
+        f5.util.mark_saved(self, ['_description'])
 
     @property
     def _description(self):
@@ -385,6 +542,7 @@ class PoolList(list):
     def lbmethod(self):
         values = self._lbcall('get_lbmethod', self.names)
         self._setattr('_lbmethod', values)
+        f5.util.mark_clean(self, ['_lbmethod'])
         return values
 
     @property
@@ -483,18 +641,11 @@ class PoolList(list):
         d['partition'] = self.partition
         d['pattern']   = self.pattern
 
-        self.address
-        self.av_status
-        self.connection_limit
-        self.description
-        self.dynamic_ratio
-        self.enabled
-        self.rate_limit
-        self.ratio
-        self.status_descr
-
-        d['nodes'] =  [node._dictionary for node in self]
-        
+        # One call per attribute for all pools
+        Pool._refresh_objects(self._lb, self)
+
+        d['pools'] = [pool._dictionary for pool in self]
+
         return d
 
     @property
@@ -504,28 +655,50 @@ class PoolList(list):
         d['lb']        = self.lb
         d['partition'] = self.partition
         d['pattern']   = self.pattern
-        # We're in asynchronous mode so we can simply use Node's builtin ._dictionary
-        d['nodes']     = [node._dictionary for node in self]
+        # We're in asynchronous mode so we can simply use Pool's builtin ._dictionary
+        d['pools']     = [pool._dictionary for pool in self]
 
         return d
 
     @dictionary.setter
     @f5.util.lbtransaction
     def dictionary(self, _dict):
-        # Set asynchronous attributes so we don't refresh from lb
-        self._lb        = _dict['lb']
-        self._partition = _dict['partition']
-        self._pattern   = _dict['pattern']
+        """Load the pools of _dict and push them to our lb, creating those it
+        doesn't have, one call per attribute for all pools. Attributes that
+        are None are skipped."""
+        self._dictionary = dict(_dict, lb=self._lb)
 
-        del self[:]
-        self.extend(Node.factory.create([d['name'] for d in _dict['nodes']], self._lb))
+        existing = set(Pool._get_names(self._lb))
+        new      = [pool for pool in self if pool._name not in existing]
+        old      = [pool for pool in self if pool._name in existing]
 
-        self.connection_limit = [node['connection_limit'] for node in _dict['nodes']]
-        self.description      = [node['description'] for node in _dict['nodes']]
-        self.dynamic_ratio    = [node['dynamic_ratio'] for node in _dict['nodes']]
-        self.enabled          = [node['enabled'] for node in _dict['nodes']]
-        self.rate_limit       = [node['rate_limit'] for node in _dict['nodes']]
-        self.ratio            = [node['ratio'] for node in _dict['nodes']]
+        if new:
+            if [p for p in new if p._lbmethod is None or p._members is None]:
+                raise RuntimeError('lbmethod and members must be set on create')
+            self._lbcall('create_v2', [p._name for p in new],
+                    unmunge_lbmethod([p._lbmethod for p in new]),
+                    [pms_to_addrportsq(p._members) for p in new])
+
+        # Only add and remove the members that differ
+        pools = [p for p in old if p._members is not None]
+        if pools:
+            current = self._lbcall('get_member', [p._name for p in pools])
+            changes = [diff_members(c, pms_to_addrportsq(p._members))
+                    for p, c in zip(pools, current)]
+
+            for idx, call in enumerate(('remove_member', 'add_member')):
+                names = [p._name for p, change in zip(pools, changes) if change[idx]]
+                if names:
+                    self._lbcall(call, names, [change[idx] for change in changes if change[idx]])
+
+        # New pools got their lbmethod with create_v2
+        self._set_many('set_lb_method', old, '_lbmethod', unmunge_lbmethod)
+        for attr in ('_description', '_minimum_active_member', '_minimum_up_member',
+                '_slow_ramp_time'):
+            self._set_many('set' + attr, self, attr)
+
+        if self:
+            f5.util.mark_saved(self, Pool._writable)
 
     @_dictionary.setter
     def _dictionary(self, _dict):
@@ -533,10 +706,10 @@ class PoolList(list):
         self._partition = _dict['partition']
         self._pattern   = _dict['pattern']
 
-        nodes = Node.factory.create([d['name'] for d in _dict['nodes']], self._lb)
-        # We're in asynchronous mode so we can simply use Node's builtin ._dictionary
-        for idx, node in enumerate(nodes):
-            node._dictionary = _dict['nodes'][idx]
+        pools = Pool.factory.create([d['name'] for d in _dict['pools']], self._lb)
+        # We're in asynchronous mode so we can simply use Pool's builtin ._dictionary
+        for idx, pool in enumerate(pools):
+            pool._dictionary = _dict['pools'][idx]
 
         del self[:]
-        self.extend(nodes)
+        self.extend(pools)
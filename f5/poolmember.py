@@ -3,6 +3,8 @@ import f5
 import f5.util
 import re
 
+from .exceptions import PoolMemberNotFound
+
 def enabled_bool(enabled_statuses):
     """Switch from enabled_status to bool"""
     bools = []
@@ -22,9 +24,15 @@ def bool_enabled(bools):
     return ['STATE_ENABLED' if b else 'STATE_DISABLED' for b in bools]
 
 
+# There are only a few availability statuses, keep one string of each instead
+# of one per member
+_av_statuses = {}
+
+
 def munge_av_status(av_statuses):
     """Truncate and lowercase availability_status"""
-    return [a[20:].lower() for a in av_statuses]
+    return [_av_statuses.get(a) or _av_statuses.setdefault(a, a[20:].lower())
+            for a in av_statuses]
 
 class CachedFactory(f5.util.CachedFactory):
     def create(self, nodeportpools, lb=None, *args, **kwargs):
@@ -41,13 +49,14 @@ class CachedFactory(f5.util.CachedFactory):
             # Save some bytes
             key = hash(key)
 
-            if key in self._cache:
-                objects.append(self._cache[key])
-            else:
+            # A get() as the object can be collected (by another thread)
+            # right after a membership test
+            obj = self._cache.get(key)
+            if obj is None:
                 obj = self._Klass(nps[0], nps[1], nps[2], *args, lb=lb, **kwargs)
-
                 self._cache[key] = obj
-                objects.append(obj)
+
+            objects.append(obj)
 
         return objects
 
@@ -65,12 +74,21 @@ class CachedFactory(f5.util.CachedFactory):
             key = obj.lb.host + key
 
         key = hash(key)
-        if key in self._cache:
-            del self._cache[key]
+        self._cache.pop(key, None)
 
 class PoolMember(object):
     __version = 11
 
+    # Local attributes save() pushes to the lb
+    _writable = ('_connection_limit', '_description', '_dynamic_ratio', '_enabled',
+            '_priority', '_rate_limit', '_ratio')
+
+    # There can be many, no __dict__. __wsdl is the lb's shared interface.
+    __slots__ = ('__wsdl', '_lb', '_node', '_pool', '_port', '_address',
+            '_availability_status', '_connection_limit', '_description',
+            '_dynamic_ratio', '_enabled', '_priority', '_rate_limit', '_ratio',
+            '_status_description', '_clean', '__weakref__')
+
     def __init__(self,
             node,
             port,
@@ -124,7 +142,7 @@ class PoolMember(object):
 
     @staticmethod
     def _get_wsdl(lb):
-        return lb._transport.LocalLB.Pool
+        return lb._interface('LocalLB.Pool')
 
     @f5.util.lbmethod
     def _get_addrport(self):
@@ -246,29 +264,6 @@ class PoolMember(object):
             return []
 
         pools = f5.Pool.factory.create(pools, lb)
-        if not minimal:
-            address2          = cls._get_addresses(lb, pools, addrportsq2)
-            connection_limit2 = cls._get_connection_limits(lb, pools, addrportsq2)
-            description2      = cls._get_descriptions(lb, pools, addrportsq2)
-            dynamic_ratio2    = cls._get_dynamic_ratios(lb, pools, addrportsq2)
-            object_status2    = cls._get_object_statuses(lb, pools, addrportsq2)
-            priority2         = cls._get_priorities(lb, pools, addrportsq2)
-            rate_limit2       = cls._get_rate_limits(lb, pools, addrportsq2)
-            ratio2            = cls._get_ratios(lb, pools, addrportsq2)
-
-            # munge availability_status
-            availability_status2 = [
-                munge_av_status(
-                    [object_status['availability_status']
-                        for object_status in object_status1])
-                    for object_status1 in object_status2]
-
-            # munge enabled_status
-            enabled2 = [
-                enabled_bool(
-                    [object_status['enabled_status']
-                        for object_status in object_status1])
-                    for object_status1 in object_status2]
 
         poolmembers  = []
         for idx, addrportsq in enumerate(addrportsq2):
@@ -277,59 +272,139 @@ class PoolMember(object):
                     [[nodes[_idx], addrport['port'], pools[idx]]
                         for _idx,addrport in enumerate(addrportsq)], lb)
 
-            for idx_inner, pm in enumerate(objects):
-                if not minimal:
-                    pm._address             = address2[idx][idx_inner]
-                    pm._availability_status = availability_status2[idx][idx_inner]
-                    pm._connection_limit    = connection_limit2[idx][idx_inner]
-                    pm._description         = description2[idx][idx_inner]
-                    pm._enabled             = enabled2[idx][idx_inner]
-                    pm._dynamic_ratio       = dynamic_ratio2[idx][idx_inner]
-                    pm._priority            = priority2[idx][idx_inner]
-                    pm._rate_limit          = rate_limit2[idx][idx_inner]
-                    pm._ratio               = ratio2[idx][idx_inner]
-                    pm._status_description  = object_status2[idx][idx_inner]['status_description']
-
             poolmembers.extend(objects)
 
+        if not minimal:
+            cls._refresh_objects(lb, poolmembers)
+
         return poolmembers
 
+    @staticmethod
+    def _group(poolmembers):
+        """Returns the pools and addrportsq2 of a list of poolmembers, as the
+        get_member_*/set_member_* calls take them, and the (pool, member)
+        indices of every poolmember in those"""
+        pools       = []
+        addrportsq2 = []
+        positions   = {}
+        indices     = []
+        for pm in poolmembers:
+            if pm._pool.name not in positions:
+                positions[pm._pool.name] = len(pools)
+                pools.append(pm._pool.name)
+                addrportsq2.append([])
+            idx = positions[pm._pool.name]
+            indices.append((idx, len(addrportsq2[idx])))
+            addrportsq2[idx].append({'address': pm._node.name, 'port': pm._port})
+
+        return pools, addrportsq2, indices
+
     @classmethod
-    def _get(cls, lb, pools=None, pattern=None, minimal=False):
+    def _refresh_objects(cls, lb, poolmembers):
+        """Updates all attributes of a list of poolmembers, one call per
+        attribute for all of their pools"""
+        cls._apply_refresh(lb, poolmembers, lb._call_many(cls._refresh_calls(poolmembers)))
+
+    # Split into the calls and the handling of their results, so the calls
+    # for many types can be made at once (see f5.snapshot)
+    @classmethod
+    def _refresh_calls(cls, poolmembers):
+        pools, addrportsq2, indices = cls._group(poolmembers)
+
+        return [('LocalLB.Pool.' + call, pools, addrportsq2) for call in [
+            'get_member_address',
+            'get_member_connection_limit',
+            'get_member_description',
+            'get_member_dynamic_ratio',
+            'get_member_object_status',
+            'get_member_priority',
+            'get_member_rate_limit',
+            'get_member_ratio',
+        ]]
+
+    @classmethod
+    def _apply_refresh(cls, lb, poolmembers, results):
+        pools, addrportsq2, indices = cls._group(poolmembers)
+
+        (address2, connection_limit2, description2, dynamic_ratio2,
+            object_status2, priority2, rate_limit2, ratio2) = results
+
+        for pm, (idx, idx_inner) in zip(poolmembers, indices):
+            pm._address             = address2[idx][idx_inner]
+            pm._connection_limit    = connection_limit2[idx][idx_inner]
+            pm._description         = description2[idx][idx_inner]
+            pm._dynamic_ratio       = dynamic_ratio2[idx][idx_inner]
+            pm._priority            = priority2[idx][idx_inner]
+            pm._rate_limit          = rate_limit2[idx][idx_inner]
+            pm._ratio               = ratio2[idx][idx_inner]
+            pm._set_object_status(object_status2[idx][idx_inner])
+
+        f5.util.mark_clean(poolmembers, cls._writable)
+
+    @classmethod
+    def _get_names(cls, lb, pools=None, pattern=None):
+        """Returns a list of pool names and their (matching) members"""
         if pools is not None:
             if isinstance(pools, list):
-                pools = [pool.name for pool in pools]
+                pools = [str(pool) for pool in pools]
             else:
-                if isinstance(pools, str):
-                    pools = [pools]
-                else:
-                    pools = [pools.name]
+                pools = [str(pools)]
         else:
-            pools = f5.Pool._get(lb)
+            pools = f5.Pool._get_names(lb)
 
         # no pools no glory
         if not pools:
-            return []
+            return [], []
 
         addrportsq2 = cls._get_list(lb, pools)
-        
+
         if not addrportsq2:
-            return []
+            return [], []
 
         if pattern is not None:
-            if not isinstance(pattern, re._pattern_type):
-                pattern = re.compile(pattern)
+            pattern = re.compile(pattern)
             for idx,addrportsq in enumerate(addrportsq2):
                 addrportsq2[idx] = [ap for ap in addrportsq if pattern.match('%s:%s' % (ap['address'], ap['port']))]
 
+        return pools, addrportsq2
+
+    @classmethod
+    def _get(cls, lb, pools=None, pattern=None, minimal=False):
+        pools, addrportsq2 = cls._get_names(lb, pools, pattern)
+
         return cls._get_objects(lb, pools, addrportsq2, minimal)
 
+    @classmethod
+    def _iter(cls, lb, pools=None, pattern=None, chunk_size=1000, minimal=False):
+        """Fetches the member lists right away, returns a generator that
+        fetches the poolmembers (whole pools, about chunk_size members) at a
+        time"""
+        pools, addrportsq2 = cls._get_names(lb, pools, pattern)
+
+        return cls._iter_objects(lb, pools, addrportsq2, chunk_size, minimal)
+
+    @classmethod
+    def _iter_objects(cls, lb, pools, addrportsq2, chunk_size, minimal=False):
+        start = 0
+        count = 0
+        for idx, addrportsq in enumerate(addrportsq2):
+            count += len(addrportsq)
+            if count >= chunk_size or idx == len(addrportsq2) - 1:
+                for pm in cls._get_objects(lb, pools[start:idx + 1],
+                        addrportsq2[start:idx + 1], minimal):
+                    yield pm
+                start = idx + 1
+                count = 0
+
     def _get_object_status_properties(self):
-        objs = self._get_object_status()
+        self._set_object_status(self._get_object_status())
 
-        self._availability_status = munge_av_status([objs['availability_status']])[0]
-        self._enabled             = enabled_bool([objs['enabled_status']])[0]
-        self._status_description  = objs['status_description']
+    # One object status sets availability_status, enabled and status_description
+    def _set_object_status(self, object_status):
+        self._availability_status = munge_av_status([object_status['availability_status']])[0]
+        self._enabled             = enabled_bool([object_status['enabled_status']])[0]
+        self._status_description  = object_status['status_description']
+        f5.util.mark_clean([self], ['_enabled'])
 
     ###########################################################################
     # Properties
@@ -412,6 +487,7 @@ class PoolMember(object):
     def connection_limit(self):
        if self._lb:
            self._connection_limit = self._get_connection_limit()
+           f5.util.mark_clean([self], ['_connection_limit'])
        return self._connection_limit
 
     @connection_limit.setter
@@ -420,12 +496,14 @@ class PoolMember(object):
             self._set_connection_limit(value)
 
         self._connection_limit = value
+        f5.util.mark_saved([self], ['_connection_limit'])
 
     #### description ####
     @property
     def description(self):
        if self._lb:
            self._description = self._get_description()
+           f5.util.mark_clean([self], ['_description'])
        return self._description
 
     @description.setter
@@ -434,12 +512,14 @@ class PoolMember(object):
             self._set_description(value)
 
         self._description = value
+        f5.util.mark_saved([self], ['_description'])
 
     #### dynamic_ratio ####
     @property
     def dynamic_ratio(self):
        if self._lb:
            self._dynamic_ratio = self._get_dynamic_ratio()
+           f5.util.mark_clean([self], ['_dynamic_ratio'])
        return self._dynamic_ratio
 
     @dynamic_ratio.setter
@@ -448,12 +528,14 @@ class PoolMember(object):
             self._set_dynamic_ratio(value)
 
         self._dynamic_ratio = value
+        f5.util.mark_saved([self], ['_dynamic_ratio'])
 
     #### priority ####
     @property
     def priority(self):
        if self._lb:
            self._priority = self._get_priority()
+           f5.util.mark_clean([self], ['_priority'])
 
        return self._priority
 
@@ -462,12 +544,14 @@ class PoolMember(object):
         if self._lb:
             self._set_priority(value)
         self._priority = value
+        f5.util.mark_saved([self], ['_priority'])
 
     #### rate_limit ####
     @property
     def rate_limit(self):
        if self._lb:
            self._rate_limit = self._get_rate_limit()
+           f5.util.mark_clean([self], ['_rate_limit'])
        return self._rate_limit
 
     @rate_limit.setter
@@ -476,12 +560,14 @@ class PoolMember(object):
             self._set_rate_limit(value)
 
         self._rate_limit = value
+        f5.util.mark_saved([self], ['_rate_limit'])
 
     #### ratio ####
     @property
     def ratio(self):
        if self._lb:
            self._ratio = self._get_ratio()
+           f5.util.mark_clean([self], ['_ratio'])
        return self._ratio
 
     @ratio.setter
@@ -490,6 +576,7 @@ class PoolMember(object):
             self._set_ratio(value)
 
         self._ratio = value
+        f5.util.mark_saved([self], ['_ratio'])
 
     #### enabled ####
     @property
@@ -505,6 +592,7 @@ class PoolMember(object):
             self._set_session_enabled_state(bool_enabled([value])[0])
 
         self._enabled = value
+        f5.util.mark_saved([self], ['_enabled'])
 
     #### status_description ####
     @property
@@ -516,26 +604,29 @@ class PoolMember(object):
     ###########################################################################
     # Public API
     ###########################################################################
-    @f5.util.lbtransaction
     def save(self):
-        """Save the poolmember to the lb"""
-        if not self.exists():
-            self._create()
-
-        if self._connection_limit is not None:
-            self.connection_limit = self._connection_limit
-        if self._description is not None:
-            self.description = self._description
-        if self._dynamic_ratio is not None:
-            self.dynamic_ratio = self._dynamic_ratio
-        if self._enabled is not None:
-            self.enabled = self._enabled
-        if self._priority is not None:
-            self.priority = self._rate_limit
-        if self._rate_limit is not None:
-            self.rate_limit = self._rate_limit
-        if self._ratio is not None:
-            self.ratio = self._ratio
+        """Save the poolmember to the lb
+
+        A poolmember loaded from the lb only pushes the attributes that
+        changed since, without checking if it exists.
+        """
+        changed = f5.util.dirty(self, self._writable)
+        if changed != []:
+            self._save(changed)
+
+    @f5.util.lbtransaction
+    def _save(self, changed=None):
+        # We don't know what's on the lb, push everything that's set
+        if changed is None:
+            changed = [a for a in self._writable if getattr(self, a) is not None]
+
+            if not self.exists():
+                self._create()
+
+        for attr in changed:
+            setattr(self, attr[1:], getattr(self, attr))
+
+        f5.util.mark_saved([self], self._writable)
 
     def delete(self):
         """Delete the poolmember from the lb"""
@@ -557,16 +648,267 @@ class PoolMember(object):
 
     def refresh(self):
         """Fetch all attributes from the lb"""
-        # We don't need to call availability_status or status_description
-        # because calling any of enabled, availability_status or
-        # status_description updates all three.
-        self.address
-        self.connection_limit
-        self.description
-        self.dynamic_ratio
-        self.enabled
-        self.priority
-        self.rate_limit
-        self.ratio
+        if self._lb:
+            self._refresh_objects(self._lb, [self])
 
 PoolMember.factory = CachedFactory(PoolMember)
+
+
+class PoolMemberList(list):
+    """A list of poolmembers (of any number of pools) with bulk getters and
+    setters, one get_member_*/set_member_* call per attribute for all of
+    them"""
+    def __init__(self, lb=None, pools=None, pattern=None, minimal=False):
+        self._lb      = lb
+        self._minimal = minimal
+        self._pools   = pools
+        self._pattern = pattern
+
+        if lb is not None:
+            self.refresh()
+
+    def refresh(self):
+        """Fetch the list from the lb"""
+        poolmembers = self._lb.pms_get(self._pools, self._pattern, self._minimal)
+
+        del self[:]
+        self.extend(poolmembers)
+
+    @f5.util.lbtransaction
+    def sync(self, create=False):
+        """Push the local attributes of all poolmembers to the lb, creating
+        them first with create. Attributes not set on every poolmember are
+        skipped."""
+        if create is True:
+            self._lbcall('add_member_v2')
+
+        for attr in ('connection_limit', 'description', 'dynamic_ratio',
+                'enabled', 'priority', 'rate_limit', 'ratio'):
+            values = self._getattr('_' + attr)
+            if None not in values:
+                setattr(self, attr, values)
+
+    @f5.util.lbwriter2
+    def delete(self):
+        """Delete all poolmembers from the lb and empty the list"""
+        if self:
+            self._lbcall('remove_member_v2')
+        del self[:]
+
+    def _lbcall(self, call, values=None):
+        """Calls a (get|set)_member_* method with the pools and members of
+        the list, and values in the same order as the list"""
+        # Nothing to ask the lb
+        if not self:
+            return [] if values is None else None
+
+        pools, addrportsq2, indices = PoolMember._group(self)
+
+        args = [pools, addrportsq2]
+        if values is not None:
+            values2 = [[None] * len(addrportsq) for addrportsq in addrportsq2]
+            for idx, (idx_pool, idx_inner) in enumerate(indices):
+                values2[idx_pool][idx_inner] = values[idx]
+            args.append(values2)
+
+        try:
+            result = self._lb._call('LocalLB.Pool.' + call, *args)
+        except ServerError as e:
+            if 'was not found.' in str(e):
+                raise PoolMemberNotFound(str(e))
+            else:
+                raise
+
+        if values is None and result is not None:
+            return [result[idx_pool][idx_inner] for idx_pool, idx_inner in indices]
+
+    def _setattr(self, attr, values):
+        """Sets an attribute on all objects in list"""
+        if len(values) != len(self):
+            raise ValueError('value must be of same length as list')
+
+        for idx,pm in enumerate(self):
+            setattr(pm, attr, values[idx])
+
+    def _getattr(self, attr):
+        return [getattr(pm, attr) for pm in self]
+
+    #### LB ####
+    @property
+    def lb(self):
+        return self._lb
+
+    @lb.setter
+    @f5.util.multisetter
+    def lb(self, value):
+        self._setattr('lb', value)
+        self._lb = value[0]
+
+    #### POOLS ####
+    @property
+    def pools(self):
+        return self._pools
+
+    @pools.setter
+    def pools(self, value):
+        self._pools = value
+        self.refresh()
+
+    #### PATTERN ####
+    @property
+    def pattern(self):
+        return self._pattern
+
+    @pattern.setter
+    def pattern(self, value):
+        self._pattern = value
+        self.refresh()
+
+    #### AVAILABILITY_STATUS ####
+    @property
+    def availability_status(self):
+        self._refresh_status()
+        return self._getattr('_availability_status')
+
+    ### CONNECTION_LIMIT ###
+    @property
+    def connection_limit(self):
+        values = self._lbcall('get_member_connection_limit')
+        self._setattr('_connection_limit', values)
+        f5.util.mark_clean(self, ['_connection_limit'])
+        return values
+
+    @connection_limit.setter
+    @f5.util.multisetter
+    @f5.util.lbwriter2
+    def connection_limit(self, values):
+        self._lbcall('set_member_connection_limit', values)
+        self._setattr('_connection_limit', values)
+        f5.util.mark_saved(self, ['_connection_limit'])
+
+    ### CURRENT_CONNECTIONS ###
+    @property
+    def current_connections(self):
+        """Server side current connections of every poolmember"""
+        if not self:
+            return []
+
+        pools, addrportsq2, indices = PoolMember._group(self)
+        statistics2 = self._lb._call('LocalLB.Pool.get_member_statistics', pools, addrportsq2)
+
+        values = []
+        for idx_pool, idx_inner in indices:
+            for statistic in statistics2[idx_pool]['statistics'][idx_inner]['statistics']:
+                if statistic['type'] == 'STATISTIC_SERVER_SIDE_CURRENT_CONNECTIONS':
+                    values.append((statistic['value']['high'] << 32) + statistic['value']['low'])
+                    break
+            else:
+                values.append(None)
+
+        return values
+
+    ### DESCRIPTION ###
+    @property
+    def description(self):
+        values = self._lbcall('get_member_description')
+        self._setattr('_description', values)
+        f5.util.mark_clean(self, ['_description'])
+        return values
+
+    @description.setter
+    @f5.util.multisetter
+    @f5.util.lbwriter2
+    def description(self, values):
+        self._lbcall('set_member_description', values)
+        self._setattr('_description', values)
+        f5.util.mark_saved(self, ['_description'])
+
+    ### DYNAMIC_RATIO ###
+    @property
+    def dynamic_ratio(self):
+        values = self._lbcall('get_member_dynamic_ratio')
+        self._setattr('_dynamic_ratio', values)
+        f5.util.mark_clean(self, ['_dynamic_ratio'])
+        return values
+
+    @dynamic_ratio.setter
+    @f5.util.multisetter
+    @f5.util.lbwriter2
+    def dynamic_ratio(self, values):
+        self._lbcall('set_member_dynamic_ratio', values)
+        self._setattr('_dynamic_ratio', values)
+        f5.util.mark_saved(self, ['_dynamic_ratio'])
+
+    ### ENABLED ###
+    # Like PoolMember, availability_status, enabled and status_description
+    # are updated together
+    def _refresh_status(self):
+        for pm, object_status in zip(self, self._lbcall('get_member_object_status')):
+            pm._set_object_status(object_status)
+
+    @property
+    def enabled(self):
+        self._refresh_status()
+        return self._getattr('_enabled')
+
+    @enabled.setter
+    @f5.util.multisetter
+    @f5.util.lbwriter2
+    def enabled(self, values):
+        self._lbcall('set_member_session_enabled_state', bool_enabled(values))
+        self._setattr('_enabled', values)
+        f5.util.mark_saved(self, ['_enabled'])
+
+    ### PRIORITY ###
+    @property
+    def priority(self):
+        values = self._lbcall('get_member_priority')
+        self._setattr('_priority', values)
+        f5.util.mark_clean(self, ['_priority'])
+        return values
+
+    @priority.setter
+    @f5.util.multisetter
+    @f5.util.lbwriter2
+    def priority(self, values):
+        self._lbcall('set_member_priority', values)
+        self._setattr('_priority', values)
+        f5.util.mark_saved(self, ['_priority'])
+
+    ### RATE_LIMIT ###
+    @property
+    def rate_limit(self):
+        values = self._lbcall('get_member_rate_limit')
+        self._setattr('_rate_limit', values)
+        f5.util.mark_clean(self, ['_rate_limit'])
+        return values
+
+    @rate_limit.setter
+    @f5.util.multisetter
+    @f5.util.lbwriter2
+    def rate_limit(self, values):
+        self._lbcall('set_member_rate_limit', values)
+        self._setattr('_rate_limit', values)
+        f5.util.mark_saved(self, ['_rate_limit'])
+
+    ### RATIO ###
+    @property
+    def ratio(self):
+        values = self._lbcall('get_member_ratio')
+        self._setattr('_ratio', values)
+        f5.util.mark_clean(self, ['_ratio'])
+        return values
+
+    @ratio.setter
+    @f5.util.multisetter
+    @f5.util.lbwriter2
+    def ratio(self, values):
+        self._lbcall('set_member_ratio', values)
+        self._setattr('_ratio', values)
+        f5.util.mark_saved(self, ['_ratio'])
+
+    #### STATUS_DESCRIPTION ####
+    @property
+    def status_description(self):
+        self._refresh_status()
+        return self._getattr('_status_description')
@@ -3,8 +3,18 @@ import f5
 import f5.util
 import re
 
+from .exceptions import RuleNotFound
+
 class Rule(object):
     __version = 11
+
+    # Local attributes save() pushes to the lb
+    _writable = ('_definition', '_description', '_ignore_verification')
+
+    # There can be many, no __dict__. __wsdl is the lb's shared interface.
+    __slots__ = ('__wsdl', '_lb', '_name', '_definition', '_description',
+            '_ignore_verification', '_clean', '__weakref__')
+
     def __init__(self, name, lb=None, definition=None, description=None, ignore_verification=None):
 
         if lb is not None and not isinstance(lb, f5.Lb):
@@ -28,10 +38,10 @@ class Rule(object):
     ###########################################################################
     @staticmethod
     def _get_wsdl(lb):
-        return lb._transport.LocalLB.Rule
+        return lb._interface('LocalLB.Rule')
 
     def _set_wsdl(self):
-        self.__wsdl = self._lb._transport.LocalLB.Rule
+        self.__wsdl = self._get_wsdl(self._lb)
 
     @classmethod
     def _get_list(cls, lb):
@@ -90,19 +100,39 @@ class Rule(object):
         if not names:
             return objects
 
+        rules = cls.factory.create(names, lb)
         if not minimal:
-            definition          = [nd['rule_definition'] for nd in cls._query_rules(lb, names)]
-            description         = cls._get_descriptions(lb, names)
-            ignore_verification = cls._get_ignore_verifications(lb, names)
+            cls._refresh_objects(lb, rules)
+
+        return rules
+
+    @classmethod
+    def _refresh_objects(cls, lb, rules):
+        """Updates all attributes of a list of rules, one call per attribute"""
+        cls._apply_refresh(lb, rules, lb._call_many(cls._refresh_calls(rules)))
+
+    # Split into the calls and the handling of their results, so the calls
+    # for many types can be made at once (see f5.snapshot)
+    @classmethod
+    def _refresh_calls(cls, rules):
+        names = [rule._name for rule in rules]
+
+        return [
+            ('LocalLB.Rule.query_rule', names),
+            ('LocalLB.Rule.get_description', names),
+            ('LocalLB.Rule.get_ignore_verification', names),
+        ]
+
+    @classmethod
+    def _apply_refresh(cls, lb, rules, results):
+        ruledefs, description, ignore_verification = results
 
-        rules = cls.factory.create(names, lb)
         for idx, rule in enumerate(rules):
-            if not minimal:
-                rule._definition          = definition[idx]
-                rule._description         = description[idx]
-                rule._ignore_verification = ignore_verification[idx]
+            rule._definition          = ruledefs[idx]['rule_definition']
+            rule._description         = description[idx]
+            rule._ignore_verification = cls._iv_to_bool(ignore_verification[idx])
 
-        return rules
+        f5.util.mark_clean(rules, cls._writable)
 
     @classmethod
     def _get(cls, lb, pattern=None, minimal=False):
@@ -112,9 +142,9 @@ class Rule(object):
             return []
 
         if pattern is not None:
-            if not isinstance(pattern, re._pattern_type):
-                pattern = re.compile(pattern)
-                names = [rule_name for rule_name in names if pattern.match(rule_name)]
+            # re.compile() also takes compiled patterns
+            pattern = re.compile(pattern)
+            names = [rule_name for rule_name in names if pattern.match(rule_name)]
 
         return cls._get_objects(lb, names, minimal)
 
@@ -170,6 +200,7 @@ class Rule(object):
     def definition(self):
         if self._lb:
             self._definition = self._query_rule()['rule_definition']
+            f5.util.mark_clean([self], ['_definition'])
         return self._definition
 
     @definition.setter
@@ -178,12 +209,14 @@ class Rule(object):
             ruledef = {'rule_name': self._name, 'rule_definition': value}
             self._modify_rule(ruledef)
         self._definition = value
+        f5.util.mark_saved([self], ['_definition'])
 
     #### description ####
     @property
     def description(self):
         if self._lb:
             self._description = self._get_description()
+            f5.util.mark_clean([self], ['_description'])
         return self._description
 
     @description.setter
@@ -191,12 +224,14 @@ class Rule(object):
         if self._lb:
             self._set_description(value)
         self._description = value
+        f5.util.mark_saved([self], ['_description'])
 
     #### ignore_verification ####
     @property
     def ignore_verification(self):
         if self._lb:
             self._ignore_verification = self._iv_to_bool(self._get_ignore_verification())
+            f5.util.mark_clean([self], ['_ignore_verification'])
 
         return self._ignore_verification
 
@@ -206,6 +241,7 @@ class Rule(object):
             self._set_ignore_verification(self._bool_to_iv(value))
 
         self._ignore_verification = value
+        f5.util.mark_saved([self], ['_ignore_verification'])
 
     ###########################################################################
     # Public API
@@ -223,30 +259,179 @@ class Rule(object):
 
         return True
 
-    @f5.util.lbtransaction
     def save(self):
-        """Save the rule to the lb"""
+        """Save the rule to the lb
 
-        if not self.exists():
-            if self._rule_definition is None or self._name is None:
-                raise RuntimeError('name and definition must be set on create')
-            self._create()
-        elif self._definition is not None:
-            self.definition = self._definition
+        A rule loaded from the lb only pushes the attributes that changed
+        since, without checking if it exists.
+        """
+        changed = f5.util.dirty(self, self._writable)
+        if changed != []:
+            self._save(changed)
 
-        if self._description is not None:
-            self.description = self._description
-        if self._ignore_verification is not None:
-            self.ignore_verification = self._ignore_verification
+    @f5.util.lbtransaction
+    def _save(self, changed=None):
+        # We don't know what's on the lb, push everything that's set
+        if changed is None:
+            changed = [a for a in self._writable if getattr(self, a) is not None]
+
+            if not self.exists():
+                if self._definition is None or self._name is None:
+                    raise RuntimeError('name and definition must be set on create')
+                self._create()
+                changed.remove('_definition')
+
+        for attr in changed:
+            setattr(self, attr[1:], getattr(self, attr))
+
+        f5.util.mark_saved([self], self._writable)
 
     def refresh(self):
         """Update all attributes from the lb"""
-        self.definition
-        self.description
-        self.ignore_verification
+        if self._lb:
+            self._refresh_objects(self._lb, [self])
     
     def delete(self):
         """Delete the rule from the lb"""
-        self._delete_rule()
+        self._delete()
 
 Rule.factory = f5.util.CachedFactory(Rule)
+
+
+class RuleList(list):
+    """A list of rules with bulk getters and setters, one call per attribute
+    for all of them"""
+    def __init__(self, lb=None, pattern=None, minimal=False):
+        self._lb      = lb
+        self._minimal = minimal
+        self._pattern = pattern
+
+        if lb is not None:
+            self.refresh()
+
+    def refresh(self):
+        """Fetch the list from the lb"""
+        rules = self._lb.rules_get(self._pattern, self._minimal)
+
+        del self[:]
+        self.extend(rules)
+
+    @f5.util.lbtransaction
+    def sync(self, create=False):
+        """Push the local attributes of all rules to the lb, creating them
+        first with create. Attributes not set on every rule are skipped."""
+        if create is True:
+            self._lbcall('create', self._ruledefs(self._getattr('_definition')))
+        elif None not in self._getattr('_definition'):
+            self.definition = self._getattr('_definition')
+
+        for attr in ('description', 'ignore_verification'):
+            values = self._getattr('_' + attr)
+            if None not in values:
+                setattr(self, attr, values)
+
+    @f5.util.lbwriter2
+    def delete(self):
+        """Delete all rules from the lb and empty the list"""
+        if self:
+            self._lbcall('delete', self.names)
+        del self[:]
+
+    def _lbcall(self, call, *args, **kwargs):
+        try:
+            return self._lb._call('LocalLB.Rule.' + call, *args, **kwargs)
+        except ServerError as e:
+            if 'was not found.' in str(e):
+                raise RuleNotFound(str(e))
+            else:
+                raise
+
+    def _ruledefs(self, definitions):
+        return [{'rule_name': name, 'rule_definition': definition}
+                for name, definition in zip(self.names, definitions)]
+
+    def _setattr(self, attr, values):
+        """Sets an attribute on all objects in list"""
+        if len(values) != len(self):
+            raise ValueError('value must be of same length as list')
+
+        for idx,rule in enumerate(self):
+            setattr(rule, attr, values[idx])
+
+    def _getattr(self, attr):
+        return [getattr(rule, attr) for rule in self]
+
+    #### LB ####
+    @property
+    def lb(self):
+        return self._lb
+
+    @lb.setter
+    @f5.util.multisetter
+    def lb(self, value):
+        self._setattr('lb', value)
+        self._lb = value[0]
+
+    #### NAME ####
+    @property
+    def names(self):
+        return self._getattr('_name')
+
+    #### PATTERN ####
+    @property
+    def pattern(self):
+        return self._pattern
+
+    @pattern.setter
+    def pattern(self, value):
+        self._pattern = value
+        self.refresh()
+
+    ### DEFINITION ###
+    @property
+    def definition(self):
+        values = [ruledef['rule_definition'] for ruledef in self._lbcall('query_rule', self.names)]
+        self._setattr('_definition', values)
+        f5.util.mark_clean(self, ['_definition'])
+        return values
+
+    @definition.setter
+    @f5.util.multisetter
+    @f5.util.lbwriter2
+    def definition(self, values):
+        self._lbcall('modify_rule', self._ruledefs(values))
+        self._setattr('_definition', values)
+        f5.util.mark_saved(self, ['_definition'])
+
+    ### DESCRIPTION ###
+    @property
+    def description(self):
+        values = self._lbcall('get_description', self.names)
+        self._setattr('_description', values)
+        f5.util.mark_clean(self, ['_description'])
+        return values
+
+    @description.setter
+    @f5.util.multisetter
+    @f5.util.lbwriter2
+    def description(self, values):
+        self._lbcall('set_description', self.names, values)
+        self._setattr('_description', values)
+        f5.util.mark_saved(self, ['_description'])
+
+    ### IGNORE_VERIFICATION ###
+    @property
+    def ignore_verification(self):
+        values = [Rule._iv_to_bool(iv) for iv in self._lbcall('get_ignore_verification', self.names)]
+        self._setattr('_ignore_verification', values)
+        f5.util.mark_clean(self, ['_ignore_verification'])
+        return values
+
+    @ignore_verification.setter
+    @f5.util.multisetter
+    @f5.util.lbwriter2
+    def ignore_verification(self, values):
+        self._lbcall('set_ignore_verification', self.names,
+                [Rule._bool_to_iv(value) for value in values])
+        self._setattr('_ignore_verification', values)
+        f5.util.mark_saved(self, ['_ignore_verification'])
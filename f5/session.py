@@ -0,0 +1,170 @@
+import threading
+import time
+
+from functools import reduce
+
+
+###########################################################################
+# Sessions
+###########################################################################
+# Every session on the device has its own active folder, recursive query state
+# and transaction, so an Lb with a pool of sessions tracks them per session.
+# The wanted values (active_folder, recursive_query) are set by the Lb while
+# the session is checked out, the device_* values are what the device is known
+# to have; Lb._sync_session() sends the difference before the next call.
+# transaction is None when we don't know (e.g. after a failed call).
+class Session(object):
+    """An iControl session with its own clients and session state"""
+    def __init__(self, base_transport, use_session=True, timings=None):
+        self._base_transport = base_transport
+        self._use_session    = use_session
+        self._timings        = timings if timings is not None else {}
+        self._idle_lock      = threading.Lock()
+
+        self.connect()
+
+    def __repr__(self):
+        return 'f5.session.Session(%s)' % (self.id)
+
+    def connect(self):
+        """(Re)start the session, which forgets all session state"""
+        if self._use_session:
+            self.id        = self._base_transport.System.Session.get_session_identifier()
+            self.transport = self._base_transport.with_session_id(self.id)
+        else:
+            self.id        = None
+            self.transport = self._base_transport
+
+        # Interface clients and the extra clients of parallel fetches
+        self.clients = {}
+        self.idle    = []
+
+        self.active_folder              = None
+        self.recursive_query            = None
+        self.transaction                = False
+        self.device_active_folder       = None
+        self.device_recursive_query     = None
+        self.device_transaction_timeout = None
+
+        self.broken    = False
+        self.last_used = time.time()
+
+    def client(self, interface):
+        """Returns the (cached) client of an interface, e.g. 'LocalLB.Pool'"""
+        try:
+            return self.clients[interface]
+        except KeyError:
+            # This is where bigsuds loads the wsdl
+            start  = time.time()
+            client = reduce(getattr, interface.split('.'), self.transport)
+            self._timings.setdefault(interface, time.time() - start)
+
+            self.clients[interface] = client
+            return client
+
+    def method(self, call):
+        interface, method = call.rsplit('.', 1)
+        return getattr(self.client(interface), method)
+
+    def worker_call(self, call):
+        """Perform a (call, *args) tuple on an extra client on this session,
+        safe to use from many threads at once"""
+        with self._idle_lock:
+            if self.idle:
+                transport = self.idle.pop()
+            else:
+                transport = self._base_transport.with_session_id(self.id)
+
+        try:
+            return reduce(getattr, call[0].split('.'), transport)(*call[1:])
+        finally:
+            with self._idle_lock:
+                self.idle.append(transport)
+
+    def ping(self):
+        """Check the session is still valid (and learn its folder)"""
+        self.device_active_folder = self.client('System.Session').get_active_folder()
+
+
+class SessionPool(object):
+    """Up to size sessions, created on demand and handed out one at a time
+
+    Sessions that were marked broken, or that failed a ping after being idle
+    for more than max_idle seconds, are restarted before they are handed out.
+    """
+    def __init__(self, factory, size=1, max_idle=300, sessions=None):
+        self._factory  = factory
+        self._size     = size
+        self._max_idle = max_idle
+        self._sessions = list(sessions or [])
+        self._idle     = list(self._sessions)
+        self._creating = 0
+        self._cond     = threading.Condition()
+
+    def __repr__(self):
+        return 'f5.session.SessionPool(size=%s, sessions=%s, idle=%s)' % (
+                self._size, len(self._sessions), len(self._idle))
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def sessions(self):
+        return list(self._sessions)
+
+    @property
+    def idle(self):
+        return len(self._idle)
+
+    def get(self):
+        """Returns an idle session, blocks if all size sessions are in use"""
+        with self._cond:
+            while not self._idle and len(self._sessions) + self._creating >= self._size:
+                self._cond.wait()
+
+            # Most recently used first, it's the least likely to have expired
+            if self._idle:
+                session = self._idle.pop()
+            else:
+                session = None
+                self._creating += 1
+
+        if session is None:
+            try:
+                session = self._factory()
+            finally:
+                with self._cond:
+                    self._creating -= 1
+                    if session is not None:
+                        self._sessions.append(session)
+                    self._cond.notify()
+            return session
+
+        try:
+            self._check(session)
+        except:
+            self.put(session)
+            raise
+
+        return session
+
+    def put(self, session):
+        session.last_used = time.time()
+        with self._cond:
+            self._idle.append(session)
+            self._cond.notify()
+
+    def _check(self, session):
+        if not session.broken:
+            if time.time() - session.last_used < self._max_idle:
+                return
+            try:
+                session.ping()
+                return
+            except Exception:
+                pass
+
+        # Stays broken if restarting fails too
+        session.broken = True
+        session.connect()
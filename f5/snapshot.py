@@ -0,0 +1,222 @@
+import f5
+import time
+
+from collections import namedtuple
+from contextlib import contextmanager
+
+
+###########################################################################
+# Records
+###########################################################################
+# Read-only copies of the local attributes of the F5 objects. Records refer
+# to each other: a poolmember to its node, a pool to its poolmembers and a
+# virtualserver to its default pool, all from the same snapshot.
+NodeRecord = namedtuple('NodeRecord', [
+    'name', 'address', 'av_status', 'connection_limit', 'description',
+    'dynamic_ratio', 'enabled', 'rate_limit', 'ratio', 'status_descr'])
+
+PoolRecord = namedtuple('PoolRecord', [
+    'name', 'active_member_count', 'description', 'lbmethod', 'members',
+    'minimum_active_member', 'minimum_up_member', 'slow_ramp_time'])
+
+# pool is the name of the pool, see Snapshot.pool()
+PoolMemberRecord = namedtuple('PoolMemberRecord', [
+    'node', 'port', 'pool', 'address', 'availability_status',
+    'connection_limit', 'description', 'dynamic_ratio', 'enabled', 'priority',
+    'rate_limit', 'ratio', 'status_description'])
+
+VirtualServerRecord = namedtuple('VirtualServerRecord', [
+    'name', 'address', 'default_pool', 'description', 'enabled', 'port',
+    'profiles', 'protocol', 'source', 'vstype', 'wildmask'])
+
+RuleRecord = namedtuple('RuleRecord', [
+    'name', 'definition', 'description', 'ignore_verification'])
+
+
+class Snapshot(object):
+    """All nodes, pools, poolmembers, virtualservers and rules of an lb at one
+    point in time, as read-only records
+
+    Taken with lb.snapshot(), in three passes of parallel bulk calls: the
+    object lists, the attributes of all objects (pools include their member
+    lists) and the attributes of all poolmembers. costs has the calls and
+    seconds of every phase.
+    """
+    __slots__ = ('_host', '_taken', '_costs', '_nodes', '_pools', '_poolmembers',
+            '_virtualservers', '_rules', '_index')
+
+    def __init__(self, host, taken, costs, nodes, pools, poolmembers,
+            virtualservers, rules):
+        set = super(Snapshot, self).__setattr__
+        set('_host', host)
+        set('_taken', taken)
+        set('_costs', costs)
+        set('_nodes', tuple(nodes))
+        set('_pools', tuple(pools))
+        set('_poolmembers', tuple(poolmembers))
+        set('_virtualservers', tuple(virtualservers))
+        set('_rules', tuple(rules))
+        set('_index', {
+            'nodes'          : dict((r.name, r) for r in self._nodes),
+            'pools'          : dict((r.name, r) for r in self._pools),
+            'virtualservers' : dict((r.name, r) for r in self._virtualservers),
+            'rules'          : dict((r.name, r) for r in self._rules),
+        })
+
+    def __setattr__(self, attr, value):
+        raise AttributeError('f5.Snapshot is read-only')
+
+    def __repr__(self):
+        return ('f5.Snapshot(%s, nodes=%s, pools=%s, poolmembers=%s, '
+                'virtualservers=%s, rules=%s)' % (self._host, len(self._nodes),
+                    len(self._pools), len(self._poolmembers),
+                    len(self._virtualservers), len(self._rules)))
+
+    ###########################################################################
+    # Properties
+    ###########################################################################
+    @property
+    def host(self):
+        return self._host
+
+    @property
+    def taken(self):
+        """When the snapshot was started, in seconds since the epoch"""
+        return self._taken
+
+    @property
+    def costs(self):
+        """{phase: {'calls': n, 'seconds': s}}, including 'total'"""
+        return dict((phase, dict(cost)) for phase, cost in self._costs.items())
+
+    @property
+    def nodes(self):
+        return self._nodes
+
+    @property
+    def pools(self):
+        return self._pools
+
+    @property
+    def poolmembers(self):
+        return self._poolmembers
+
+    @property
+    def virtualservers(self):
+        return self._virtualservers
+
+    @property
+    def rules(self):
+        return self._rules
+
+    ###########################################################################
+    # PUBLIC API
+    ###########################################################################
+    # Lookups by name, None if there's no such object
+    def node(self, name):
+        return self._index['nodes'].get(str(name))
+
+    def pool(self, name):
+        return self._index['pools'].get(str(name))
+
+    def virtualserver(self, name):
+        return self._index['virtualservers'].get(str(name))
+
+    def rule(self, name):
+        return self._index['rules'].get(str(name))
+
+    ###########################################################################
+    # INTERNAL API
+    ###########################################################################
+    @classmethod
+    def _take(cls, lb):
+        """Load everything from lb, which must be in recursive mode (see
+        Lb.snapshot)"""
+        taken = time.time()
+        costs = {}
+
+        @contextmanager
+        def phase(name):
+            calls = lb._calls_made()
+            start = time.time()
+            yield
+            costs[name] = {'calls': lb._calls_made() - calls,
+                           'seconds': time.time() - start}
+
+        with lb._checkout():
+            with phase('total'):
+                with phase('lists'):
+                    node_names, pool_names, vs_names, rule_names = lb._call_many([
+                        ('LocalLB.NodeAddressV2.get_list',),
+                        ('LocalLB.Pool.get_list',),
+                        ('LocalLB.VirtualServer.get_list',),
+                        ('LocalLB.Rule.get_list',),
+                    ])
+
+                # All types at once, pools come with their member lists
+                with phase('objects'):
+                    groups = [(Klass, Klass.factory.create(names, lb)) for Klass, names in [
+                        (f5.Node, node_names),
+                        (f5.Pool, pool_names),
+                        (f5.VirtualServer, vs_names),
+                        (f5.Rule, rule_names),
+                    ] if names]
+
+                    calls   = [Klass._refresh_calls(objects) for Klass, objects in groups]
+                    results = iter(lb._call_many([c for _calls in calls for c in _calls]))
+                    for (Klass, objects), _calls in zip(groups, calls):
+                        Klass._apply_refresh(lb, objects, [next(results) for c in _calls])
+
+                    objects = dict(groups)
+
+                with phase('poolmembers'):
+                    poolmembers = [pm for pool in objects.get(f5.Pool, [])
+                            for pm in pool._members]
+                    if poolmembers:
+                        f5.PoolMember._refresh_objects(lb, poolmembers)
+
+                with phase('records'):
+                    snapshot = cls._records(lb, taken, costs,
+                            objects.get(f5.Node, []), objects.get(f5.Pool, []),
+                            poolmembers, objects.get(f5.VirtualServer, []),
+                            objects.get(f5.Rule, []))
+
+        return snapshot
+
+    @classmethod
+    def _records(cls, lb, taken, costs, nodes, pools, poolmembers, virtualservers, rules):
+        node_records = [NodeRecord(n._name, n._address, n._av_status,
+                n._connection_limit, n._description, n._dynamic_ratio,
+                n._enabled, n._rate_limit, n._ratio, n._status_descr)
+            for n in nodes]
+        node_index = dict((r.name, r) for r in node_records)
+
+        pm_records = [PoolMemberRecord(node_index.get(pm._node._name, pm._node._name),
+                pm._port, pm._pool._name, pm._address, pm._availability_status,
+                pm._connection_limit, pm._description, pm._dynamic_ratio,
+                pm._enabled, pm._priority, pm._rate_limit, pm._ratio,
+                pm._status_description)
+            for pm in poolmembers]
+
+        pool_records = []
+        pm_records_iter = iter(pm_records)
+        for p in pools:
+            members = tuple(next(pm_records_iter) for pm in p._members)
+            pool_records.append(PoolRecord(p._name, p._active_member_count,
+                p._description, p._lbmethod, members, p._minimum_active_member,
+                p._minimum_up_member, p._slow_ramp_time))
+        pool_index = dict((r.name, r) for r in pool_records)
+
+        vs_records = [VirtualServerRecord(vs._name, vs._address,
+                pool_index.get(str(vs._default_pool)), vs._description,
+                vs._enabled, vs._port,
+                tuple((p['profile_context'], p['profile_name']) for p in vs._profiles),
+                vs._protocol, vs._source, vs._vstype, vs._wildmask)
+            for vs in virtualservers]
+
+        rule_records = [RuleRecord(r._name, r._definition, r._description,
+                r._ignore_verification)
+            for r in rules]
+
+        return cls(lb.host, taken, costs, node_records, pool_records, pm_records,
+                vs_records, rule_records)
@@ -0,0 +1,700 @@
+import copy
+import itertools
+import threading
+import time
+
+from bigsuds import ServerError
+
+###########################################################################
+# In-process stand-in for the iControl SOAP api
+###########################################################################
+# FakeBigIP can be handed to f5.Lb as its transport. It emulates the parts of
+# LocalLB.NodeAddressV2, LocalLB.Pool, LocalLB.VirtualServer, LocalLB.Rule,
+# System.Session, System.SystemInfo and System.Failover that this library
+# uses, keeps everything in memory and counts every call that is made.
+#
+#   bigip = f5.testing.FakeBigIP(latency=0.06)
+#   bigip.populate(nodes=1000, pools=100, members_per_pool=10)
+#   lb = f5.Lb('fake', 'admin', 'admin', transport=bigip)
+#   lb.nodes_get()
+#   print(bigip.stats.calls)
+#
+# Like on a real device, writes made in a transaction are queued on their
+# session and only applied (all or nothing) on submit_transaction, a rollback
+# discards them. Getters always see the applied state.
+
+
+class _Fault(object):
+    def __init__(self, faultstring):
+        self.faultstring = faultstring
+
+
+def _server_error(interface, method, message):
+    """Build a ServerError that reads like the ones bigsuds raises"""
+    return ServerError(_Fault(
+        'Exception caught in %s::urn:iControl:%s::%s()\n'
+        'Exception: Common::OperationFailed\n'
+        '    primary_error_code   : 16908342 (0x01020036)\n'
+        '    secondary_error_code : 0\n'
+        '    error_string         : 01020036:3: %s'
+        % (interface.split('.')[0], interface.replace('.', '/'), method,
+            message)), None)
+
+
+def _folder(name):
+    return name.rsplit('/', 1)[0] or '/'
+
+
+class CallStats(object):
+    """Counts calls, (approximate) payload bytes and time spent on the device"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def __repr__(self):
+        return 'CallStats(calls=%s, bytes=%s)' % (self.calls, self.bytes)
+
+    def reset(self):
+        with self._lock:
+            self.calls   = 0
+            self.bytes   = 0
+            self.methods = {}
+
+    def record(self, call, nbytes):
+        with self._lock:
+            self.calls += 1
+            self.bytes += nbytes
+            self.methods[call] = self.methods.get(call, 0) + 1
+
+
+class _Interface(object):
+    """Wraps an emulated interface so every call is counted and delayed"""
+    def __init__(self, bigip, name, impl):
+        self._bigip = bigip
+        self._name  = name
+        self._impl  = impl
+
+    def __getattr__(self, attr):
+        method = getattr(self._impl, attr)
+        name   = '%s.%s' % (self._name, attr)
+        bigip  = self._bigip
+
+        def call(*args, **kwargs):
+            if bigip.latency:
+                time.sleep(bigip.latency)
+
+            session = bigip.session
+            if (session['transaction'] and name.startswith('LocalLB.')
+                    and not attr.startswith(('get_', 'query_'))):
+                session['queued'].append((method, args, kwargs))
+                result = None
+            else:
+                result = method(*args, **kwargs)
+            bigip.stats.record(name, len(repr(args)) + len(repr(result)))
+
+            return result
+
+        call.__name__ = attr
+        return call
+
+
+class _Namespace(object):
+    def __init__(self, bigip, interfaces):
+        for name, impl in interfaces.items():
+            setattr(self, name, _Interface(bigip, '%s.%s' %
+                (type(self).__name__, name), impl(bigip)))
+
+
+class LocalLB(_Namespace):
+    pass
+
+
+class System(_Namespace):
+    pass
+
+
+class _FakeDevice(object):
+    """State shared by all sessions of one FakeBigIP"""
+    def __init__(self, version):
+        self.version        = version
+        self.lock           = threading.RLock()
+        self.session_ids    = itertools.count(1)
+        self.sessions       = {}
+        self.nodes          = {}
+        self.pools          = {}
+        self.virtualservers = {}
+        self.rules          = {}
+
+
+class FakeBigIP(object):
+    """A bigsuds.BIGIP look-alike backed by an in-memory device"""
+    def __init__(self, latency=0, version='BIG-IP_v11.6.0', _device=None,
+            _session_id=None):
+        self.latency = latency
+        self.stats   = CallStats() if _device is None else None
+
+        self._device     = _device or _FakeDevice(version)
+        self._session_id = _session_id
+
+        with self._device.lock:
+            self._device.sessions.setdefault(_session_id, self._new_session())
+
+        self.LocalLB = LocalLB(self, {
+            'NodeAddressV2' : _NodeAddressV2,
+            'Pool'          : _Pool,
+            'Rule'          : _Rule,
+            'VirtualServer' : _VirtualServer,
+        })
+        self.System = System(self, {
+            'Failover'   : _Failover,
+            'Session'    : _Session,
+            'SystemInfo' : _SystemInfo,
+        })
+
+    def __repr__(self):
+        return 'FakeBigIP(session_id=%s)' % self._session_id
+
+    @staticmethod
+    def _new_session():
+        return {
+            'active_folder'       : '/Common',
+            'recursive_query'     : 'STATE_DISABLED',
+            'transaction'         : False,
+            'transaction_timeout' : 30,
+            'queued'              : [],
+        }
+
+    @property
+    def session(self):
+        return self._device.sessions[self._session_id]
+
+    def with_session_id(self, session_id=None):
+        """Returns a FakeBigIP bound to an (optionally new) session"""
+        if session_id is None:
+            session_id = self.System.Session.get_session_identifier()
+
+        session = FakeBigIP(self.latency, _device=self._device,
+                _session_id=session_id)
+        session.stats = self.stats
+
+        return session
+
+    #### Device content ####
+    def add_node(self, name, address, connection_limit=0, description='',
+            dynamic_ratio=1, enabled=True, rate_limit=0, ratio=1):
+        self._device.nodes[name] = {
+            'address'          : address,
+            'connection_limit' : connection_limit,
+            'description'      : description,
+            'dynamic_ratio'    : dynamic_ratio,
+            'enabled'          : enabled,
+            'rate_limit'       : rate_limit,
+            'ratio'            : ratio,
+        }
+
+    def add_pool(self, name, lbmethod='LB_METHOD_ROUND_ROBIN', members=(),
+            description=''):
+        self._device.pools[name] = {
+            'description'           : description,
+            'lbmethod'              : lbmethod,
+            'members'               : [],
+            'minimum_active_member' : 0,
+            'minimum_up_member'     : 0,
+            'slow_ramp_time'        : 10,
+        }
+        for member in members:
+            self.add_member(name, member['address'], member['port'])
+
+    def add_member(self, pool, address, port, **kwargs):
+        member = {
+            'address'          : address,
+            'port'             : port,
+            'connection_limit' : 0,
+            'connections'      : 0,
+            'description'      : '',
+            'dynamic_ratio'    : 1,
+            'enabled'          : True,
+            'priority'         : 0,
+            'rate_limit'       : 0,
+            'ratio'            : 1,
+        }
+        member.update(kwargs)
+        self._device.pools[pool]['members'].append(member)
+
+    def add_virtualserver(self, name, address, port, default_pool='',
+            description='', enabled=True, profiles=None):
+        if profiles is None:
+            profiles = [{'profile_context': 'PROFILE_CONTEXT_TYPE_ALL',
+                         'profile_name': '/Common/tcp'}]
+        self._device.virtualservers[name] = {
+            'address'      : address,
+            'default_pool' : default_pool,
+            'description'  : description,
+            'enabled'      : enabled,
+            'port'         : port,
+            'profiles'     : profiles,
+            'protocol'     : 'PROTOCOL_TCP',
+            'source'       : '0.0.0.0/0',
+            'vstype'       : 'RESOURCE_TYPE_POOL',
+            'wildmask'     : '255.255.255.255',
+        }
+
+    def add_rule(self, name, definition='', description=''):
+        self._device.rules[name] = {
+            'definition'          : definition,
+            'description'         : description,
+            'ignore_verification' : 'STATE_DISABLED',
+        }
+
+    def populate(self, nodes=0, pools=0, members_per_pool=0,
+            virtualservers=0, rules=0, folder='/Common'):
+        """Fill the device with generated objects
+
+        Pool members are spread round-robin over the nodes, virtual servers
+        point at the pools in the same fashion.
+        """
+        node_names = []
+        for idx in range(nodes):
+            name = '%s/node-%05d' % (folder, idx)
+            self.add_node(name, '10.%d.%d.%d' % (idx >> 16 & 255,
+                idx >> 8 & 255, idx & 255))
+            node_names.append(name)
+
+        pool_names = []
+        for idx in range(pools):
+            name = '%s/pool-%05d' % (folder, idx)
+            self.add_pool(name)
+            for _idx in range(members_per_pool):
+                self.add_member(name,
+                    node_names[(idx * members_per_pool + _idx) % len(node_names)],
+                    80 + _idx // len(node_names))
+            pool_names.append(name)
+
+        for idx in range(virtualservers):
+            self.add_virtualserver('%s/vs-%05d' % (folder, idx),
+                '192.168.%d.%d' % (idx >> 8 & 255, idx & 255), 80,
+                pool_names[idx % len(pool_names)] if pool_names else '')
+
+        for idx in range(rules):
+            self.add_rule('%s/rule-%05d' % (folder, idx),
+                'when HTTP_REQUEST { log local0. "rule %d" }' % idx)
+
+
+###########################################################################
+# Interface emulation
+###########################################################################
+class _Emulation(object):
+    _interface = None
+    _kind      = None
+
+    def __init__(self, bigip):
+        self._bigip = bigip
+
+    @property
+    def _device(self):
+        return self._bigip._device
+
+    @property
+    def _objects(self):
+        return getattr(self._device, self._kind)
+
+    def _error(self, method, message):
+        return _server_error(self._interface, method, message)
+
+    def _lookup(self, method, name):
+        # bigsuds stringifies arguments, so f5 objects can be passed as names
+        try:
+            return self._objects[str(name)]
+        except KeyError:
+            raise self._error(method, 'The requested %s (%s) was not found.'
+                    % (self._kind[:-1], name))
+
+    def _get(self, method, names, attr):
+        return [self._lookup(method, name)[attr] for name in names]
+
+    def _set(self, method, names, attr, values):
+        with self._device.lock:
+            for name, value in zip(names, values):
+                self._lookup(method, name)[attr] = value
+
+    def get_list(self):
+        session   = self._bigip.session
+        folder    = session['active_folder']
+        recursive = session['recursive_query'] == 'STATE_ENABLED'
+
+        if recursive:
+            prefix = folder.rstrip('/') + '/'
+            return [name for name in self._objects
+                    if _folder(name) == folder or name.startswith(prefix)]
+
+        return [name for name in self._objects if _folder(name) == folder]
+
+    def get_description(self, names):
+        return self._get('get_description', names, 'description')
+
+    def set_description(self, names, values):
+        self._set('set_description', names, 'description', values)
+
+
+def _getter(attr):
+    def get(self, names):
+        return self._get('get_' + attr, names, attr)
+    return get
+
+
+def _setter(attr):
+    def set(self, names, values):
+        self._set('set_' + attr, names, attr, values)
+    return set
+
+
+def _status(enabled, prefix='ENABLED_STATUS_'):
+    return {
+        'availability_status': 'AVAILABILITY_STATUS_GREEN',
+        'enabled_status'     : prefix + ('ENABLED' if enabled else 'DISABLED'),
+        'status_description' : 'Node address is available' if enabled
+                                else 'Node address is disabled',
+    }
+
+
+class _NodeAddressV2(_Emulation):
+    _interface = 'LocalLB.NodeAddressV2'
+    _kind      = 'nodes'
+
+    get_address          = _getter('address')
+    get_connection_limit = _getter('connection_limit')
+    set_connection_limit = _setter('connection_limit')
+    get_dynamic_ratio    = _getter('dynamic_ratio')
+    set_dynamic_ratio    = _setter('dynamic_ratio')
+    get_dynamic_ratio_v2 = _getter('dynamic_ratio')
+    set_dynamic_ratio_v2 = _setter('dynamic_ratio')
+    get_rate_limit       = _getter('rate_limit')
+    set_rate_limit       = _setter('rate_limit')
+    get_ratio            = _getter('ratio')
+    set_ratio            = _setter('ratio')
+
+    def get_object_status(self, names):
+        return [_status(self._lookup('get_object_status', name)['enabled'])
+                for name in names]
+
+    def set_session_enabled_state(self, names, states):
+        self._set('set_session_enabled_state', names, 'enabled',
+                [state == 'STATE_ENABLED' for state in states])
+
+    def create(self, names, addresses, limits):
+        for name, address, limit in zip(names, addresses, limits):
+            if name in self._objects:
+                raise self._error('create', 'The requested node (%s) already '
+                        'exists.' % name)
+            self._bigip.add_node(name, address, limit)
+
+    def delete_node_address(self, names):
+        with self._device.lock:
+            for name in names:
+                self._lookup('delete_node_address', name)
+                del self._objects[name]
+
+
+class _Pool(_Emulation):
+    _interface = 'LocalLB.Pool'
+    _kind      = 'pools'
+
+    get_lb_method             = _getter('lbmethod')
+    set_lb_method             = _setter('lbmethod')
+    get_minimum_active_member = _getter('minimum_active_member')
+    set_minimum_active_member = _setter('minimum_active_member')
+    get_minimum_up_member     = _getter('minimum_up_member')
+    set_minimum_up_member     = _setter('minimum_up_member')
+    get_slow_ramp_time        = _getter('slow_ramp_time')
+    set_slow_ramp_time        = _setter('slow_ramp_time')
+
+    def get_active_member_count(self, names):
+        return [len([m for m in self._lookup('get_active_member_count',
+            name)['members'] if m['enabled']]) for name in names]
+
+    def get_member(self, names):
+        return [[{'address': m['address'], 'port': m['port']}
+            for m in self._lookup('get_member', name)['members']]
+                for name in names]
+
+    get_member_v2 = get_member
+
+    def get_statistics(self, names):
+        statistics = []
+        for name in names:
+            self._lookup('get_statistics', name)
+            statistics.append({'pool_name': name, 'statistics': [
+                {'type': 'STATISTIC_SERVER_SIDE_CURRENT_CONNECTIONS',
+                 'value': {'high': 0, 'low': 0}}]})
+
+        return {'statistics': statistics,
+                'time_stamp': {'year': 2016, 'month': 1, 'day': 1,
+                               'hour': 0, 'minute': 0, 'second': 0}}
+
+    def reset_statistics(self, names):
+        for name in names:
+            self._lookup('reset_statistics', name)
+
+    def create_v2(self, names, lbmethods, members):
+        for name, lbmethod, _members in zip(names, lbmethods, members):
+            if name in self._objects:
+                raise self._error('create_v2', 'The requested pool (%s) '
+                        'already exists.' % name)
+            self._bigip.add_pool(name, lbmethod, _members)
+
+    def delete_pool(self, names):
+        with self._device.lock:
+            for name in names:
+                self._lookup('delete_pool', name)
+                del self._objects[name]
+
+    def add_member(self, names, members):
+        with self._device.lock:
+            for name, _members in zip(names, members):
+                self._lookup('add_member', name)
+                for member in _members:
+                    self._bigip.add_member(name, member['address'],
+                            member['port'])
+
+    add_member_v2 = add_member
+
+    def remove_member(self, names, members):
+        with self._device.lock:
+            for name, _members in zip(names, members):
+                for member in _members:
+                    self._member('remove_member', name, member)
+                pool = self._lookup('remove_member', name)
+                remove = [(m['address'], m['port']) for m in _members]
+                pool['members'] = [m for m in pool['members']
+                        if (m['address'], m['port']) not in remove]
+
+    remove_member_v2 = remove_member
+
+    #### members ####
+    def _member(self, method, name, addrport):
+        name = str(name)
+        for member in self._lookup(method, name)['members']:
+            if (member['address'] == addrport['address']
+                    and member['port'] == addrport['port']):
+                return member
+
+        raise self._error(method, 'The requested pool member (%s %s %s) was '
+                'not found.' % (name, addrport['address'], addrport['port']))
+
+    def _get_member(self, method, names, addrportsq2, attr):
+        return [[self._member(method, name, ap)[attr] for ap in addrportsq]
+                for name, addrportsq in zip(names, addrportsq2)]
+
+    def _set_member(self, method, names, addrportsq2, values2, attr):
+        with self._device.lock:
+            for name, addrportsq, values in zip(names, addrportsq2, values2):
+                for addrport, value in zip(addrportsq, values):
+                    self._member(method, name, addrport)[attr] = value
+
+    def get_member_address(self, names, addrportsq2):
+        return self._get_member('get_member_address', names, addrportsq2,
+                'address')
+
+    def get_member_object_status(self, names, addrportsq2):
+        return [[_status(enabled) for enabled in enableds] for enableds in
+                self._get_member('get_member_object_status', names,
+                    addrportsq2, 'enabled')]
+
+    def set_member_session_enabled_state(self, names, addrportsq2, states2):
+        self._set_member('set_member_session_enabled_state', names,
+                addrportsq2, [[state == 'STATE_ENABLED' for state in states]
+                    for states in states2], 'enabled')
+
+    def get_member_statistics(self, names, addrportsq2):
+        connections2 = self._get_member('get_member_statistics', names,
+                addrportsq2, 'connections')
+        return [{'statistics': [
+                    {'member': addrport, 'statistics': [
+                        {'type': 'STATISTIC_SERVER_SIDE_CURRENT_CONNECTIONS',
+                         'value': {'high': 0, 'low': connections}}]}
+                    for addrport, connections in zip(addrportsq, connectionsq)],
+                 'time_stamp': {'year': 2016, 'month': 1, 'day': 1,
+                                'hour': 0, 'minute': 0, 'second': 0}}
+                for addrportsq, connectionsq in zip(addrportsq2, connections2)]
+
+
+def _member_getter(attr):
+    def get(self, names, addrportsq2):
+        return self._get_member('get_member_' + attr, names, addrportsq2, attr)
+    return get
+
+
+def _member_setter(attr):
+    def set(self, names, addrportsq2, values2):
+        self._set_member('set_member_' + attr, names, addrportsq2, values2,
+                attr)
+    return set
+
+
+for _attr in ('connection_limit', 'description', 'dynamic_ratio', 'priority',
+        'rate_limit', 'ratio'):
+    setattr(_Pool, 'get_member_' + _attr, _member_getter(_attr))
+    setattr(_Pool, 'set_member_' + _attr, _member_setter(_attr))
+
+
+class _VirtualServer(_Emulation):
+    _interface = 'LocalLB.VirtualServer'
+    _kind      = 'virtualservers'
+
+    get_default_pool_name = _getter('default_pool')
+    set_default_pool_name = _setter('default_pool')
+    get_profile           = _getter('profiles')
+    get_protocol          = _getter('protocol')
+    set_protocol          = _setter('protocol')
+    get_source_address    = _getter('source')
+    set_source_address    = _setter('source')
+    get_type              = _getter('vstype')
+    set_type              = _setter('vstype')
+    get_wildmask          = _getter('wildmask')
+    set_wildmask          = _setter('wildmask')
+
+    def get_destination_v2(self, names):
+        return [{'address': vs['address'], 'port': vs['port']} for vs in
+                [self._lookup('get_destination_v2', name) for name in names]]
+
+    def set_destination_v2(self, names, destinations):
+        with self._device.lock:
+            for name, destination in zip(names, destinations):
+                vs = self._lookup('set_destination_v2', name)
+                vs['address'] = destination['address']
+                vs['port']    = destination['port']
+
+    def get_enabled_state(self, names):
+        return ['STATE_ENABLED' if enabled else 'STATE_DISABLED' for enabled
+                in self._get('get_enabled_state', names, 'enabled')]
+
+    def set_enabled_state(self, names, states):
+        self._set('set_enabled_state', names, 'enabled',
+                [state == 'STATE_ENABLED' for state in states])
+
+    def create(self, definitions, wildmasks, resources, profiles):
+        for definition, resource, profile in zip(definitions, resources, profiles):
+            self._bigip.add_virtualserver(definition['name'],
+                    definition['address'], definition['port'],
+                    resource['default_pool_name'], profiles=profile)
+
+    def delete_virtual_server(self, names):
+        with self._device.lock:
+            for name in names:
+                self._lookup('delete_virtual_server', name)
+                del self._objects[name]
+
+
+class _Rule(_Emulation):
+    _interface = 'LocalLB.Rule'
+    _kind      = 'rules'
+
+    get_ignore_verification = _getter('ignore_verification')
+    set_ignore_verification = _setter('ignore_verification')
+
+    def query_rule(self, names):
+        return [{'rule_name': name, 'rule_definition': definition}
+                for name, definition in
+                    zip(names, self._get('query_rule', names, 'definition'))]
+
+    def modify_rule(self, ruledefs):
+        self._set('modify_rule', [r['rule_name'] for r in ruledefs],
+                'definition', [r['rule_definition'] for r in ruledefs])
+
+    def create(self, ruledefs):
+        for ruledef in ruledefs:
+            self._bigip.add_rule(ruledef['rule_name'],
+                    ruledef['rule_definition'])
+
+    def delete(self, names):
+        with self._device.lock:
+            for name in names:
+                self._lookup('delete', name)
+                del self._objects[name]
+
+
+class _Session(_Emulation):
+    _interface = 'System.Session'
+
+    def _state(self):
+        return self._bigip.session
+
+    def get_session_identifier(self):
+        with self._device.lock:
+            session_id = next(self._device.session_ids)
+            self._device.sessions[session_id] = FakeBigIP._new_session()
+
+        return session_id
+
+    def get_active_folder(self):
+        return self._state()['active_folder']
+
+    def set_active_folder(self, folder):
+        self._state()['active_folder'] = folder
+
+    def get_recursive_query_state(self):
+        return self._state()['recursive_query']
+
+    def set_recursive_query_state(self, state):
+        self._state()['recursive_query'] = state
+
+    def get_transaction_timeout(self):
+        return self._state()['transaction_timeout']
+
+    def set_transaction_timeout(self, value):
+        self._state()['transaction_timeout'] = value
+
+    def start_transaction(self):
+        if self._state()['transaction']:
+            raise self._error('start_transaction',
+                    'Only one transaction can be open at any time')
+        self._state()['transaction'] = True
+
+    def submit_transaction(self):
+        if not self._state()['transaction']:
+            raise self._error('submit_transaction',
+                    'No transaction is open to submit.')
+        self._state()['transaction'] = False
+        queued, self._state()['queued'] = self._state()['queued'], []
+
+        # All or nothing
+        device = self._device
+        with device.lock:
+            saved = copy.deepcopy((device.nodes, device.pools,
+                device.virtualservers, device.rules))
+            try:
+                for method, args, kwargs in queued:
+                    method(*args, **kwargs)
+            except Exception:
+                (device.nodes, device.pools, device.virtualservers,
+                    device.rules) = saved
+                raise
+
+    def rollback_transaction(self):
+        if not self._state()['transaction']:
+            raise self._error('rollback_transaction',
+                    'No transaction is open to roll back.')
+        self._state()['transaction'] = False
+        self._state()['queued']      = []
+
+
+class _SystemInfo(_Emulation):
+    _interface = 'System.SystemInfo'
+
+    def get_version(self):
+        return self._device.version
+
+    def get_system_information(self):
+        return {'system_name': 'Linux', 'host_name': 'fake.example.com',
+                'platform': 'Z100'}
+
+    def get_product_information(self):
+        return {'product_code': 'BIG-IP', 'product_version':
+                self._device.version[8:], 'product_features': []}
+
+
+class _Failover(_Emulation):
+    _interface = 'System.Failover'
+
+    def get_failover_state(self):
+        return 'FAILOVER_STATE_ACTIVE'
@@ -0,0 +1,153 @@
+import f5
+import f5.util
+
+
+class Topology(object):
+    """Which pools use which nodes and which virtualservers use which pools,
+    from one bulk pass over all pools and virtualservers
+
+    Lookups don't call the lb, call refresh() to pick up changes (of just
+    some pools or virtualservers if you know which changed). Without
+    virtualservers only the pool side is fetched, the virtualserver lookups
+    then find nothing.
+    """
+    def __init__(self, lb, virtualservers=True):
+        self._lb      = lb
+        self._with_vs = virtualservers
+
+        # pool -> [(node, port)], node -> [(pool, port)]
+        self._pool_members = {}
+        self._node_members = {}
+
+        # virtualserver -> default pool, pool -> [virtualserver]
+        self._vs_pool  = {}
+        self._pool_vss = {}
+
+        self.refresh()
+
+    def __repr__(self):
+        return 'f5.Topology(%r, pools=%s, nodes=%s, virtualservers=%s)' % (self._lb,
+                len(self._pool_members), len(self._node_members), len(self._vs_pool))
+
+    def refresh(self, pools=None, virtualservers=None):
+        """Fetch the member lists of all pools and the default pools of all
+        virtualservers, or only those of the given pools and virtualservers
+        (names or objects). Those that are gone from the lb are dropped."""
+        if pools is None and virtualservers is None:
+            pool_names, addrportsq2, vs_names, default_pools = self._lb._get_topology(
+                    virtualservers=None if self._with_vs else [])
+            self._pool_members = {}
+            self._node_members = {}
+            self._vs_pool      = {}
+            self._pool_vss     = {}
+        else:
+            pools          = [str(pool) for pool in pools or []]
+            virtualservers = [str(vs) for vs in virtualservers or [] if self._with_vs]
+
+            pool_names, addrportsq2, vs_names, default_pools = self._lb._get_topology(
+                    pools, virtualservers)
+
+            for pool in pools:
+                self._remove_pool(pool)
+            for vs in virtualservers:
+                self._remove_vs(vs)
+
+        for pool, addrportsq in zip(pool_names, addrportsq2):
+            self._pool_members[pool] = [(ap['address'], ap['port']) for ap in addrportsq]
+            for ap in addrportsq:
+                self._node_members.setdefault(ap['address'], []).append((pool, ap['port']))
+
+        for vs, pool in zip(vs_names, default_pools):
+            if pool:
+                self._vs_pool[vs] = pool
+                self._pool_vss.setdefault(pool, []).append(vs)
+
+    def _remove_pool(self, pool):
+        # A node can be a member on more than one port
+        for node in set(node for node, port in self._pool_members.pop(pool, [])):
+            members = [m for m in self._node_members[node] if m[0] != pool]
+            if members:
+                self._node_members[node] = members
+            else:
+                del self._node_members[node]
+
+    def _remove_vs(self, vs):
+        pool = self._vs_pool.pop(vs, None)
+        if pool is not None:
+            self._pool_vss[pool].remove(vs)
+            if not self._pool_vss[pool]:
+                del self._pool_vss[pool]
+
+    ###########################################################################
+    # Properties
+    ###########################################################################
+    @property
+    def lb(self):
+        return self._lb
+
+    @property
+    def pools(self):
+        return sorted(self._pool_members)
+
+    @property
+    def nodes(self):
+        """Names of the nodes that are a member of a pool"""
+        return sorted(self._node_members)
+
+    @property
+    def virtualservers(self):
+        """Names of the virtualservers that have a default pool"""
+        return sorted(self._vs_pool)
+
+    ###########################################################################
+    # PUBLIC API
+    ###########################################################################
+    # Lookups take names or objects
+    def node_pools(self, node):
+        """Returns the names of the pools a node is a member of"""
+        return f5.util.unique(pool for pool, port in self._node_members.get(str(node), []))
+
+    def node_members(self, node):
+        """Returns an f5.PoolMemberList of the poolmembers of a node, in all
+        pools"""
+        entries = self._node_members.get(str(node), [])
+        nodes   = f5.Node.factory.create([str(node)] * len(entries), self._lb)
+        pools   = f5.Pool.factory.create([pool for pool, port in entries], self._lb)
+
+        return self._member_list([[nodes[idx], port, pools[idx]]
+                for idx, (pool, port) in enumerate(entries)])
+
+    def node_virtualservers(self, node):
+        """Returns the names of the virtualservers whose default pool a node
+        is a member of"""
+        return f5.util.unique(vs for pool in self.node_pools(node)
+                for vs in self._pool_vss.get(pool, []))
+
+    def pool_members(self, pool):
+        """Returns an f5.PoolMemberList of the poolmembers of a pool"""
+        entries = self._pool_members.get(str(pool), [])
+        nodes   = f5.Node.factory.create([node for node, port in entries], self._lb)
+        pools   = f5.Pool.factory.create([str(pool)] * len(entries), self._lb)
+
+        return self._member_list([[nodes[idx], port, pools[idx]]
+                for idx, (node, port) in enumerate(entries)])
+
+    def pool_virtualservers(self, pool):
+        """Returns the names of the virtualservers with pool as default pool"""
+        return list(self._pool_vss.get(str(pool), []))
+
+    def vs_pool(self, vs):
+        """Returns the name of the default pool of a virtualserver, None if it
+        has none"""
+        return self._vs_pool.get(str(vs))
+
+    def vs_members(self, vs):
+        """Returns an f5.PoolMemberList of the members of the default pool of
+        a virtualserver"""
+        return self.pool_members(self._vs_pool.get(str(vs), ''))
+
+    def _member_list(self, nodeportpools):
+        pmlist = f5.PoolMemberList()
+        pmlist._lb = self._lb
+        pmlist.extend(f5.PoolMember.factory.create(nodeportpools, self._lb))
+        return pmlist
@@ -2,6 +2,8 @@ from bigsuds import ServerError
 import f5.lb
 import weakref
 
+from copy import copy
+
 # Abstract Factory class for generating cached F5 objects
 class CachedFactory(object):
     def __init__(self, Klass):
@@ -22,13 +24,14 @@ class CachedFactory(object):
             # Save some bytes
             key = hash(key)
 
-            if key in self._cache:
-                objects.append(self._cache[key])
-            else:
+            # A get() as the object can be collected (by another thread)
+            # right after a membership test
+            obj = self._cache.get(key)
+            if obj is None:
                 obj = self._Klass(name, lb, *args, **kwargs)
-   
                 self._cache[key] = obj
-                objects.append(obj)
+
+            objects.append(obj)
 
         return objects
 
@@ -46,8 +49,7 @@ class CachedFactory(object):
             key = obj.lb.host + key
 
         key = hash(key)
-        if key in self._cache:
-            del self._cache[key]
+        self._cache.pop(key, None)
 
 # Looks at the first list for empty lists and removes elements in the same position from all lists
 # including itself.
@@ -69,10 +71,141 @@ def prune_f5_lists(list1, *lists):
     while [] in list1:
         list1.remove([])
 
+# Split a list into consecutive lists of at most size elements
+def chunks(values, size):
+    for idx in range(0, len(values), size):
+        yield values[idx:idx + size]
+
+
+# Dirty tracking: objects remember the values of their writable attributes as
+# last loaded from (or saved to) the lb, so save() only has to push the ones
+# that changed. They're kept as a tuple in the order of the object's _writable
+# (a dict per object takes three times the memory).
+def mark_clean(objects, attributes):
+    for obj in objects:
+        _set_clean(obj, attributes, [_clean_value(getattr(obj, a)) for a in attributes])
+
+
+def mark_saved(objects, attributes):
+    """mark_clean after a write to the lb, under Lb.batch() only once the batch
+    made it to the lb (a rolled back batch leaves the objects dirty)"""
+    # Objects not linked to an lb weren't written anywhere
+    if not objects or objects[0]._lb is None:
+        return
+
+    values = [(obj, [_clean_value(getattr(obj, a)) for a in attributes]) for obj in objects]
+
+    def apply():
+        for obj, clean in values:
+            _set_clean(obj, attributes, clean)
+
+    objects[0]._lb._after_batch(apply)
+
+
+def _clean_value(value):
+    # Copy lists (e.g. pool members) so changing them in place shows, f5
+    # objects (e.g. a default pool) are compared as they are
+    return copy(value) if isinstance(value, (list, dict)) else value
+
+
+def _set_clean(obj, attributes, values):
+    writable = obj._writable
+    clean    = getattr(obj, '_clean', None)
+    clean    = list(clean) if clean is not None else [None] * len(writable)
+
+    for a, value in zip(attributes, values):
+        clean[writable.index(a)] = value
+
+    obj._clean = tuple(clean)
+
+
+def dirty(obj, attributes):
+    """Returns the (non-None) attributes changed since obj was loaded or
+    saved, None if we don't know what's on the lb"""
+    clean = getattr(obj, '_clean', None)
+    if clean is None:
+        return None
+
+    return [a for a in attributes if getattr(obj, a) is not None
+            and getattr(obj, a) != clean[obj._writable.index(a)]]
+
+
+def unique(values):
+    """values without repeats, in order"""
+    seen = set()
+    return [v for v in values if not (v in seen or seen.add(v))]
+
+
+def shared(values):
+    """values, with equal ones as one object (statuses repeat a lot)"""
+    seen = {}
+    return [seen.setdefault(value, value) for value in values]
+
+
+class ChangeSet(object):
+    """Objects added to, removed from and modified in a list by a refresh"""
+    def __init__(self, added=None, removed=None, modified=None):
+        self.added    = added or []
+        self.removed  = removed or []
+        self.modified = modified or []
+
+    def __repr__(self):
+        return 'ChangeSet(added=%s, removed=%s, modified=%s)' % (
+                len(self.added), len(self.removed), len(self.modified))
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.modified)
+    __nonzero__ = __bool__
+
+
+# Refresh a list of objects of Klass against the current names on the lb:
+# only new names are fetched in full, objects that are gone are dropped and
+# the others are refreshed (or only their volatile attributes).
+def incremental_refresh(Klass, lb, objects, names, minimal=False, volatile_only=False):
+    """Returns the objects for names (in that order) and a ChangeSet"""
+    current = dict((obj.name, obj) for obj in objects)
+    wanted  = set(names)
+
+    added   = Klass._get_objects(lb, [n for n in names if n not in current], minimal)
+    removed = [obj for obj in objects if obj.name not in wanted]
+    kept    = [current[n] for n in names if n in current]
+
+    modified = []
+    if kept and not minimal:
+        if volatile_only:
+            attributes = Klass._volatile_attributes
+            refresh    = Klass._refresh_volatile
+        else:
+            attributes = Klass._attributes
+            refresh    = Klass._refresh_objects
+
+        before = [[getattr(obj, a) for a in attributes] for obj in kept]
+        refresh(lb, kept)
+        modified = [obj for idx, obj in enumerate(kept)
+                if [getattr(obj, a) for a in attributes] != before[idx]]
+
+    added_by_name = dict((obj.name, obj) for obj in added)
+    refreshed = [current[n] if n in current else added_by_name[n] for n in names]
+
+    return refreshed, ChangeSet(added, removed, modified)
+
 ###########################################################################
 # Decorators
 ###########################################################################
-from functools import wraps
+from functools import partial, wraps
+
+
+# For _lbcall(call, *args) of objects: a classmethod func(cls, lb, call, *args)
+# that gets the lb of the object when called on one, without keeping a bound
+# method in every object.
+class lbcall(object):
+    def __init__(self, func):
+        self._func = func
+
+    def __get__(self, obj, cls):
+        if obj is None:
+            return partial(self._func, cls)
+        return partial(self._func, cls, obj._lb)
 
 
 # Multiplies a single value to a list with length of parent instance
@@ -82,7 +215,7 @@ def multisetter(func):
         if not isinstance(values, list):
             values=[values] * len(self)
         else:
-            if len(values) is not len(self):
+            if len(values) != len(self):
                 raise ValueError('value must be of same length as list')
         func(self, values)
     return wrapper
@@ -106,6 +239,10 @@ def lbtransaction(func):
     @wraps(func)
     @lbwriter
     def wrapper(self, *args, **kwargs):
+        # A batch (see Lb.batch) has its own transaction
+        if getattr(self._lb._local, 'batch', None) is not None:
+            return func(self, *args, **kwargs)
+
         # Only if there is no existing transaction
         our_transaction = not self._lb.transaction
 
@@ -133,19 +270,20 @@ def lbtransaction(func):
 # Restore session attributes to their original values if they were changed (non-lb version)
 def restore_session_values(func):
     def wrapper(self, *args, **kwargs):
-        original_folder          = self.lb._active_folder
-        original_recursive_query = self.lb._recursive_query
+        with self.lb._checkout():
+            original_folder          = self.lb.active_folder
+            original_recursive_query = self.lb.recursive_query
 
-        try:
-            func_ret = func(self, *args, **kwargs)
-        except:
-            raise
-        finally:
-            if self.lb._active_folder != original_folder:
-                self.lb.active_folder = original_folder
-    
-            if self.lb._recursive_query != original_recursive_query:
-                self.lb.recursive_query = original_recursive_query
+            try:
+                func_ret = func(self, *args, **kwargs)
+            except:
+                raise
+            finally:
+                if self.lb.active_folder != original_folder:
+                    self.lb.active_folder = original_folder
+
+                if self.lb.recursive_query != original_recursive_query:
+                    self.lb.recursive_query = original_recursive_query
 
         return func_ret
 
@@ -169,7 +307,7 @@ def lbwriter(func):
     @lbmethod
     @lbrestore_session_values
     def wrapper(self, *args, **kwargs):
-        if self._lb._active_folder == '/':
+        if self._lb.active_folder == '/':
             self._lb.active_folder = '/Common'
 
         return func(self, *args, **kwargs)
@@ -180,26 +318,28 @@ def lbwriter2(func):
     @wraps(func)
     @lbrestore_session_values
     def wrapper(self, *args, **kwargs):
-        if self.lb._active_folder == '/':
+        if self.lb.active_folder == '/':
             self.lb.active_folder = '/Common'
 
         return func(self, *args, **kwargs)
 
     return wrapper
 
-# Restore session attributes to their original values if they were changed
+# Restore session attributes to their original values if they were changed,
+# all on one session of the lb
 def lbrestore_session_values(func):
     def wrapper(self, *args, **kwargs):
-        original_folder          = self._lb._active_folder
-        original_recursive_query = self._lb._recursive_query
+        with self._lb._checkout():
+            original_folder          = self._lb.active_folder
+            original_recursive_query = self._lb.recursive_query
 
-        func_ret = func(self, *args, **kwargs)
+            func_ret = func(self, *args, **kwargs)
 
-        if self._lb._active_folder != original_folder:
-            self._lb.active_folder = original_folder
+            if self._lb.active_folder != original_folder:
+                self._lb.active_folder = original_folder
 
-        if self._lb._recursive_query != original_recursive_query:
-            self._lb.recursive_query = original_recursive_query
+            if self._lb.recursive_query != original_recursive_query:
+                self._lb.recursive_query = original_recursive_query
 
         return func_ret
 
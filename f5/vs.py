@@ -3,6 +3,8 @@ import f5
 import f5.util
 import re
 
+from .exceptions import VirtualServerNotFound
+
 class VirtualServer(object):
     __version = 11
     __resource_types = [
@@ -34,6 +36,15 @@ class VirtualServer(object):
             'unknown',
             ]
 
+    # Local attributes save() pushes to the lb
+    _writable = ('_address', '_port', '_protocol', '_wildmask', '_default_pool',
+            '_vstype', '_description', '_enabled', '_source')
+
+    # There can be many, no __dict__. __wsdl is the lb's shared interface.
+    __slots__ = ('__wsdl', '_lb', '_name', '_address', '_default_pool', '_description',
+            '_enabled', '_port', '_profiles', '_protocol', '_source', '_vstype',
+            '_wildmask', '_clean', '__weakref__')
+
     def __init__(self, name, lb=None, address=None, default_pool=None, enabled=None,
             description=None, port=None, profiles=None, protocol=None, source=None, vstype=None,
             wildmask=None):
@@ -69,12 +80,15 @@ class VirtualServer(object):
     def __repr__(self):
         return "f5.Virtualserver('%s')" % (self._name)
 
+    def __str__(self):
+        return self._name
+
     ###########################################################################
     # Private API
     ###########################################################################
     @staticmethod
     def _get_wsdl(lb):
-        return lb._transport.LocalLB.VirtualServer
+        return lb._interface('LocalLB.VirtualServer')
 
     def _set_wsdl(self):
         self.__wsdl = self._get_wsdl(self._lb)
@@ -125,35 +139,58 @@ class VirtualServer(object):
 
         # if names is empty
         if not names:
-            return objects
+            return []
 
+        virtualservers = cls.factory.create(names, lb)
         if not minimal:
-            default_pool  = f5.Pool.factory.create(cls._get_default_pool_names(lb, names), lb)
-            description   = cls._get_descriptions(lb, names)
-            enabled_state = cls._get_enabled_states(lb, names)
-            destination   = cls._get_destinations(lb, names)
-            profiles      = cls._get_profiles(lb, names)
-            protocol      = cls._get_protocols(lb, names)
-            source        = cls._get_source_addresses(lb, names)
-            vstype        = cls._get_types(lb, names)
-            wildmask      = cls._get_wildmasks(lb, names)
+            cls._refresh_objects(lb, virtualservers)
 
-        virtualservers = cls.factory.create(names, lb)
-        for idx,vs in enumerate(virtualservers):
+        return virtualservers
 
-            if not minimal:
-                vs._address      = destination[idx]['address']
-                vs._default_pool = default_pool[idx]
-                vs._description  = description[idx]
-                vs._enabled      = cls._munge_enabled(enabled_state[idx])
-                vs._port         = destination[idx]['port']
-                vs._profiles     = profiles[idx]
-                vs._protocol     = cls._munge_protocol(protocol[idx])
-                vs._source       = source[idx]
-                vs._vstype       = cls._munge_vstype(vstype[idx])
-                vs._wildmask     = wildmask[idx]
+    @classmethod
+    def _refresh_objects(cls, lb, virtualservers):
+        """Updates all attributes of a list of VirtualServers, one call per
+        attribute"""
+        cls._apply_refresh(lb, virtualservers,
+                lb._call_many(cls._refresh_calls(virtualservers)))
+
+    # Split into the calls and the handling of their results, so the calls
+    # for many types can be made at once (see f5.snapshot)
+    @classmethod
+    def _refresh_calls(cls, virtualservers):
+        names = [vs._name for vs in virtualservers]
+
+        return [('LocalLB.VirtualServer.' + call, names) for call in [
+            'get_default_pool_name',
+            'get_description',
+            'get_enabled_state',
+            'get_destination_v2',
+            'get_profile',
+            'get_protocol',
+            'get_source_address',
+            'get_type',
+            'get_wildmask',
+        ]]
 
-        return virtualservers
+    @classmethod
+    def _apply_refresh(cls, lb, virtualservers, results):
+        (default_pool, description, enabled_state, destination, profiles,
+            protocol, source, vstype, wildmask) = results
+        default_pool = f5.Pool.factory.create(default_pool, lb)
+
+        for idx,vs in enumerate(virtualservers):
+            vs._address      = destination[idx]['address']
+            vs._default_pool = default_pool[idx]
+            vs._description  = description[idx]
+            vs._enabled      = cls._munge_enabled(enabled_state[idx])
+            vs._port         = destination[idx]['port']
+            vs._profiles     = profiles[idx]
+            vs._protocol     = cls._munge_protocol(protocol[idx])
+            vs._source       = source[idx]
+            vs._vstype       = cls._munge_vstype(vstype[idx])
+            vs._wildmask     = wildmask[idx]
+
+        f5.util.mark_clean(virtualservers, cls._writable)
 
     @classmethod
     def _refresh_default_pool(cls, lb, vss):
@@ -161,8 +198,8 @@ class VirtualServer(object):
         default_pool_names = cls._get_default_pool_names(lb, [vs.name for vs in vss])
         pools = f5.Pool.factory.create(default_pool_names, lb)
 
-        for idx,vs in vss:
-            vs._pool = pools[idx]
+        for idx,vs in enumerate(vss):
+            vs._default_pool = pools[idx]
 
     @f5.util.lbmethod
     def _get_description(self):
@@ -192,7 +229,7 @@ class VirtualServer(object):
     def _set_enabled_state(self, value=None):
         if value is None:
             value = self._unmunge_enabled(self._enabled)
-        self.__wsdl.set_enabled_state([self._name])
+        self.__wsdl.set_enabled_state([self._name], [value])
 
     @f5.util.lbmethod
     def _get_destination(self):
@@ -225,11 +262,7 @@ class VirtualServer(object):
     @f5.util.lbmethod
     def _set_source_address(self, value=None):
         if value is None:
-            value = self._source_address
-        self.__wsdl.set_source_address([self._name], [value])
-
-    @f5.util.lbmethod
-    def _set_source_address(self, value):
+            value = self._source
         self.__wsdl.set_source_address([self._name], [value])
 
     @f5.util.lbmethod
@@ -270,18 +303,26 @@ class VirtualServer(object):
             }
 
         # Not fully supported yet
-        # This requires more logic. 'profiles' and 'resource' should be broken
-        # down and constructed from other attributes.
-        profiles  = [{'profile_name': '/Common/tcp'}]
+        # This requires more logic. 'resource' should be broken down and
+        # constructed from other attributes.
         resource  = {'type': self._unmunge_vstype(self._vstype),
             'default_pool_name': self._default_pool.name}
         self.__wsdl.create([definition], [self._wildmask], [resource],
-                [profiles])
+                [self._create_profiles(self._profiles)])
 
     @f5.util.lbwriter
     def _delete_virtual_server(self):
         self.__wsdl.delete_virtual_server([self._name])
 
+    # The profiles to create a virtualserver with, tcp if it has none
+    @staticmethod
+    def _create_profiles(profiles):
+        if not profiles:
+            return [{'profile_context': 'PROFILE_CONTEXT_TYPE_ALL',
+                     'profile_name': '/Common/tcp'}]
+        return [{'profile_context': p['profile_context'], 'profile_name': p['profile_name']}
+                for p in profiles]
+
     @staticmethod
     def _munge_enabled(enabled_state):
         if enabled_state == 'STATE_ENABLED':
@@ -308,8 +349,8 @@ class VirtualServer(object):
             return []
 
         if pattern is not None:
-            if not isinstance(pattern, re._pattern_type):
-                pattern = re.compile(pattern)
+            # re.compile() also takes compiled patterns
+            pattern = re.compile(pattern)
             names = [name for name in names if pattern.match(name)]
 
         return cls._get_objects(lb, names, minimal)
@@ -375,6 +416,7 @@ class VirtualServer(object):
     def address(self):
         if self._lb:
             self._address = self._get_destination()['address']
+            f5.util.mark_clean([self], ['_address'])
         return self._address
 
     @address.setter
@@ -383,12 +425,14 @@ class VirtualServer(object):
         if self._lb:
             self._set_destination(ap)
         self._address = value
+        f5.util.mark_saved([self], ['_address', '_port'])
 
     #### default_pool ####
     @property
     def default_pool(self):
         if self._lb:
             self._default_pool = f5.Pool.factory.create([self._get_default_pool_name()], self._lb)[0]
+            f5.util.mark_clean([self], ['_default_pool'])
         return self._default_pool
 
     @default_pool.setter
@@ -399,12 +443,14 @@ class VirtualServer(object):
         if self._lb:
             self._set_default_pool_name(value.name)
         self._default_pool = value
+        f5.util.mark_saved([self], ['_default_pool'])
 
     #### description ####
     @property
     def description(self):
         if self._lb:
             self._description = self._get_description()
+            f5.util.mark_clean([self], ['_description'])
         return self._description
 
     @description.setter
@@ -412,6 +458,7 @@ class VirtualServer(object):
         if self._lb:
             self._set_description(value)
         self._description = value
+        f5.util.mark_saved([self], ['_description'])
 
     #### enabled ####
     @property
@@ -419,21 +466,24 @@ class VirtualServer(object):
         if self._lb:
             enabled_state = self._get_enabled_state()
             self._enabled = self._munge_enabled(enabled_state)
+            f5.util.mark_clean([self], ['_enabled'])
 
         return self._enabled
 
     @enabled.setter
     def enabled(self, value):
         if self._lb:
-            self._set_enabled(self._unmunge_enabled(value))
+            self._set_enabled_state(self._unmunge_enabled(value))
 
         self._enabled = value
+        f5.util.mark_saved([self], ['_enabled'])
 
     #### port ####
     @property
     def port(self):
         if self._lb:
             self._port = self._get_destination()['port']
+            f5.util.mark_clean([self], ['_port'])
         return self._port
 
     @port.setter
@@ -442,6 +492,7 @@ class VirtualServer(object):
         if self._lb:
             self._set_destination(ap)
         self._port = value
+        f5.util.mark_saved([self], ['_address', '_port'])
 
     #### profiles ####
     @property
@@ -455,6 +506,7 @@ class VirtualServer(object):
     def protocol(self):
         if self._lb:
             self._protocol = self._munge_protocol(self._get_protocol())
+            f5.util.mark_clean([self], ['_protocol'])
         return self._protocol
 
     @protocol.setter
@@ -466,12 +518,14 @@ class VirtualServer(object):
         if self._lb:
             self._set_protocol(self._unmunge_protocol(value))
         self._protocol = value
+        f5.util.mark_saved([self], ['_protocol'])
 
     #### source ####
     @property
     def source(self):
         if self._lb:
             self._source = self._get_source_address()
+            f5.util.mark_clean([self], ['_source'])
         return self._source
 
     @source.setter
@@ -479,13 +533,15 @@ class VirtualServer(object):
         if self._lb:
             self._set_source_address(value)
         self._source = value
+        f5.util.mark_saved([self], ['_source'])
 
     #### vstype ####
     @property
     def vstype(self):
         if self._lb:
-            self._type = self._munge_vstype(self._get_type())
-        return self._type
+            self._vstype = self._munge_vstype(self._get_type())
+            f5.util.mark_clean([self], ['_vstype'])
+        return self._vstype
 
     @vstype.setter
     def vstype(self, value):
@@ -498,12 +554,14 @@ class VirtualServer(object):
             self._set_type(self._unmunge_vstype(value))
 
         self._vstype = value
+        f5.util.mark_saved([self], ['_vstype'])
 
     #### wildmask ####
     @property
     def wildmask(self):
         if self._lb:
             self._wildmask = self._get_wildmask()
+            f5.util.mark_clean([self], ['_wildmask'])
         return self._wildmask
 
     @wildmask.setter
@@ -511,6 +569,7 @@ class VirtualServer(object):
         if self._lb:
             self._set_wildmask(value)
         self._wildmask = value
+        f5.util.mark_saved([self], ['_wildmask'])
 
     ###########################################################################
     # Public API
@@ -528,59 +587,337 @@ class VirtualServer(object):
 
         return True
 
-    @f5.util.lbtransaction
     def save(self):
-        """Save the virtualserver to the Lb"""
-
-        if not self.exists():
-            args = {'address': self._address,
-                    'default_pool': self._default_pool, 'port': self._port,
-                    'protocol': self._protocol, 'wildmask': self._wildmask,
-                    'vstype': self._vstype, 'profiles': self._profiles}
+        """Save the virtualserver to the Lb
 
-            for k,v in args.items():
-                if v is None:
-                    raise ValueError('%s can not be %s on create' % (k, v))
+        A virtualserver loaded from the lb only pushes the attributes that
+        changed since, without checking if it exists.
+        """
+        changed = f5.util.dirty(self, self._writable)
+        if changed != []:
+            self._save(changed)
 
-            self._create()
-        else:
-            if self._address is not None or self._port is not None:
-                if self._address is None:
-                    self.address
-                if self._port is None:
-                    self.port
-                self._set_destination()
-            if self._protocol is not None:
-                 self._set_protocol()
-            if self._wildmask is not None:
-                 self._set_wildmask()
-            if self._default_pool is not None:
-                 self._set_default_pool()
-            if self._vstype is not None:
-                 self._set_type()
-
-        if self._description is not None:
-            self._set_description()
-        if self._enabled is not None:
+    @f5.util.lbtransaction
+    def _save(self, changed=None):
+        # We don't know what's on the lb, push everything that's set
+        if changed is None:
+            changed = [a for a in self._writable if getattr(self, a) is not None]
+
+            if not self.exists():
+                args = {'address': self._address,
+                        'default_pool': self._default_pool, 'port': self._port,
+                        'protocol': self._protocol, 'wildmask': self._wildmask,
+                        'vstype': self._vstype, 'profiles': self._profiles}
+
+                for k,v in args.items():
+                    if v is None:
+                        raise ValueError('%s can not be %s on create' % (k, v))
+
+                self._create()
+
+                # The rest went into the definition
+                changed = [a for a in changed if a in ('_description', '_enabled', '_source')]
+
+        if '_address' in changed or '_port' in changed:
+            if self._address is None:
+                self.address
+            if self._port is None:
+                self.port
+            self._set_destination()
+        if '_protocol' in changed:
+             self._set_protocol()
+        if '_wildmask' in changed:
+             self._set_wildmask()
+        if '_default_pool' in changed:
+             self._set_default_pool_name(str(self._default_pool))
+        if '_vstype' in changed:
+             self._set_type()
+        if '_description' in changed:
+            self._set_description(self._description)
+        if '_enabled' in changed:
             self._set_enabled_state()
-        if self._source is not None:
+        if '_source' in changed:
             self._set_source_address()
 
+        f5.util.mark_saved([self], self._writable)
+
     def refresh(self):
         """Update all attributes from the lb"""
-        self.address
-        self.default_pool
-        self.description
-        self.enabled
-        self.port
-        self.profiles
-        self.protocol
-        self.source
-        self.vstype
-        self.wildmask
+        if self._lb:
+            self._refresh_objects(self._lb, [self])
 
     def delete(self):
         """Delete the rule from the lb"""
         self._delete_virtual_server()
 
 VirtualServer.factory = f5.util.CachedFactory(VirtualServer)
+
+
+class VirtualServerList(list):
+    """A list of virtualservers with bulk getters and setters, one call per
+    attribute for all of them"""
+    def __init__(self, lb=None, pattern=None, minimal=False):
+        self._lb      = lb
+        self._minimal = minimal
+        self._pattern = pattern
+
+        if lb is not None:
+            self.refresh()
+
+    def refresh(self):
+        """Fetch the list from the lb"""
+        virtualservers = self._lb.vss_get(self._pattern, self._minimal)
+
+        del self[:]
+        self.extend(virtualservers)
+
+    @f5.util.lbtransaction
+    def sync(self, create=False):
+        """Push the local attributes of all virtualservers to the lb,
+        creating them first with create. Attributes not set on every
+        virtualserver are skipped."""
+        if create is True:
+            self._create()
+            attrs = ('description', 'enabled', 'source')
+        else:
+            if None not in self._getattr('_address') and None not in self._getattr('_port'):
+                self._set_destination(self._getattr('_address'), self._getattr('_port'))
+            attrs = ('default_pool', 'description', 'enabled', 'protocol',
+                    'source', 'vstype', 'wildmask')
+
+        for attr in attrs:
+            values = self._getattr('_' + attr)
+            if None not in values:
+                setattr(self, attr, values)
+
+    @f5.util.lbwriter2
+    def delete(self):
+        """Delete all virtualservers from the lb and empty the list"""
+        if self:
+            self._lbcall('delete_virtual_server', self.names)
+        del self[:]
+
+    def _lbcall(self, call, *args, **kwargs):
+        try:
+            return self._lb._call('LocalLB.VirtualServer.' + call, *args, **kwargs)
+        except ServerError as e:
+            if 'was not found.' in str(e):
+                raise VirtualServerNotFound(str(e))
+            else:
+                raise
+
+    # Like VirtualServer._create, with the same (limited) support
+    def _create(self):
+        for attr in ('_address', '_default_pool', '_port', '_protocol', '_vstype', '_wildmask'):
+            if None in self._getattr(attr):
+                raise ValueError('%s can not be None on create' % (attr[1:]))
+
+        definitions = [{'name': vs._name, 'address': vs._address, 'port': vs._port,
+                        'protocol': VirtualServer._unmunge_protocol(vs._protocol)}
+                       for vs in self]
+        resources   = [{'type': VirtualServer._unmunge_vstype(vs._vstype),
+                        'default_pool_name': str(vs._default_pool)}
+                       for vs in self]
+        profiles    = [VirtualServer._create_profiles(vs._profiles) for vs in self]
+
+        self._lbcall('create', definitions, self._getattr('_wildmask'), resources, profiles)
+
+    def _get_destination(self):
+        destinations = self._lbcall('get_destination_v2', self.names)
+        self._setattr('_address', [d['address'] for d in destinations])
+        self._setattr('_port', [d['port'] for d in destinations])
+        f5.util.mark_clean(self, ['_address', '_port'])
+
+    @f5.util.lbwriter2
+    def _set_destination(self, addresses, ports):
+        self._lbcall('set_destination_v2', self.names,
+                [{'address': address, 'port': port} for address, port in zip(addresses, ports)])
+        self._setattr('_address', addresses)
+        self._setattr('_port', ports)
+        f5.util.mark_saved(self, ['_address', '_port'])
+
+    def _setattr(self, attr, values):
+        """Sets an attribute on all objects in list"""
+        if len(values) != len(self):
+            raise ValueError('value must be of same length as list')
+
+        for idx,vs in enumerate(self):
+            setattr(vs, attr, values[idx])
+
+    def _getattr(self, attr):
+        return [getattr(vs, attr) for vs in self]
+
+    #### LB ####
+    @property
+    def lb(self):
+        return self._lb
+
+    @lb.setter
+    @f5.util.multisetter
+    def lb(self, value):
+        self._setattr('lb', value)
+        self._lb = value[0]
+
+    #### NAME ####
+    @property
+    def names(self):
+        return self._getattr('_name')
+
+    #### PATTERN ####
+    @property
+    def pattern(self):
+        return self._pattern
+
+    @pattern.setter
+    def pattern(self, value):
+        self._pattern = value
+        self.refresh()
+
+    ### ADDRESS ###
+    @property
+    def address(self):
+        self._get_destination()
+        return self._getattr('_address')
+
+    @address.setter
+    @f5.util.multisetter
+    def address(self, values):
+        self._set_destination(values, self.port)
+
+    ### DEFAULT_POOL ###
+    @property
+    def default_pool(self):
+        values = f5.Pool.factory.create(self._lbcall('get_default_pool_name', self.names), self._lb)
+        self._setattr('_default_pool', values)
+        f5.util.mark_clean(self, ['_default_pool'])
+        return values
+
+    @default_pool.setter
+    @f5.util.multisetter
+    @f5.util.lbwriter2
+    def default_pool(self, values):
+        values = [f5.Pool.factory.create([value], self._lb)[0] if isinstance(value, str)
+                else value for value in values]
+        self._lbcall('set_default_pool_name', self.names, [str(value) for value in values])
+        self._setattr('_default_pool', values)
+        f5.util.mark_saved(self, ['_default_pool'])
+
+    ### DESCRIPTION ###
+    @property
+    def description(self):
+        values = self._lbcall('get_description', self.names)
+        self._setattr('_description', values)
+        f5.util.mark_clean(self, ['_description'])
+        return values
+
+    @description.setter
+    @f5.util.multisetter
+    @f5.util.lbwriter2
+    def description(self, values):
+        self._lbcall('set_description', self.names, values)
+        self._setattr('_description', values)
+        f5.util.mark_saved(self, ['_description'])
+
+    ### ENABLED ###
+    @property
+    def enabled(self):
+        values = [VirtualServer._munge_enabled(state)
+                for state in self._lbcall('get_enabled_state', self.names)]
+        self._setattr('_enabled', values)
+        f5.util.mark_clean(self, ['_enabled'])
+        return values
+
+    @enabled.setter
+    @f5.util.multisetter
+    @f5.util.lbwriter2
+    def enabled(self, values):
+        self._lbcall('set_enabled_state', self.names,
+                [VirtualServer._unmunge_enabled(value) for value in values])
+        self._setattr('_enabled', values)
+        f5.util.mark_saved(self, ['_enabled'])
+
+    ### PORT ###
+    @property
+    def port(self):
+        self._get_destination()
+        return self._getattr('_port')
+
+    @port.setter
+    @f5.util.multisetter
+    def port(self, values):
+        self._set_destination(self.address, values)
+
+    ### PROFILES ###
+    @property
+    def profiles(self):
+        values = self._lbcall('get_profile', self.names)
+        self._setattr('_profiles', values)
+        return values
+
+    ### PROTOCOL ###
+    @property
+    def protocol(self):
+        values = [VirtualServer._munge_protocol(protocol)
+                for protocol in self._lbcall('get_protocol', self.names)]
+        self._setattr('_protocol', values)
+        f5.util.mark_clean(self, ['_protocol'])
+        return values
+
+    @protocol.setter
+    @f5.util.multisetter
+    @f5.util.lbwriter2
+    def protocol(self, values):
+        self._lbcall('set_protocol', self.names,
+                [VirtualServer._unmunge_protocol(value) for value in values])
+        self._setattr('_protocol', values)
+        f5.util.mark_saved(self, ['_protocol'])
+
+    ### SOURCE ###
+    @property
+    def source(self):
+        values = self._lbcall('get_source_address', self.names)
+        self._setattr('_source', values)
+        f5.util.mark_clean(self, ['_source'])
+        return values
+
+    @source.setter
+    @f5.util.multisetter
+    @f5.util.lbwriter2
+    def source(self, values):
+        self._lbcall('set_source_address', self.names, values)
+        self._setattr('_source', values)
+        f5.util.mark_saved(self, ['_source'])
+
+    ### VSTYPE ###
+    @property
+    def vstype(self):
+        values = [VirtualServer._munge_vstype(vstype)
+                for vstype in self._lbcall('get_type', self.names)]
+        self._setattr('_vstype', values)
+        f5.util.mark_clean(self, ['_vstype'])
+        return values
+
+    @vstype.setter
+    @f5.util.multisetter
+    @f5.util.lbwriter2
+    def vstype(self, values):
+        self._lbcall('set_type', self.names,
+                [VirtualServer._unmunge_vstype(value) for value in values])
+        self._setattr('_vstype', values)
+        f5.util.mark_saved(self, ['_vstype'])
+
+    ### WILDMASK ###
+    @property
+    def wildmask(self):
+        values = self._lbcall('get_wildmask', self.names)
+        self._setattr('_wildmask', values)
+        f5.util.mark_clean(self, ['_wildmask'])
+        return values
+
+    @wildmask.setter
+    @f5.util.multisetter
+    @f5.util.lbwriter2
+    def wildmask(self, values):
+        self._lbcall('set_wildmask', self.names, values)
+        self._setattr('_wildmask', values)
+        f5.util.mark_saved(self, ['_wildmask'])
@@ -0,0 +1,24 @@
+import pytest
+
+import f5
+import f5.testing
+
+
+@pytest.fixture
+def bigip():
+    bigip = f5.testing.FakeBigIP()
+    bigip.populate(nodes=20, pools=4, members_per_pool=5, virtualservers=4, rules=2)
+    return bigip
+
+
+@pytest.fixture
+def lb(bigip):
+    return f5.Lb('fake', 'admin', 'admin', transport=bigip)
+
+
+@pytest.fixture(autouse=True)
+def factories():
+    """Objects are cached per host name, don't share them between tests"""
+    yield
+    for cls in (f5.Node, f5.Pool, f5.PoolMember, f5.VirtualServer, f5.Rule):
+        cls.factory._cache.clear()
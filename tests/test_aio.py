@@ -0,0 +1,41 @@
+import asyncio
+import threading
+import time
+
+import f5
+import f5.aio
+
+
+def test_connect_and_fetch(bigip):
+    async def main():
+        lb    = await f5.aio.AsyncLb.connect('fake', 'admin', 'admin', transport=bigip)
+        nodes = await lb.nodes_get()
+        await lb.set(nodes[0], 'ratio', 10)
+        return lb, nodes, await lb.get(nodes[0], 'ratio')
+
+    lb, nodes, ratio = asyncio.run(main())
+
+    assert lb.host == 'fake'
+    assert len(nodes) == 20
+    assert ratio == 10
+
+
+def test_calls_bound_by_pool_size(bigip):
+    lb      = f5.aio.AsyncLb(f5.Lb('fake', 'admin', 'admin', transport=bigip, pool_size=2))
+    lock    = threading.Lock()
+    running = [0, 0]
+
+    def work(lb):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+
+    async def main():
+        await asyncio.gather(*[lb.run(work) for idx in range(8)])
+
+    asyncio.run(main())
+
+    assert running[1] == 2
@@ -0,0 +1,53 @@
+import pytest
+
+import f5
+
+
+def test_setters_are_one_call_per_method(lb, bigip):
+    pms = lb.pms_get()
+
+    bigip.stats.reset()
+    with lb.batch():
+        for pm in pms:
+            pm.ratio = 5
+            pm.description = 'batched'
+
+    assert bigip.stats.methods['LocalLB.Pool.set_member_ratio'] == 1
+    assert bigip.stats.methods['LocalLB.Pool.set_member_description'] == 1
+    assert all(m['ratio'] == 5 for p in bigip._device.pools.values() for m in p['members'])
+
+
+def test_rolled_back_save_stays_dirty(lb, bigip):
+    node = lb.nodes_get()[0]
+    node._description = 'changed'
+
+    with pytest.raises(RuntimeError):
+        with lb.batch():
+            node.save()
+            raise RuntimeError('abort')
+
+    assert bigip._device.nodes[node.name]['description'] != 'changed'
+
+    node.save()
+    assert bigip._device.nodes[node.name]['description'] == 'changed'
+
+
+def test_setters_are_sent_in_order(bigip):
+    lb = f5.Lb('fake', 'admin', 'admin', transport=bigip, concurrency=4)
+    pm = lb.pms_get()[0]
+
+    dispatched = []
+    dispatch   = lb._dispatch
+    def record(session, calls):
+        dispatched.append([call[0] for call in calls])
+        return dispatch(session, calls)
+    lb._dispatch = record
+
+    with lb.batch():
+        pm.ratio       = 5
+        pm.description = 'batched'
+        pm.enabled     = False
+
+    assert dispatched == [['LocalLB.Pool.set_member_ratio'],
+            ['LocalLB.Pool.set_member_description'],
+            ['LocalLB.Pool.set_member_session_enabled_state']]
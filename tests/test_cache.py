@@ -0,0 +1,101 @@
+import f5
+import f5.cache
+
+
+def test_node_delete_invalidates_pool_members(bigip):
+    lb   = f5.Lb('fake', 'admin', 'admin', transport=bigip, cache_ttl=60)
+    pool = lb.pools_get()[0]
+    name = pool.members[0].node.name
+    assert name in [m.node.name for m in pool.members]
+
+    # The device drops the node's pool members along with the node
+    for p in bigip._device.pools.values():
+        p['members'] = [m for m in p['members'] if m['address'] != name]
+    lb.node_get(name).delete()
+
+    assert name not in [m.node.name for m in pool.members]
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def fetcher(fetched):
+    """fetch for AttributeCache.call_many: '<name>:<method>' per object"""
+    def fetch(calls):
+        fetched.extend(calls)
+        return [['%s:%s' % (name, call[0].rsplit('.', 1)[1]) for name in call[1]]
+                for call in calls]
+    return fetch
+
+
+def test_ttl_per_attribute_class():
+    clock   = Clock()
+    cache   = f5.cache.AttributeCache({'config': 60, 'status': 5}, clock=clock)
+    fetched = []
+    fetch   = fetcher(fetched)
+    calls   = [('LocalLB.NodeAddressV2.get_ratio', ['a', 'b']),
+               ('LocalLB.NodeAddressV2.get_object_status', ['a', 'b']),
+               ('LocalLB.NodeAddressV2.get_statistics', ['a', 'b'])]
+
+    first = cache.call_many(fetch, calls)
+    assert len(fetched) == 3
+    assert (cache.hits, cache.misses) == (0, 4)
+
+    # Statistics aren't cached, the rest is
+    del fetched[:]
+    assert cache.call_many(fetch, calls) == first
+    assert fetched == [calls[2]]
+    assert (cache.hits, cache.misses) == (4, 4)
+
+    # Status expired, config didn't
+    del fetched[:]
+    clock.now += 10
+    cache.call_many(fetch, calls)
+    assert fetched == calls[1:]
+
+    clock.now += 60
+    del fetched[:]
+    cache.call_many(fetch, calls)
+    assert fetched == calls
+
+
+def test_fetch_only_missing_objects():
+    cache   = f5.cache.AttributeCache(60, clock=Clock())
+    fetched = []
+    fetch   = fetcher(fetched)
+
+    cache.call_many(fetch, [('LocalLB.NodeAddressV2.get_ratio', ['a'])])
+    result = cache.call_many(fetch, [('LocalLB.NodeAddressV2.get_ratio', ['a', 'b'])])
+
+    assert result == [['a:get_ratio', 'b:get_ratio']]
+    assert fetched[-1] == ('LocalLB.NodeAddressV2.get_ratio', ['b'])
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_writes_invalidate():
+    cache   = f5.cache.AttributeCache(60, clock=Clock())
+    fetched = []
+    fetch   = fetcher(fetched)
+    calls   = [('LocalLB.NodeAddressV2.get_ratio', ['a']),
+               ('LocalLB.Pool.get_member_v2', ['p']),
+               ('LocalLB.Rule.get_description', ['r'])]
+
+    cache.call_many(fetch, calls)
+    assert cache.stats['entries'] == 3
+
+    # A node write also drops the pools (AFFECTS), not the rules
+    cache.written('LocalLB.NodeAddressV2.delete_node_address')
+    assert cache.stats['entries'] == 1
+
+    del fetched[:]
+    cache.call_many(fetch, calls)
+    assert fetched == calls[:2]
+
+    # Getters don't invalidate anything
+    cache.written('LocalLB.Pool.get_list')
+    assert cache.stats['entries'] == 3
@@ -0,0 +1,61 @@
+import f5
+import f5.columnar
+import f5.pool
+import f5.testing
+
+
+def pools(bigip):
+    return dict((name, dict(pool, members=[(m['address'], m['port']) for m in pool['members']]))
+            for name, pool in bigip._device.pools.items())
+
+
+def test_poollist_round_trip(lb, bigip):
+    poollist = f5.pool.PoolList(lb)
+    data     = f5.columnar.dumps(poollist, compress='gzip')
+
+    # Without an lb only the local attributes are loaded
+    loaded = f5.columnar.loads(data)
+    assert loaded.lb is None
+    assert loaded._dictionary['pools'] == [dict(d, lb=None) for d in poollist._dictionary['pools']]
+    assert f5.pool.PoolList(fromdict=loaded._dictionary)._dictionary == loaded._dictionary
+
+    # Pushed to an empty lb, pools are created
+    other  = f5.testing.FakeBigIP()
+    target = f5.Lb('other', 'admin', 'admin', transport=other)
+    f5.pool.PoolList(target, fromdict=loaded._dictionary)
+    assert pools(other) == pools(bigip)
+
+    # and updated on one that has them
+    d = loaded._dictionary
+    d['pools'][0]['description'] = 'imported'
+    d['pools'][0]['members']     = d['pools'][0]['members'][1:] + [{'address': '/Common/node-00019', 'port': 81}]
+    d['pools'][1]['lbmethod']    = 'least_connection_member'
+
+    other.stats.reset()
+    f5.pool.PoolList(target, fromdict=d)
+
+    assert other._device.pools[d['pools'][0]['name']]['description'] == 'imported'
+    assert pools(other)[d['pools'][0]['name']]['members'] == [(m['address'], m['port'])
+            for m in d['pools'][0]['members']]
+    assert other._device.pools[d['pools'][1]['name']]['lbmethod'] == 'LB_METHOD_LEAST_CONNECTION_MEMBER'
+    assert other.stats.methods['LocalLB.Pool.set_description'] == 1
+
+
+def test_columnar_nodelist_round_trip(lb):
+    nodes  = f5.ColumnarNodeList(lb)
+    loaded = f5.columnar.loads(f5.columnar.dumps(nodes), lb=lb, columnar=True)
+
+    assert isinstance(loaded, f5.ColumnarNodeList)
+    assert loaded._dictionary == nodes._dictionary
+    assert [n.name for n in loaded] == [n.name for n in f5.NodeList(lb)]
+
+
+def test_snapshot_round_trip(lb):
+    snapshot = lb.snapshot()
+    loaded   = f5.columnar.loads(f5.columnar.dumps(snapshot, compress='gzip'))
+
+    assert loaded.nodes == snapshot.nodes
+    assert loaded.pools == snapshot.pools
+    assert loaded.poolmembers == snapshot.poolmembers
+    assert loaded.virtualservers == snapshot.virtualservers
+    assert loaded.rules == snapshot.rules
@@ -0,0 +1,49 @@
+import time
+
+import pytest
+
+import f5
+import f5.testing
+
+from f5.exceptions import HostTimeout
+
+
+@pytest.fixture
+def make_fleet(monkeypatch):
+    """LbFleet on a FakeBigIP per host"""
+    Lb = f5.Lb
+
+    def make(hosts, **kwargs):
+        bigips = dict((host, f5.testing.FakeBigIP()) for host in hosts)
+        monkeypatch.setattr(f5, 'Lb', lambda host, username, password, **kw:
+                Lb(host, username, password, transport=bigips[host], **kw))
+        return f5.LbFleet(hosts, 'admin', 'admin', **kwargs)
+
+    return make
+
+
+def test_run(make_fleet):
+    fleet  = make_fleet(['a', 'b'])
+    result = fleet.run(lambda lb: lb.host)
+
+    assert result.ok
+    assert result.results == {'a': 'a', 'b': 'b'}
+
+
+def test_queued_hosts_time_out(make_fleet):
+    fleet = make_fleet(['a', 'b'], max_workers=1)
+    ran   = []
+
+    def slow(lb):
+        ran.append(lb.host)
+        time.sleep(0.5)
+
+    start  = time.time()
+    result = fleet.run(slow, timeout=0.1)
+
+    assert time.time() - start < 0.4
+    assert sorted(result.errors) == ['a', 'b']
+    assert all(isinstance(e, HostTimeout) for e in result.errors.values())
+    # b was still queued behind a and never started
+    time.sleep(0.5)
+    assert ran == ['a']
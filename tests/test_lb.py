@@ -0,0 +1,249 @@
+import threading
+
+import pytest
+
+import f5
+import f5.lb
+import f5.testing
+
+from bigsuds import ServerError
+
+
+def test_iter_nodes_fetches_every_chunk_recursively(lb, monkeypatch):
+    seen = []
+    get_address = f5.testing._NodeAddressV2.get_address
+
+    def spy(self, names):
+        session = self._bigip.session
+        seen.append((session['active_folder'], session['recursive_query']))
+        return get_address(self, names)
+
+    monkeypatch.setattr(f5.testing._NodeAddressV2, 'get_address', spy)
+
+    nodes = lb.iter_nodes(chunk_size=5)
+    first = [next(nodes) for idx in range(5)]
+
+    # The caller works in another folder between chunks
+    lb.active_folder   = '/Common'
+    lb.recursive_query = False
+    f5.Node._lbcall(lb, 'get_list')
+
+    rest = list(nodes)
+
+    assert len(first) + len(rest) == 20
+    assert seen == [('/', 'STATE_ENABLED')] * 4
+    assert (lb.active_folder, lb.recursive_query) == ('/Common', False)
+
+
+def test_wsdl_cache_per_version(monkeypatch, tmp_path):
+    created   = []
+    arguments = []
+
+    # bigsuds.BIGIP's signature
+    def BIGIP(host, username, password, debug=False, cachedir=None, verify=False):
+        created.append(cachedir)
+        arguments.append((debug, verify))
+        return bigip
+
+    bigip = f5.testing.FakeBigIP()
+    monkeypatch.setattr(f5.lb.bigsuds, 'BIGIP', BIGIP)
+
+    lb = f5.Lb('fake', 'admin', 'admin', wsdl_cache=str(tmp_path))
+
+    assert created == [str(tmp_path / 'bootstrap'), str(tmp_path / 'BIG-IP_v11.6.0')]
+    # verify is passed the way it always was
+    assert arguments == [(True, False)] * 2
+    assert lb.nodes_get() == []
+
+
+def test_session_pool_threads(bigip):
+    lb     = f5.Lb('fake', 'admin', 'admin', transport=bigip, pool_size=4)
+    errors = []
+
+    def work(idx):
+        try:
+            for run in range(10):
+                assert len(lb.nodes_get()) == 20
+                assert len(lb.pms_get()) == 20
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(idx,)) for idx in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    # The sessionless transport is there too, as session None
+    assert 1 <= len([s for s in bigip._device.sessions if s is not None]) <= 4
+
+
+def test_parallel_fetch_keeps_order(bigip):
+    serial   = f5.Lb('fake', 'admin', 'admin', transport=bigip)
+    parallel = f5.Lb('fake', 'admin', 'admin', transport=bigip, concurrency=4, chunk_size=3)
+    names    = f5.Node._get_names(serial)
+
+    assert (parallel._call('LocalLB.NodeAddressV2.get_address', names) ==
+            serial._call('LocalLB.NodeAddressV2.get_address', names))
+    assert [n.name for n in parallel.nodes_get()] == names
+
+
+def test_parallel_fetch_raises(bigip):
+    lb    = f5.Lb('fake', 'admin', 'admin', transport=bigip, concurrency=4, chunk_size=3)
+    names = f5.Node._get_names(lb) + ['/Common/missing']
+
+    with pytest.raises(ServerError):
+        lb._call_many([('LocalLB.NodeAddressV2.get_address', names),
+                       ('LocalLB.NodeAddressV2.get_ratio', names)])
+
+    # The workers are still usable
+    assert len(lb.nodes_get()) == 20
+
+
+def test_chunking_is_off_by_default(bigip):
+    lb = f5.Lb('fake', 'admin', 'admin', transport=bigip)
+    assert lb.chunk_size is None
+
+    bigip.stats.reset()
+    lb.nodes_get()
+    assert bigip.stats.methods['LocalLB.NodeAddressV2.get_address'] == 1
+
+
+@pytest.mark.parametrize('kwargs', [{'chunk_size': 0}, {'concurrency': 0}])
+def test_init_checks_arguments(bigip, kwargs):
+    with pytest.raises(ValueError):
+        f5.Lb('fake', 'admin', 'admin', transport=bigip, **kwargs)
+
+
+def test_chunk_call():
+    call = ('LocalLB.Pool.get_ratio', ['a', 'b', 'c'], 'x')
+    assert f5.lb.chunk_call(call, None) == [call]
+    assert f5.lb.chunk_call(call, 2) == [
+        ('LocalLB.Pool.get_ratio', ['a', 'b'], 'x'),
+        ('LocalLB.Pool.get_ratio', ['c'], 'x')]
+
+    # Pool members count per member, a pool bigger than a chunk goes alone
+    call = ('LocalLB.Pool.get_member_ratio', ['a', 'b', 'c'], [[1, 2], [3, 4, 5, 6, 7], [8]])
+    assert f5.lb.chunk_call(call, 3) == [
+        ('LocalLB.Pool.get_member_ratio', ['a'], [[1, 2]]),
+        ('LocalLB.Pool.get_member_ratio', ['b'], [[3, 4, 5, 6, 7]]),
+        ('LocalLB.Pool.get_member_ratio', ['c'], [[8]])]
+
+    # Lists of unequal length aren't split
+    call = ('LocalLB.Pool.get_ratio', ['a', 'b', 'c'], ['x'])
+    assert f5.lb.chunk_call(call, 1) == [call]
+
+
+def test_stitch():
+    assert f5.lb.stitch([[1, 2], [3]]) == [1, 2, 3]
+    assert f5.lb.stitch([[[1], [2]], [[3]]]) == [[1], [2], [3]]
+    assert f5.lb.stitch([{'statistics': [1], 'time_stamp': 't1'},
+                         {'statistics': [2, 3], 'time_stamp': 't2'}]) == {
+            'statistics': [1, 2, 3], 'time_stamp': 't1'}
+    assert f5.lb.stitch(['only']) == 'only'
+
+
+def test_merge_calls():
+    calls = [
+        ('LocalLB.Pool.set_ratio', ['a'], [1]),
+        ('LocalLB.Pool.set_member_ratio', ['a'], [[{'port': 80}]], [[2]]),
+        ('LocalLB.Pool.set_ratio', ['b'], [2]),
+        ('LocalLB.Pool.set_member_ratio', ['a'], [[{'port': 81}]], [[3]]),
+        ('LocalLB.Pool.delete_pool', 'c'),
+    ]
+    assert f5.lb.merge_calls(calls) == [
+        ('LocalLB.Pool.set_ratio', ['a', 'b'], [1, 2]),
+        ('LocalLB.Pool.set_member_ratio', ['a'], [[{'port': 80}, {'port': 81}]], [[2, 3]]),
+        ('LocalLB.Pool.delete_pool', 'c'),
+    ]
+
+
+def locallb_calls(bigip):
+    return dict((m, n) for m, n in bigip.stats.methods.items() if m.startswith('LocalLB.'))
+
+
+def test_refresh_is_one_call_per_attribute(lb, bigip):
+    node = lb.nodes_get()[0]
+
+    bigip.stats.reset()
+    node.refresh()
+
+    assert locallb_calls(bigip) == dict((c[0], 1) for c in f5.Node._refresh_calls([node]))
+
+
+def test_refresh_many(lb, bigip):
+    nodes, pools, pms = lb.nodes_get(), lb.pools_get(), lb.pms_get()
+    vss, rules        = lb.vss_get(), lb.rules_get()
+
+    bigip.stats.reset()
+    lb.refresh_many([nodes[0], pools[0], pms[0], vss[0], rules[0]])
+    one = locallb_calls(bigip)
+
+    # One call per attribute per type, however many objects
+    bigip.stats.reset()
+    lb.refresh_many(nodes[:10] + pools[:3] + pms[:10] + vss[:3] + rules[:2])
+    assert locallb_calls(bigip) == one
+    assert set(one.values()) == set([1])
+
+    bigip._device.nodes[nodes[5].name]['ratio'] = 7
+    lb.refresh_many(nodes[:10])
+    assert nodes[5]._ratio == 7
+
+
+def transaction_calls(bigip):
+    return [bigip.stats.methods.get('System.Session.' + m, 0)
+            for m in ('start_transaction', 'submit_transaction', 'rollback_transaction')]
+
+
+def test_transaction_in_batch(lb, bigip):
+    node = lb.nodes_get()[0]
+    pm   = lb.pms_get()[0]
+
+    bigip.stats.reset()
+    with lb.batch():
+        # save() has a transaction of its own outside of a batch
+        node._description = 'batched'
+        node.save()
+        pm.ratio = 3
+        assert bigip._device.nodes[node.name]['description'] != 'batched'
+
+    assert transaction_calls(bigip) == [1, 1, 0]
+    assert bigip._device.nodes[node.name]['description'] == 'batched'
+    assert lb.transaction is False
+
+
+def test_failed_submit(lb, bigip):
+    nodes = lb.nodes_get()[:2]
+    with pytest.raises(ServerError):
+        with lb.batch():
+            nodes[0].ratio = 3
+            nodes[1].ratio = 4
+            del bigip._device.nodes[nodes[1].name]
+
+    # Nothing applied, and we don't know the state of the transaction
+    assert bigip._device.nodes[nodes[0].name]['ratio'] == 1
+    assert lb._local.session.transaction is None
+
+    bigip.stats.reset()
+    assert lb.transaction is False
+    assert transaction_calls(bigip) == [1, 0, 1]
+
+    nodes[0].ratio = 3
+    assert bigip._device.nodes[nodes[0].name]['ratio'] == 3
+
+
+def test_verify_transactions(lb, bigip):
+    lb.transaction = True
+
+    # Ended behind our back, e.g. by the transaction timeout
+    for session in bigip._device.sessions.values():
+        session['transaction'] = False
+
+    bigip.stats.reset()
+    assert lb.transaction is True
+    assert transaction_calls(bigip) == [0, 0, 0]
+
+    lb.verify_transactions = True
+    assert lb.transaction is False
+    assert transaction_calls(bigip) == [1, 0, 1]
@@ -0,0 +1,159 @@
+import pytest
+
+import f5
+import f5.testing
+
+
+def locallb_calls(bigip):
+    return dict((m, n) for m, n in bigip.stats.methods.items() if m.startswith('LocalLB.'))
+
+
+def test_save_pushes_only_changed_attributes(lb, bigip):
+    node = lb.nodes_get()[0]
+    node._description = 'changed'
+    node._ratio       = 3
+
+    bigip.stats.reset()
+    node.save()
+
+    assert sorted(m for m in bigip.stats.methods if m.startswith('LocalLB.')) == [
+        'LocalLB.NodeAddressV2.set_description', 'LocalLB.NodeAddressV2.set_ratio']
+    assert bigip._device.nodes[node.name]['description'] == 'changed'
+    assert bigip._device.nodes[node.name]['ratio'] == 3
+
+    bigip.stats.reset()
+    node.save()
+    assert bigip.stats.calls == 0
+
+
+def test_drain_skips_virtualservers(lb, bigip):
+    node = lb.nodes_get()[0]
+
+    bigip.stats.reset()
+    members = node.drain()
+
+    assert len(members) == 1
+    assert not [m for m in bigip.stats.methods if m.startswith('LocalLB.VirtualServer.')]
+    assert [m['enabled'] for p in bigip._device.pools.values() for m in p['members']
+            if m['address'] == node.name] == [False]
+
+    node.undrain()
+    assert [m['enabled'] for p in bigip._device.pools.values() for m in p['members']
+            if m['address'] == node.name] == [True]
+
+
+def test_drain_wait_in_batch(lb, bigip):
+    node = lb.nodes_get()[0]
+
+    with lb.batch():
+        with pytest.raises(RuntimeError):
+            node.drain(wait=True)
+        node.drain()
+        assert all(m['enabled'] for p in bigip._device.pools.values() for m in p['members'])
+
+    assert [m['enabled'] for p in bigip._device.pools.values() for m in p['members']
+            if m['address'] == node.name] == [False]
+
+
+
+@pytest.mark.parametrize('List', [f5.NodeList, f5.ColumnarNodeList])
+def test_list_sync(lb, bigip, List):
+    nodes = List(lb)
+    for node in nodes:
+        node._description = 'synced'
+        node._ratio       = 2
+
+    bigip.stats.reset()
+    nodes.sync()
+
+    assert bigip.stats.methods['LocalLB.NodeAddressV2.set_description'] == 1
+    assert all(n['description'] == 'synced' and n['ratio'] == 2
+            for n in bigip._device.nodes.values())
+
+
+def test_status_fetched_once(lb, bigip):
+    node   = lb.nodes_get()[0]
+    status = 'LocalLB.NodeAddressV2.get_object_status'
+
+    for fetch in (node.refresh, lambda: node.dictionary,
+            lambda: f5.NodeList(lb, minimal=True).dictionary):
+        bigip.stats.reset()
+        fetch()
+        assert bigip.stats.methods[status] == 1
+
+    # One of the three fills in the other two
+    nodes = f5.NodeList(lb, minimal=True)
+    bigip.stats.reset()
+    assert len(nodes.av_status) == 20
+    assert None not in nodes._enabled and None not in nodes._status_descr
+    assert bigip.stats.methods[status] == 1
+
+
+def test_incremental_refresh(lb, bigip):
+    nodes   = f5.NodeList(lb)
+    devices = bigip._device.nodes
+
+    bigip.add_node('/Common/node-new', '10.9.9.9')
+    del devices['/Common/node-00019']
+    devices['/Common/node-00001']['enabled'] = False
+    devices['/Common/node-00002']['ratio']   = 5
+
+    bigip.stats.reset()
+    changes = nodes.refresh(incremental=True)
+
+    assert [n.name for n in changes.added] == ['/Common/node-new']
+    assert [n.name for n in changes.removed] == ['/Common/node-00019']
+    assert [n.name for n in changes.modified] == ['/Common/node-00001', '/Common/node-00002']
+    assert len(nodes) == 20 and nodes[-1]._address == '10.9.9.9'
+
+    # The list, and per attribute one call for the new and one for the others
+    calls = f5.Node._refresh_calls(nodes)
+    assert bigip.stats.methods['LocalLB.NodeAddressV2.get_list'] == 1
+    assert all(bigip.stats.methods[c[0]] == 2 for c in calls)
+
+    # Only status with volatile_only
+    devices['/Common/node-00003']['enabled'] = False
+    devices['/Common/node-00004']['ratio']   = 7
+
+    bigip.stats.reset()
+    changes = nodes.refresh(incremental=True, volatile_only=True)
+
+    assert not changes.added and not changes.removed
+    assert [n.name for n in changes.modified] == ['/Common/node-00003']
+    assert locallb_calls(bigip) == {'LocalLB.NodeAddressV2.get_list': 1,
+            'LocalLB.NodeAddressV2.get_object_status': 1}
+
+    # The ratio shows on a full one
+    changes = nodes.refresh(incremental=True)
+    assert [n.name for n in changes.modified] == ['/Common/node-00004']
+    assert not nodes.refresh(incremental=True)
+
+
+def test_setter_marks_clean(lb, bigip):
+    node = lb.nodes_get()[0]
+    node.ratio  = 7
+    node._ratio = 1
+    node.save()
+
+    assert bigip._device.nodes[node.name]['ratio'] == 1
+
+
+def test_getter_marks_clean(lb, bigip):
+    node = lb.nodes_get()[0]
+    bigip._device.nodes[node.name]['ratio'] = 5
+
+    assert node.ratio == 5
+    node._ratio = 1
+    node.save()
+
+    assert bigip._device.nodes[node.name]['ratio'] == 1
+
+
+def test_setter_in_batch_marks_clean_on_submit(lb, bigip):
+    node = lb.nodes_get()[0]
+    with lb.batch():
+        node.ratio = 7
+    node._ratio = 1
+    node.save()
+
+    assert bigip._device.nodes[node.name]['ratio'] == 1
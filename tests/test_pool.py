@@ -0,0 +1,41 @@
+import f5
+import f5.pool
+
+
+def test_save_changed_members(lb, bigip):
+    pool    = lb.pools_get()[0]
+    members = pool._members
+    node    = lb.nodes_get()[-1]
+
+    pool._members = members[1:] + [f5.PoolMember(node, 8080, pool, lb=lb)]
+    pool.save()
+
+    device = [(m['address'], m['port']) for m in bigip._device.pools[pool.name]['members']]
+    assert device == [(m.node.name, m.port) for m in members[1:]] + [(node.name, 8080)]
+
+    # Saved, so nothing left to push
+    bigip.stats.reset()
+    pool.save()
+    assert bigip.stats.calls == 0
+
+
+def test_incremental_refresh(lb, bigip):
+    pools = f5.pool.PoolList(lb)
+    bigip._device.pools['/Common/pool-00001']['description'] = 'changed'
+    bigip.add_pool('/Common/pool-new')
+
+    changes = pools.refresh(incremental=True)
+
+    assert [p.name for p in changes.added] == ['/Common/pool-new']
+    assert [p.name for p in changes.modified] == ['/Common/pool-00001']
+    assert pools[1]._description == 'changed'
+
+    # Members aren't volatile
+    bigip.add_member('/Common/pool-00002', '/Common/node-00000', 8080)
+
+    bigip.stats.reset()
+    changes = pools.refresh(incremental=True, volatile_only=True)
+
+    assert [p.name for p in changes.modified] == ['/Common/pool-00002']
+    assert 'LocalLB.Pool.get_member' not in bigip.stats.methods
+    assert len(pools[2]._members) == 5
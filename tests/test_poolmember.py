@@ -0,0 +1,107 @@
+import f5
+
+
+def locallb_calls(bigip):
+    return dict((m, n) for m, n in bigip.stats.methods.items() if m.startswith('LocalLB.'))
+
+
+def test_status_fetched_once(lb, bigip):
+    pm = lb.pms_get()[0]
+
+    bigip.stats.reset()
+    pm.refresh()
+
+    assert bigip.stats.methods['LocalLB.Pool.get_member_object_status'] == 1
+    assert None not in (pm._availability_status, pm._enabled, pm._status_description)
+
+
+def member(bigip, pm):
+    return [m for m in bigip._device.pools[pm.pool.name]['members']
+            if m['address'] == pm.node.name and m['port'] == pm.port][0]
+
+
+def test_setter_marks_clean(lb, bigip):
+    pm = lb.pms_get()[0]
+    pm.ratio  = 9
+    pm._ratio = 1
+    pm.save()
+
+    assert member(bigip, pm)['ratio'] == 1
+
+
+def test_getter_marks_clean(lb, bigip):
+    pm = lb.pms_get()[0]
+    member(bigip, pm)['ratio'] = 5
+
+    assert pm.ratio == 5
+    pm._ratio = 1
+    pm.save()
+
+    assert member(bigip, pm)['ratio'] == 1
+
+
+def test_list_getters_and_setters(lb, bigip):
+    pms = f5.PoolMemberList(lb)
+    assert len(pms) == 20
+
+    bigip.stats.reset()
+    pms.ratio   = list(range(20))
+    pms.enabled = [idx % 2 == 0 for idx in range(20)]
+
+    assert locallb_calls(bigip) == {'LocalLB.Pool.set_member_ratio': 1,
+            'LocalLB.Pool.set_member_session_enabled_state': 1}
+    assert [member(bigip, pm)['ratio'] for pm in pms] == list(range(20))
+    assert [member(bigip, pm)['enabled'] for pm in pms] == [idx % 2 == 0 for idx in range(20)]
+
+    member(bigip, pms[3])['description'] = 'changed'
+
+    bigip.stats.reset()
+    assert pms.description[3] == 'changed'
+    assert pms.ratio == list(range(20))
+    assert pms.current_connections == [0] * 20
+    assert locallb_calls(bigip) == {'LocalLB.Pool.get_member_description': 1,
+            'LocalLB.Pool.get_member_ratio': 1, 'LocalLB.Pool.get_member_statistics': 1}
+
+
+def test_empty_list_makes_no_calls(lb, bigip):
+    pms = f5.PoolMemberList(lb, pools=[])
+    assert len(pms) == 0
+
+    bigip.stats.reset()
+    assert pms.ratio == []
+    assert pms.enabled == []
+    assert pms.current_connections == []
+    pms.ratio = []
+    pms.sync(create=True)
+    pms.delete()
+
+    assert locallb_calls(bigip) == {}
+
+
+def test_list_delete(lb, bigip):
+    pool = sorted(bigip._device.pools)[0]
+    pms  = f5.PoolMemberList(lb, pools=[pool])
+    assert len(pms) == 5
+
+    pms.delete()
+
+    assert len(pms) == 0
+    assert bigip._device.pools[pool]['members'] == []
+
+
+def test_list_sync(lb, bigip):
+    pool = sorted(bigip._device.pools)[0]
+    pms  = f5.PoolMemberList(lb, pools=[pool])
+    for pm in pms:
+        pm._description = 'synced'
+        pm._ratio       = 4
+
+    bigip._device.pools[pool]['members'] = []
+
+    bigip.stats.reset()
+    pms.sync(create=True)
+
+    assert bigip.stats.methods['LocalLB.Pool.add_member_v2'] == 1
+    assert bigip.stats.methods['LocalLB.Pool.set_member_ratio'] == 1
+    assert [(m['description'], m['ratio']) for m in bigip._device.pools[pool]['members']] == [
+            ('synced', 4)] * 5
@@ -0,0 +1,23 @@
+import pytest
+
+
+def test_snapshot(lb, bigip):
+    snapshot = lb.snapshot()
+
+    assert len(snapshot.nodes) == 20
+    assert len(snapshot.pools) == 4
+    assert len(snapshot.poolmembers) == 20
+    assert len(snapshot.virtualservers) == 4
+    assert len(snapshot.rules) == 2
+
+    pool = snapshot.pools[0]
+    assert snapshot.pool(pool.name) is pool
+    assert [(m.node.name, m.port) for m in pool.members] == [(m['address'], m['port'])
+            for m in bigip._device.pools[pool.name]['members']]
+    assert pool.members[0].node is snapshot.node(pool.members[0].node.name)
+
+    vs = snapshot.virtualservers[0]
+    assert vs.default_pool is snapshot.pool(bigip._device.virtualservers[vs.name]['default_pool'])
+
+    with pytest.raises(AttributeError):
+        snapshot.nodes = ()
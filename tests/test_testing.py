@@ -0,0 +1,48 @@
+import pytest
+
+from bigsuds import ServerError
+
+
+def test_calls_are_counted(bigip):
+    bigip.LocalLB.NodeAddressV2.get_list()
+    bigip.LocalLB.NodeAddressV2.get_ratio(['/Common/node-00000'])
+
+    assert bigip.stats.calls == 2
+    assert bigip.stats.methods == {'LocalLB.NodeAddressV2.get_list': 1,
+            'LocalLB.NodeAddressV2.get_ratio': 1}
+
+
+def test_transaction_applies_on_submit(bigip):
+    nodes = bigip.LocalLB.NodeAddressV2
+
+    bigip.System.Session.start_transaction()
+    nodes.set_ratio(['/Common/node-00000'], [5])
+    assert nodes.get_ratio(['/Common/node-00000']) == [1]
+
+    bigip.System.Session.submit_transaction()
+    assert nodes.get_ratio(['/Common/node-00000']) == [5]
+
+
+def test_transaction_rollback(bigip):
+    nodes = bigip.LocalLB.NodeAddressV2
+
+    bigip.System.Session.start_transaction()
+    nodes.set_ratio(['/Common/node-00000'], [5])
+    bigip.System.Session.rollback_transaction()
+
+    assert nodes.get_ratio(['/Common/node-00000']) == [1]
+    assert bigip.session['queued'] == []
+
+
+def test_failed_submit_applies_nothing(bigip):
+    nodes = bigip.LocalLB.NodeAddressV2
+
+    bigip.System.Session.start_transaction()
+    nodes.set_ratio(['/Common/node-00000'], [5])
+    nodes.set_ratio(['/Common/missing'], [5])
+
+    with pytest.raises(ServerError):
+        bigip.System.Session.submit_transaction()
+
+    assert nodes.get_ratio(['/Common/node-00000']) == [1]
+    assert not bigip.session['transaction']
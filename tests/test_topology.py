@@ -0,0 +1,49 @@
+def test_multiport_member(lb, bigip):
+    pool = sorted(bigip._device.pools)[0]
+    node = bigip._device.pools[pool]['members'][0]['address']
+    bigip.add_member(pool, node, 443)
+
+    topology = lb.topology()
+    vss      = topology.pool_virtualservers(pool)
+
+    assert topology.node_pools(node) == [pool]
+    assert len(vss) == 1
+    assert topology.node_virtualservers(node) == vss
+    assert sorted(m.port for m in topology.node_members(node)) == [80, 443]
+
+    topology.refresh(pools=[pool])
+
+    assert topology.node_pools(node) == [pool]
+    assert len(topology.pool_members(pool)) == 6
+
+
+def test_pools_only(lb, bigip):
+    bigip.stats.reset()
+    topology = lb.topology(virtualservers=False)
+
+    assert not [m for m in bigip.stats.methods if m.startswith('LocalLB.VirtualServer.')]
+    assert len(topology.pools) == 4
+    assert topology.virtualservers == []
+
+
+def test_pools_get_vs(lb, bigip):
+    pools = sorted(bigip._device.pools)
+    bigip.add_virtualserver('/Common/vs-extra', '192.168.1.1', 80, pools[0])
+    bigip.add_pool('/Common/pool-unused')
+
+    bigip.stats.reset()
+    result = lb.pools_get_vs(minimal=True)
+
+    assert sorted(result) == sorted(pools + ['/Common/pool-unused'])
+    assert [vs.name for vs in result[pools[0]]] == ['/Common/vs-00000', '/Common/vs-extra']
+    assert result['/Common/pool-unused'] == []
+    assert all(str(vs._default_pool) == pool for pool in result for vs in result[pool])
+
+    # The topology only, no attributes of every virtualserver
+    assert dict((m, n) for m, n in bigip.stats.methods.items() if m.startswith('LocalLB.')) == {
+            'LocalLB.Pool.get_list': 1, 'LocalLB.Pool.get_member_v2': 1,
+            'LocalLB.VirtualServer.get_list': 1, 'LocalLB.VirtualServer.get_default_pool_name': 1}
+
+    result = lb.pools_get_vs([pools[1]])
+    assert [vs.name for vs in result[pools[1]]] == ['/Common/vs-00001']
+    assert result[pools[1]][0]._description == ''
@@ -0,0 +1,28 @@
+import f5
+import f5.testing
+
+TCP  = {'profile_context': 'PROFILE_CONTEXT_TYPE_ALL', 'profile_name': '/Common/tcp'}
+HTTP = {'profile_context': 'PROFILE_CONTEXT_TYPE_ALL', 'profile_name': '/Common/http'}
+
+
+def virtualserver(lb, name, profiles=None):
+    return f5.VirtualServer(name, lb=lb, address='10.1.0.1', port=80, protocol='tcp',
+            vstype='pool', wildmask='255.255.255.255', profiles=profiles,
+            default_pool=lb.pools_get()[0])
+
+
+def test_list_create_keeps_profiles(lb, bigip):
+    vss = f5.VirtualServerList()
+    vss._lb = lb
+    vss.extend([virtualserver(lb, '/Common/vs-new-0', [dict(HTTP, profile_type='PROFILE_TYPE_HTTP'), TCP]),
+                virtualserver(lb, '/Common/vs-new-1')])
+    vss.sync(create=True)
+
+    assert bigip._device.virtualservers['/Common/vs-new-0']['profiles'] == [HTTP, TCP]
+    assert bigip._device.virtualservers['/Common/vs-new-1']['profiles'] == [TCP]
+
+
+def test_create_keeps_profiles(lb, bigip):
+    virtualserver(lb, '/Common/vs-new', [HTTP, TCP]).save()
+
+    assert bigip._device.virtualservers['/Common/vs-new']['profiles'] == [HTTP, TCP]